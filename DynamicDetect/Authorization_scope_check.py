@@ -9,16 +9,18 @@ import os
 import re
 import sys
 from collections import Counter, defaultdict
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
-from neo4j import GraphDatabase
-
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from Tools.CheckOutput import PolicyCheckReporter
+from Tools import IdentitySnapshot as snapshot_store
+from Tools.ApiCatalog import load_catalog, parse_endpoint
+from Tools.Neo4jDriver import get_driver, read
 
 DEFAULT_AUDIT_FILE = "/root/policy-fileparser/data/assistfile/rbac_audit_keystone.csv"
 DEFAULT_TEMP_FILE = "/root/policy-fileparser/data/assistfile/rbac_audit_keystone_temp.csv"
@@ -37,13 +39,21 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--rolegrant-file",
-        default=DEFAULT_ROLEGRANT_FILE,
-        help="rolegrant.csv 路径",
+        default=None,
+        help=f"rolegrant.csv 路径，默认 {DEFAULT_ROLEGRANT_FILE}",
     )
     parser.add_argument(
         "--projectinfo-file",
-        default=DEFAULT_PROJECTINFO_FILE,
-        help="projectinfo.csv 路径",
+        default=None,
+        help=f"projectinfo.csv 路径，默认 {DEFAULT_PROJECTINFO_FILE}",
+    )
+    parser.add_argument(
+        "--identity-snapshot",
+        default=None,
+        help=(
+            f"身份快照路径，默认 {snapshot_store.SNAPSHOT_PATH}；"
+            "未显式传入 --rolegrant-file/--projectinfo-file 时，快照存在则优先于两个 CSV"
+        ),
     )
     parser.add_argument(
         "--temp-out",
@@ -58,23 +68,30 @@ def parse_args() -> argparse.Namespace:
 
 def connect(uri: str, user: str, password: str):
     try:
-        driver = GraphDatabase.driver(uri, auth=(user, password))
-        with driver.session() as session:
-            session.run("RETURN 1")
-        return driver
+        return get_driver(uri, user, password)
     except Exception as exc:
         print(f"✗ Neo4j 连接失败: {exc}")
         return None
 
 
+@lru_cache(maxsize=None)
 def normalize_api(api: str) -> str:
+    """
+    审计日志中的 API 统一为策略名：已是策略名时去掉末尾括号说明；
+    "METHOD /url" 形式经 API 目录（Tools/ApiCatalog）按端点哈希查找对应策略。
+    """
     api = (api or "").strip()
     if not api:
         return ""
+    if parse_endpoint(api) is not None:
+        policies = load_catalog().resolve(api)
+        if policies:
+            return policies[0]
     api = re.sub(r"\(.*\)$", "", api)
     return api.strip()
 
 
+@lru_cache(maxsize=None)
 def parse_policy_key(api: str) -> Tuple[Optional[str], Optional[str]]:
     api = normalize_api(api)
     if ":" not in api:
@@ -110,6 +127,32 @@ def load_rolegrant(path: str) -> Tuple[Dict[str, str], Dict[Tuple[str, str], Lis
     return user_map, role_map
 
 
+def load_identity_snapshot(
+    path: str,
+) -> Optional[Tuple[Dict[str, str], Dict[Tuple[str, str], List[str]], Dict[str, str]]]:
+    """从身份快照构建 (user_map, role_map, project_map)，快照不存在时返回 None。"""
+    identity = snapshot_store.load_identity_model(path)
+    if identity is None:
+        return None
+    return identity.user_name_map(), identity.project_roles_by_user_name(), identity.project_name_map()
+
+
+def load_identity(
+    snapshot_path: Optional[str], rolegrant_path: Optional[str], projectinfo_path: Optional[str]
+) -> Tuple[Dict[str, str], Dict[Tuple[str, str], List[str]], Dict[str, str]]:
+    """
+    选择身份数据来源：显式传入 --identity-snapshot，或两个 CSV 都未显式指定时读取快照
+    （快照不存在则退回 CSV）；显式指定了 CSV 而未指定快照时只读 CSV。
+    """
+    explicit_csv = rolegrant_path is not None or projectinfo_path is not None
+    if snapshot_path is not None or not explicit_csv:
+        identity = load_identity_snapshot(snapshot_path or snapshot_store.SNAPSHOT_PATH)
+        if identity is not None:
+            return identity
+    user_map, role_map = load_rolegrant(rolegrant_path or DEFAULT_ROLEGRANT_FILE)
+    return user_map, role_map, load_project_map(projectinfo_path or DEFAULT_PROJECTINFO_FILE)
+
+
 def load_audit_rows(paths: Iterable[str]) -> List[Dict[str, str]]:
     rows: List[Dict[str, str]] = []
     for path in paths:
@@ -244,53 +287,53 @@ def check_unused_rules(
             continue
         policy_map[(policy_type, policy_name)].add((role, project))
 
-    with driver.session() as session:
-        for (policy_type, policy_name), pairs in policy_map.items():
-            all_rules = session.run(
+    for (policy_type, policy_name), pairs in policy_map.items():
+        all_rules_list = read(
+            driver,
+            """
+            MATCH (p:PolicyNode {type: $type, name: $name})-[:HAS_RULE]->(r:RuleNode)
+            RETURN DISTINCT r.id AS id, r.expression AS expr, p.policyline AS lines, p.name AS pname
+            """,
+            type=policy_type,
+            name=policy_name,
+        )
+        matched_ids = set()
+
+        for role_name, project_id in pairs:
+            if not role_name or not project_id:
+                continue
+            if role_name.lower() == "admin":
+                continue
+            result = read(
+                driver,
                 """
                 MATCH (p:PolicyNode {type: $type, name: $name})-[:HAS_RULE]->(r:RuleNode)
-                RETURN DISTINCT r.id AS id, r.expression AS expr, p.policyline AS lines, p.name AS pname
+                MATCH (r)-[rel_role]->(role:ConditionNode {type: 'role', name: $role})
+                WHERE type(rel_role) STARTS WITH 'REQUIRES_ROLE'
+                MATCH (r)-[rel_proj]->(proj:ConditionNode {type: 'project', name: $project})
+                WHERE type(rel_proj) STARTS WITH 'REQUIRES_PROJECT'
+                RETURN DISTINCT r.id AS id
                 """,
                 type=policy_type,
                 name=policy_name,
+                role=role_name,
+                project=project_id,
             )
-            all_rules_list = list(all_rules)
-            matched_ids = set()
-
-            for role_name, project_id in pairs:
-                if not role_name or not project_id:
-                    continue
-                if role_name.lower() == "admin":
-                    continue
-                result = session.run(
-                    """
-                    MATCH (p:PolicyNode {type: $type, name: $name})-[:HAS_RULE]->(r:RuleNode)
-                    MATCH (r)-[rel_role]->(role:ConditionNode {type: 'role', name: $role})
-                    WHERE type(rel_role) STARTS WITH 'REQUIRES_ROLE'
-                    MATCH (r)-[rel_proj]->(proj:ConditionNode {type: 'project', name: $project})
-                    WHERE type(rel_proj) STARTS WITH 'REQUIRES_PROJECT'
-                    RETURN DISTINCT r.id AS id
-                    """,
-                    type=policy_type,
-                    name=policy_name,
-                    role=role_name,
-                    project=project_id,
-                )
-                matched_ids.update(record["id"] for record in result)
-
-            for record in all_rules_list:
-                if record["id"] in matched_ids:
-                    continue
-                policy_display = f"{policy_type}:{policy_name}"
-                rule_expr = (record["expr"] or "").strip() or "(rule expression missing)"
-                rule_expr = _replace_project_ids(rule_expr, project_map)
-                reporter.report(
-                    "10",
-                    policy_name=format_policy_rule(policy_display, record["lines"]),
-                    api=policy_display,
-                    rule=rule_expr,
-                )
-                total += 1
+            matched_ids.update(record["id"] for record in result)
+
+        for record in all_rules_list:
+            if record["id"] in matched_ids:
+                continue
+            policy_display = f"{policy_type}:{policy_name}"
+            rule_expr = (record["expr"] or "").strip() or "(rule expression missing)"
+            rule_expr = _replace_project_ids(rule_expr, project_map)
+            reporter.report(
+                "10",
+                policy_name=format_policy_rule(policy_display, record["lines"]),
+                api=policy_display,
+                rule=rule_expr,
+            )
+            total += 1
 
     return total
 
@@ -329,13 +372,17 @@ def check_untracked_policies(driver, summary: Counter, reporter: PolicyCheckRepo
 
 def main() -> None:
     args = parse_args()
-    user_map, role_map = load_rolegrant(args.rolegrant_file)
+    # 常驻检测服务中 API 目录可能已更新，解析结果按次运行缓存
+    normalize_api.cache_clear()
+    parse_policy_key.cache_clear()
+    user_map, role_map, project_map = load_identity(
+        args.identity_snapshot, args.rolegrant_file, args.projectinfo_file
+    )
     audit_rows = load_audit_rows(args.audit_file)
     temp_rows = build_temp_rows(audit_rows, user_map, role_map)
     write_temp_file(args.temp_out, temp_rows)
 
     summary = summarize(temp_rows)
-    project_map = load_project_map(args.projectinfo_file)
     print_summary(summary, project_map)
 
     driver = connect(args.neo4j_uri, args.neo4j_user, args.neo4j_password)
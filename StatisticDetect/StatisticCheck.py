@@ -10,8 +10,6 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Any
 
-from neo4j import GraphDatabase
-
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
@@ -20,7 +18,10 @@ if str(ROOT_DIR) not in sys.path:
 # 如果在宿主机或其他路径执行，可通过 --perm-file 手动指定。
 PERM_FILE = Path("/root/policy-fileparser/data/assistfile/sensitive_permissions.csv")
 
+from Tools.ApiCatalog import load_catalog
 from Tools.CheckOutput import PolicyCheckReporter
+from Tools.Neo4jDriver import get_driver, group_records, read
+from Tools.PolicyModel import Condition, Unit
 
 
 def parse_multi_values(raw: str) -> List[str]:
@@ -45,11 +46,21 @@ def wrap_rule_expressions(expressions: List[str]) -> str:
 
 
 def extract_policy_name(entry: Dict[str, str]) -> str:
-    """从 CSV 记录中提取策略名称字段。"""
+    """
+    从 CSV 记录中提取策略名称字段。
+
+    取值不是 "type:name" 形式（如 "GET /v3/users" 或 API 名称 "List users"）时，
+    经 API 目录（Tools/ApiCatalog）查找对应的策略名，查不到则原样返回。
+    """
     for key in ("policy_name", "api_name", "API名称"):
         value = entry.get(key)
         if value:
-            return value.strip()
+            value = value.strip()
+            if ":" not in value:
+                policies = load_catalog().resolve(value)
+                if policies:
+                    return policies[0]
+            return value
     return ""
 
 
@@ -74,10 +85,7 @@ def parse_args() -> argparse.Namespace:
 
 def connect(uri: str, user: str, password: str):
     try:
-        driver = GraphDatabase.driver(uri, auth=(user, password))
-        with driver.session() as session:
-            session.run("RETURN 1")
-        return driver
+        return get_driver(uri, user, password)
     except Exception as exc:
         print(f"✗ Neo4j 连接失败: {exc}")
         return None
@@ -276,6 +284,8 @@ def check_rule_subsets(session, reporter: PolicyCheckReporter) -> int:
     """
     错误码 9：同一 Policy 下，存在 Rule 的条件集合为另一 Rule 条件集合的子集（条件 type/name 均一致）。
     子集 Rule 视为重复，应删除。
+
+    结果按策略名排序后逐组消费，同一时刻只在内存中保留一个策略的规则。
     """
     total = 0
     result = session.run(
@@ -284,48 +294,43 @@ def check_rule_subsets(session, reporter: PolicyCheckReporter) -> int:
         OPTIONAL MATCH (r)-[:REQUIRES_ROLE|REQUIRES_SYSTEM_SCOPE|REQUIRES_PROJECT_ID|REQUIRES_USER_ID|REQUIRES_DOMAIN_ID|REQUIRES_TOKEN_DOMAIN_ID]->(c:ConditionNode)
         WITH p, r, collect({type:c.type, name:c.name}) AS conds
         RETURN p.name AS policy, p.policyline AS lines, r.expression AS expr, conds
+        ORDER BY policy
         """
     )
 
-    policies: Dict[str, Dict[str, Any]] = {}
-    for record in result:
-        policy = record["policy"]
-        if policy not in policies:
-            policies[policy] = {"lines": record["lines"], "rules": []}
-        conds = [
-            {"type": (c.get("type") or "").strip(), "name": (c.get("name") or "").strip()}
-            for c in (record["conds"] or [])
-            if c is not None
-        ]
-        policies[policy]["rules"].append(
-            {
-                "expr": (record["expr"] or "").strip(),
-                "conds": conds,
-            }
-        )
-
-    def is_subset(a: List[Dict[str, str]], b: List[Dict[str, str]]) -> bool:
-        # 判断 a 是否是 b 的子集（按 type+name 匹配）
-        set_b = {(c["type"], c["name"]) for c in b}
-        return all((c["type"], c["name"]) in set_b for c in a)
+    for policy, records in group_records(result, "policy"):
+        lines = records[0]["lines"]
+        rules = []
+        for record in records:
+            # 条件实例全局共享，子集判断即 frozenset 比较（按 type+name 匹配）
+            conds = Unit(
+                Condition.of((c.get("type") or "").strip(), (c.get("name") or "").strip())
+                for c in (record["conds"] or [])
+                if c is not None
+            )
+            rules.append(
+                {
+                    "expr": (record["expr"] or "").strip(),
+                    "conds": conds,
+                    "cond_set": conds.condition_set,
+                }
+            )
 
-    reported = set()
-    for policy, info in policies.items():
-        rules = info["rules"]
+        reported = set()
         for i in range(len(rules)):
             for j in range(len(rules)):
                 if i == j:
                     continue
                 a = rules[i]
                 b = rules[j]
-                if a["conds"] and is_subset(a["conds"], b["conds"]):
-                    key = (policy, a["expr"], b["expr"])
+                if a["conds"] and a["cond_set"] <= b["cond_set"]:
+                    key = (a["expr"], b["expr"])
                     if key in reported:
                         continue
                     reported.add(key)
                     reporter.report(
                         "9",
-                        policy_name=format_policy_rule(policy, info["lines"]),
+                        policy_name=format_policy_rule(policy, lines),
                         fault_info="Delete Repeat Condition",
                         rule=a["expr"] or "(rule expression missing)",
                     )
@@ -340,11 +345,11 @@ def main() -> None:
         return
     reporter = PolicyCheckReporter()
     entries = load_sensitive_entries(args.perm_file)
+    count = read(driver, "MATCH (p:PolicyNode) RETURN count(p) as c")[0]["c"]
+    if count == 0:
+        print("Neo4j 中暂无策略节点。")
+        return
     with driver.session() as session:
-        count = session.run("MATCH (p:PolicyNode) RETURN count(p) as c").single()["c"]
-        if count == 0:
-            print("Neo4j 中暂无策略节点。")
-            return
         total = 0
         total += check_wildcard_roles(session, reporter)
         total += check_empty_rules(session, reporter)
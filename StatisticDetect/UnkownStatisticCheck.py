@@ -9,15 +9,15 @@ import json
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Set
-
-from neo4j import GraphDatabase
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from Tools.CheckOutput import PolicyCheckReporter
+from Tools.IdentitySnapshot import SNAPSHOT_PATH, load_identity_model
+from Tools.Neo4jDriver import get_driver, group_records
 
 DEFAULT_PROJECTINFO = Path("/root/policy-fileparser/data/assistfile/projectinfo.csv")
 DEFAULT_OUTPUT_DIR = Path("/root/policy-fileparser/data/assistfile")
@@ -31,16 +31,22 @@ DEFAULT_ROLE_LEVELS = {
 
 def connect(uri: str, user: str, password: str):
     try:
-        driver = GraphDatabase.driver(uri, auth=(user, password))
-        with driver.session() as session:
-            session.run("RETURN 1")
-        return driver
+        return get_driver(uri, user, password)
     except Exception as exc:
         print(f"✗ Neo4j 连接失败: {exc}")
         return None
 
 
-def load_project_map(path: Path) -> Dict[str, str]:
+def load_project_map(path: Optional[Path], snapshot_path: Optional[str] = None) -> Dict[str, str]:
+    """
+    项目 ID -> 项目名：显式传入 --identity-snapshot，或未显式传入 --project-map 时读取快照
+    （快照不存在则退回 projectinfo.csv）；显式指定了 --project-map 而未指定快照时只读 CSV。
+    """
+    if snapshot_path is not None or path is None:
+        identity = load_identity_model(snapshot_path or SNAPSHOT_PATH)
+        if identity is not None:
+            return identity.project_name_map()
+    path = path or DEFAULT_PROJECTINFO
     mapping = {}
     if not path.exists():
         print(f"⚠ projectinfo.csv 不存在: {path}")
@@ -119,7 +125,12 @@ def handle_roles_command(args) -> None:
     print(json.dumps(levels, ensure_ascii=False, indent=2))
 
 
-def collect_policy_stats(session, project_map: Dict[str, str]) -> Dict[str, Any]:
+def iter_policy_stats(session, project_map: Dict[str, str]) -> Iterator[Tuple[str, Any, List[Dict[str, Any]]]]:
+    """
+    按 API 分组逐个产出 (api, policyline, entries)，entries 为该 API 在各项目下的角色集合。
+
+    查询结果按 API 排序后流式消费，同一时刻只保留一个 API 的记录；没有角色条件的 API 不产出。
+    """
     result = session.run(
         """
         MATCH (p:PolicyNode)-[:HAS_RULE]->(r:RuleNode)
@@ -130,42 +141,36 @@ def collect_policy_stats(session, project_map: Dict[str, str]) -> Dict[str, Any]
                r.id AS rule_id,
                collect(DISTINCT role.name) AS roles,
                collect(DISTINCT proj.name) AS projects
+        ORDER BY api
         """
     )
 
-    stats: Dict[str, Dict[str, Any]] = {}
-    line_map: Dict[str, Any] = {}
-
-    for record in result:
-        api = record["api"]
-        roles = [r for r in (record["roles"] or []) if r]
-        projects = [p for p in (record["projects"] or []) if p]
-        if not roles:
-            continue
-        line_map.setdefault(api, record["lines"])
-
-        project_ids = projects or ["default"]
-        for project_id in project_ids:
-            project_name = project_map.get(project_id, project_id)
-            key = f"{api}@@{project_name}"
-            entry = stats.setdefault(
-                key,
-                {
-                    "api": api,
-                    "project_name": project_name,
-                    "high_roles": set(),
-                    "low_roles": set(),
-                },
-            )
-            entry["roles"] = entry.get("roles", set())
-            entry["roles"].update(roles)
-
-    return {"stats": stats, "lines": line_map}
-
-
-def compute_counts(stats: Dict[str, Any], high_set: Set[str], low_set: Set[str]):
+    for api, records in group_records(result, "api"):
+        entries: Dict[str, Dict[str, Any]] = {}
+        lines = None
+        for record in records:
+            roles = [r for r in (record["roles"] or []) if r]
+            projects = [p for p in (record["projects"] or []) if p]
+            if not roles:
+                continue
+            if not entries:
+                lines = record["lines"]
+
+            project_ids = projects or ["default"]
+            for project_id in project_ids:
+                project_name = project_map.get(project_id, project_id)
+                entry = entries.setdefault(
+                    project_name,
+                    {"api": api, "project_name": project_name, "roles": set()},
+                )
+                entry["roles"].update(roles)
+        if entries:
+            yield api, lines, list(entries.values())
+
+
+def compute_counts(entries: Iterable[Dict[str, Any]], high_set: Set[str], low_set: Set[str]):
     rows = []
-    for entry in stats.values():
+    for entry in entries:
         roles = set(entry.get("roles", set()))
         roles.discard("admin")
         high_roles = sorted(roles & high_set)
@@ -188,7 +193,8 @@ def compute_counts(stats: Dict[str, Any], high_set: Set[str], low_set: Set[str])
     return rows
 
 
-def write_csv(rows: List[Dict[str, Any]], output_dir: Path) -> Path:
+def write_csv(rows: Iterable[Dict[str, Any]], output_dir: Path) -> Path:
+    """逐行写出统计结果；rows 可以是生成器，写出过程中不保留已写的行。"""
     output_dir.mkdir(parents=True, exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d%H%M%S")
     path = output_dir / f"RoleStatistic{ts}.csv"
@@ -218,6 +224,33 @@ def write_csv(rows: List[Dict[str, Any]], output_dir: Path) -> Path:
     return path
 
 
+def report_row(reporter: PolicyCheckReporter, row: Dict[str, Any], lines: Any) -> None:
+    api = row["api"]
+    project_name = row["project_name"]
+    high_pct = row["high_pct"]
+    low_pct = row["low_pct"]
+    high_num = row["high_num"]
+    low_num = row["low_num"]
+
+    if 80 <= low_pct < 100 and high_num > 0:
+        reporter.report(
+            "12",
+            policy_name=format_policy_rule(api, lines),
+            api=api,
+            roles=",".join(row["high_roles"]),
+            low_roles=",".join(row["low_roles"]),
+            project_name=project_name,
+        )
+    if 80 <= high_pct < 100 and low_num > 0:
+        reporter.report(
+            "13",
+            policy_name=format_policy_rule(api, lines),
+            api=api,
+            roles=",".join(row["low_roles"]),
+            project_name=project_name,
+        )
+
+
 def run_check(args) -> None:
     driver = connect(args.neo4j_uri, args.neo4j_user, args.neo4j_password)
     if not driver:
@@ -227,47 +260,24 @@ def run_check(args) -> None:
     high_set = set(role_levels.get("high_authorized", []))
     low_set = set(role_levels.get("low_authorized", []))
 
-    project_map = load_project_map(Path(args.project_map))
+    project_map = load_project_map(Path(args.project_map) if args.project_map else None, args.identity_snapshot)
 
     reporter = PolicyCheckReporter()
+
+    def iter_rows(session) -> Iterator[Dict[str, Any]]:
+        # 每个 API 统计完即写出 CSV 行并上报问题，不累积全图结果
+        for _api, lines, entries in iter_policy_stats(session, project_map):
+            for row in compute_counts(entries, high_set, low_set):
+                report_row(reporter, row, lines)
+                yield row
+
     try:
         with driver.session() as session:
-            payload = collect_policy_stats(session, project_map)
-            stats = payload["stats"]
-            line_map = payload["lines"]
+            output_path = write_csv(iter_rows(session), Path(args.output_dir))
     finally:
         driver.close()
-
-    rows = compute_counts(stats, high_set, low_set)
-    output_path = write_csv(rows, Path(args.output_dir))
     print(f"已生成: {output_path}")
 
-    for row in rows:
-        api = row["api"]
-        project_name = row["project_name"]
-        high_pct = row["high_pct"]
-        low_pct = row["low_pct"]
-        high_num = row["high_num"]
-        low_num = row["low_num"]
-
-        if 80 <= low_pct < 100 and high_num > 0:
-            reporter.report(
-                "12",
-                policy_name=format_policy_rule(api, line_map.get(api)),
-                api=api,
-                roles=",".join(row["high_roles"]),
-                low_roles=",".join(row["low_roles"]),
-                project_name=project_name,
-            )
-        if 80 <= high_pct < 100 and low_num > 0:
-            reporter.report(
-                "13",
-                policy_name=format_policy_rule(api, line_map.get(api)),
-                api=api,
-                roles=",".join(row["low_roles"]),
-                project_name=project_name,
-            )
-
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="高低权限错配统计检测")
@@ -277,7 +287,12 @@ def parse_args() -> argparse.Namespace:
     check_parser.add_argument("--neo4j-uri", default="bolt://localhost:7687")
     check_parser.add_argument("--neo4j-user", default="neo4j")
     check_parser.add_argument("--neo4j-password", default="Password")
-    check_parser.add_argument("--project-map", default=str(DEFAULT_PROJECTINFO))
+    check_parser.add_argument("--project-map", default=None, help=f"projectinfo.csv 路径，默认 {DEFAULT_PROJECTINFO}")
+    check_parser.add_argument(
+        "--identity-snapshot",
+        default=None,
+        help=f"身份快照路径，默认 {SNAPSHOT_PATH}；未显式传入 --project-map 时，快照存在则优先于 projectinfo.csv",
+    )
     check_parser.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_DIR))
     check_parser.add_argument("--role-config", default=str(DEFAULT_ROLE_CONFIG))
     check_parser.set_defaults(func=run_check)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+API ↔ Policy 目录索引：Componentapiparser 各组件的 *merge.py 匹配完成后，把
+策略名 → (服务, HTTP 方法, URL 模板, 动作名, API 名称) 写入同一个 SQLite 文件，
+检测脚本一次性载入内存字典，按策略名或 "METHOD /url" 做哈希查找，不再依赖各组件的 Excel 结果。
+
+用法：
+  python /root/Tools/ApiCatalog.py show
+  python /root/Tools/ApiCatalog.py lookup identity:list_users
+  python /root/Tools/ApiCatalog.py lookup "GET /v3/users/{user_id}"
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+CATALOG_PATH = os.environ.get(
+    "API_CATALOG_PATH", "/root/policy-fileparser/data/assistfile/api_catalog.sqlite3"
+)
+
+HTTP_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE")
+# "POST /servers/{server_id}/action (unlock)" -> 方法、路径、可选动作名
+ENDPOINT_PATTERN = re.compile(
+    r"^\s*(%s)\s+(\S+?)\s*(?:\(\s*([^)]*?)\s*\))?\s*$" % "|".join(HTTP_METHODS), re.IGNORECASE
+)
+# 端点键中去掉的版本前缀：/v3、/v2.1、/v2.0 以及紧随其后的 /{project_id}（或请求中的 32 位项目 ID）
+VERSION_PREFIX = re.compile(r"^/v\d+(?:\.\d+)?(?:/(?:\{(?:project_id|tenant_id)\}|[0-9a-f]{32}))?(?=/|$)")
+PLACEHOLDER = re.compile(r"\{[^}]*\}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS api_catalog (
+    service TEXT, policy TEXT, method TEXT, url TEXT, action TEXT, api_name TEXT, endpoint TEXT
+);
+CREATE INDEX IF NOT EXISTS api_catalog_policy ON api_catalog (policy);
+CREATE INDEX IF NOT EXISTS api_catalog_endpoint ON api_catalog (endpoint);
+CREATE TABLE IF NOT EXISTS services (service TEXT PRIMARY KEY, count INTEGER, updated_at REAL);
+"""
+
+
+class Endpoint(NamedTuple):
+    service: str
+    method: str
+    url: str
+    action: str
+    api_name: str
+
+
+def endpoint_key(method: str, url: str, action: str = "") -> str:
+    """
+    生成端点键：方法大写、去空白与查询串、去版本前缀与末尾斜杠，占位符统一为 {}。
+    例如 "get", "/v3/users/{user_id}" -> "GET /users/{}"
+    """
+    path = re.sub(r"\s+", "", url or "").split("?", 1)[0]
+    path = VERSION_PREFIX.sub("", path).rstrip("/") or "/"
+    key = f"{(method or '').strip().upper()} {PLACEHOLDER.sub('{}', path)}"
+    action = (action or "").strip()
+    return f"{key} ({action})" if action else key
+
+
+def parse_endpoint(value: str) -> Optional[Tuple[str, str, str]]:
+    """解析 "METHOD /url [(action)]"，不是端点形式时返回 None。"""
+    match = ENDPOINT_PATTERN.match(value or "")
+    if not match:
+        return None
+    return match.group(1).upper(), match.group(2), match.group(3) or ""
+
+
+# ---------------------------------------------------------------------------
+# 写入（供 Componentapiparser/*merge.py 调用）
+# ---------------------------------------------------------------------------
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def write_service(service: str, rows: Iterable[Dict[str, str]], path: str = CATALOG_PATH) -> int:
+    """
+    用 rows 整体替换 service 的目录记录，返回写入条数。
+
+    rows 中每项包含 policy / method / url，可选 action / api_name；策略名为空的行被忽略。
+    """
+    records = []
+    for row in rows:
+        policy = (row.get("policy") or "").strip()
+        if not policy:
+            continue
+        method = (row.get("method") or "").strip().upper()
+        url = (row.get("url") or "").strip()
+        action = (row.get("action") or "").strip()
+        records.append((
+            service, policy, method, url, action, (row.get("api_name") or "").strip(),
+            endpoint_key(method, url, action),
+        ))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM api_catalog WHERE service = ?", (service,))
+            conn.executemany(
+                "INSERT INTO api_catalog (service, policy, method, url, action, api_name, endpoint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO services (service, count, updated_at) VALUES (?, ?, ?)",
+                (service, len(records), time.time()),
+            )
+    finally:
+        conn.close()
+    return len(records)
+
+
+# ---------------------------------------------------------------------------
+# 查询（供检测脚本调用）
+# ---------------------------------------------------------------------------
+
+class ApiCatalog:
+    """
+    目录的内存索引：by_policy 以策略名为键，by_endpoint 以端点键为键，by_api_name 以文档中的 API 名称为键；
+    带具体 ID 的请求路径（/users/abc123）按 (方法, 动作, 段数) 分桶后与 URL 模板逐段比对。
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str, str, str, str]] = ()) -> None:
+        self.by_policy: Dict[str, List[Endpoint]] = defaultdict(list)
+        self.by_endpoint: Dict[str, List[str]] = defaultdict(list)
+        self.by_api_name: Dict[str, List[str]] = defaultdict(list)
+        self._templates: Dict[Tuple[str, str, int], List[Tuple[List[str], str]]] = defaultdict(list)
+        for service, policy, method, url, action, api_name in rows:
+            self.by_policy[policy].append(Endpoint(service, method, url, action, api_name))
+            key = endpoint_key(method, url, action)
+            if policy not in self.by_endpoint[key]:
+                self.by_endpoint[key].append(policy)
+            if api_name and policy not in self.by_api_name[api_name]:
+                self.by_api_name[api_name].append(policy)
+        for key in self.by_endpoint:
+            method, path, action = self._split_key(key)
+            segments = path.split("/")
+            self._templates[(method, action, len(segments))].append((segments, key))
+        # 固定段越多的模板越先比对，例如 /users/{}/password 优先于 /users/{}/{}
+        for templates in self._templates.values():
+            templates.sort(key=lambda item: item[0].count("{}"))
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self.by_policy.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.by_policy)
+
+    def endpoints(self, policy: str) -> List[Endpoint]:
+        return list(self.by_policy.get((policy or "").strip(), ()))
+
+    @staticmethod
+    def _split_key(key: str) -> Tuple[str, str, str]:
+        method, _, rest = key.partition(" ")
+        path, _, action = rest.partition(" ")
+        return method, path, action
+
+    def _match_template(self, key: str) -> List[str]:
+        method, path, action = self._split_key(key)
+        segments = path.split("/")
+        for template, template_key in self._templates.get((method, action, len(segments)), ()):
+            if all(t == s or t == "{}" for t, s in zip(template, segments)):
+                return self.by_endpoint[template_key]
+        return []
+
+    def resolve(self, value: str) -> List[str]:
+        """
+        把审计日志或 CSV 中的 API 取值解析为策略名列表：
+        已是策略名（目录中存在）时原样返回；"METHOD /url" 形式按端点键查找；
+        其余取值按 API 名称（如 "List users"）查找；都不命中时返回空列表。
+        """
+        value = (value or "").strip()
+        if not value:
+            return []
+        if value in self.by_policy:
+            return [value]
+        parsed = parse_endpoint(value)
+        if parsed is None:
+            return list(self.by_api_name.get(value, ()))
+        key = endpoint_key(*parsed)
+        return list(self.by_endpoint.get(key) or self._match_template(key))
+
+
+_loaded: Dict[str, Tuple[int, ApiCatalog]] = {}
+
+
+def load_catalog(path: str = CATALOG_PATH) -> ApiCatalog:
+    """
+    读取整个目录（单次查询）并按文件 mtime 缓存，常驻进程中目录更新后自动重新载入；
+    文件不存在或损坏时返回空目录。
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return ApiCatalog()
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT service, policy, method, url, action, api_name FROM api_catalog"
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        print(f"⚠ API 目录读取失败: {path}: {exc}", file=sys.stderr)
+        return ApiCatalog()
+    catalog = ApiCatalog(rows)
+    _loaded[path] = (mtime, catalog)
+    return catalog
+
+
+def describe(path: str) -> str:
+    if not os.path.exists(path):
+        return f"API 目录不存在: {path}"
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        services = conn.execute("SELECT service, count, updated_at FROM services ORDER BY service").fetchall()
+    finally:
+        conn.close()
+    lines = [f"API 目录: {path}"]
+    for service, count, updated_at in services:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(updated_at or 0))
+        lines.append(f"  {service:<10} {count:>5} 条  更新于 {stamp}")
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="API ↔ Policy 目录索引")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="目录文件路径，默认 %(default)s")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("show", help="查看各服务的记录数与更新时间")
+    lookup_parser = sub.add_parser("lookup", help="按策略名或 \"METHOD /url\" 查询")
+    lookup_parser.add_argument("value")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "show":
+        print(describe(args.catalog))
+        return
+    catalog = load_catalog(args.catalog)
+    policies = catalog.resolve(args.value)
+    if not policies:
+        print(f"未在 API 目录中找到: {args.value}")
+        sys.exit(1)
+    for policy in policies:
+        for endpoint in catalog.endpoints(policy):
+            action = f" ({endpoint.action})" if endpoint.action else ""
+            print(f"{policy}\t{endpoint.service}\t{endpoint.method} {endpoint.url}{action}\t{endpoint.api_name}")
+
+
+if __name__ == "__main__":
+    main()
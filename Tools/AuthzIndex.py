@@ -0,0 +1,659 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+编译后的授权索引：回答"角色 R 在项目 P（系统范围 S、域 D）下能否调用 API A"，不再逐次执行 Cypher 遍历。
+
+策略文件经 policypreprocess / PolicyRuleParser 解析后，由 compile_rule 展开为授权单元（DNF，结果存入解析缓存），
+每个单元按 (role, project, system_scope, domain) 四个维度编译为一个键：
+  - 字面值（role:admin、system_scope:all、project_id:<id>）     -> 该值（role 忽略大小写，项目名换成项目 ID）
+  - 模板值（project_id:%(target.project.id)s 等，依赖请求目标） -> 通配桶 ANY：请求该维度非空即满足
+  - 未出现的维度                                               -> None：不限制
+每个 API 保存 {键: 单元签名} 与出现过的"形状"（各维度取字面值/通配/不限制的组合，通常 1~3 种），
+查询时按形状拼出键做字典查找，单次查询为常数时间。
+
+同一维度要求多个不同值、含 user / not 条件的单元无法编码为单个键，按单元逐条判断：
+  - user_id:%(...)s 为属主检查，取决于具体请求目标，索引按不满足处理；user_id:<字面值> 与请求的 user 比较；
+  - not 子表达式整体取反：其展开出的单元都不满足时条件成立（not (A and B) 只要 A、B 有一个不满足即成立）。
+"!" 编译为拒绝，"@" 与空表达式编译为无条件允许。字段不受支持的检查（如 token.domain.id:...）及对属主检查的取反
+无法判定，所在单元按拒绝处理并单独统计。解析失败的策略不编入索引；索引中不存在的 API 查询结果为拒绝。
+
+用法：
+  python /root/Tools/AuthzIndex.py check identity:create_project --role managerA --project demo-project
+  python /root/Tools/AuthzIndex.py check identity:get_consumer --role reader --system-scope all
+  python /root/Tools/AuthzIndex.py audit --audit-file rbac_audit_keystone.csv
+  python /root/Tools/AuthzIndex.py show
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Tools import IdentitySnapshot as snapshot_store  # noqa: E402
+from Tools.PolicyModel import Unit  # noqa: E402
+
+DEFAULT_POLICY_FILE = "/etc/openstack/policies/policy.yaml"
+DEFAULT_AUDIT_FILE = "/root/policy-fileparser/data/assistfile/rbac_audit_keystone.csv"
+DEFAULT_ROLEGRANT_FILE = "/root/policy-fileparser/data/assistfile/rolegrant.csv"
+DEFAULT_PROJECTINFO_FILE = "/root/policy-fileparser/data/assistfile/projectinfo.csv"
+# 容器内 fileparser 挂载为 policy-fileparser
+FILEPARSER_DIRS = ("policy-fileparser", "fileparser")
+
+# 编码维度（顺序即键中的位置）
+DIMENSIONS = ("role", "project", "system_scope", "domain")
+UNCONSTRAINED, LITERAL, WILDCARD = 0, 1, 2
+ANY = "%(any)s"
+# Keystone 默认的角色蕴含关系（token 中会自动带上被蕴含的角色）
+IMPLIED_ROLES: Dict[str, Tuple[str, ...]] = {"admin": ("member",), "member": ("reader",), "manager": ("member",)}
+TEMPLATE = re.compile(r"^%\(.+\)s$")
+# 授权单元中的特殊键：NOT_KEY 为取反组列表（每组是被取反子表达式展开出的单元），
+# UNKNOWN_KEY 为无法判定的检查原文；两者都不是编码维度，所在单元逐条判断
+NOT_KEY, UNKNOWN_KEY = "not", "unknown"
+# compile_rule 展开规则的版本，修改后递增，使解析缓存中的旧结果失效
+COMPILE_VERSION = 1
+
+Key = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+Shape = Tuple[int, int, int, int]
+
+
+class Request(NamedTuple):
+    """一次授权查询；roles 为请求者在该项目下的全部角色。"""
+
+    api: str
+    roles: Tuple[str, ...]
+    project: str = ""
+    system_scope: str = ""
+    domain: str = ""
+    user: str = ""
+
+
+class ApiEntry:
+    """单个 API 的编译结果。"""
+
+    __slots__ = ("grants", "shapes", "complex_units", "unknown_units")
+
+    def __init__(self) -> None:
+        self.grants: Dict[Key, str] = {}
+        self.shapes: Tuple[Shape, ...] = ()
+        self.complex_units: List[Tuple[Dict[str, Any], str]] = []
+        # 含无法判定条件的单元签名：不参与查询（按拒绝处理），供 check / audit 提示
+        self.unknown_units: List[str] = []
+
+
+def _is_template(value: str) -> bool:
+    return bool(TEMPLATE.match(value))
+
+
+def _project_key(value: str, project_ids: Dict[str, str]) -> str:
+    value = (value or "").strip()
+    return project_ids.get(value, value)
+
+
+class AuthzIndex:
+    """
+    API -> ApiEntry 的内存索引。
+
+    project_map 为 项目 ID -> 项目名（身份快照或 projectinfo.csv），用于把策略和查询中的项目名统一为项目 ID；
+    implied_roles 为角色蕴含关系，查询时请求角色按其传递闭包展开（传入空字典表示不展开）。
+    """
+
+    def __init__(self, project_map: Optional[Dict[str, str]] = None,
+                 implied_roles: Optional[Dict[str, Sequence[str]]] = None) -> None:
+        self.apis: Dict[str, ApiEntry] = {}
+        self.project_ids: Dict[str, str] = {name: pid for pid, name in (project_map or {}).items()}
+        self.implied = _role_closure(IMPLIED_ROLES if implied_roles is None else implied_roles)
+        self.unit_count = 0
+
+    def __len__(self) -> int:
+        return len(self.apis)
+
+    def __contains__(self, api: str) -> bool:
+        return api in self.apis
+
+    # ------------------------------------------------------------------
+    # 编译
+    # ------------------------------------------------------------------
+
+    def add_policy(self, api: str, units: Iterable[Any]) -> None:
+        """
+        加入一条策略的授权单元（compile_rule 的结果）；也接受 PolicyRuleParser 的最小匹配单元
+        （{'role': [...], 'not_role': [...]} 字典或 Tools.PolicyModel.Unit），其中的 not_* 条件见 _from_parser_unit。
+        units 为空表示拒绝。
+        """
+        entry = self.apis.setdefault(sys.intern(api), ApiEntry())
+        shapes = set(entry.shapes)
+        for unit in units:
+            unit = _from_parser_unit(unit.to_dict() if isinstance(unit, Unit) else unit)
+            signature = _signature(unit)
+            self.unit_count += 1
+            if unit.get(UNKNOWN_KEY):
+                entry.unknown_units.append(signature)
+                continue
+            encoded = self._encode(unit)
+            if encoded is None:
+                entry.complex_units.append((unit, signature))
+                continue
+            shape, key = encoded
+            shapes.add(shape)
+            entry.grants.setdefault(key, signature)
+        # 约束越多的形状越先尝试，explain 给出最具体的匹配单元
+        entry.shapes = tuple(sorted(shapes, key=lambda shape: -sum(1 for code in shape if code)))
+
+    def _encode(self, unit: Dict[str, Any]) -> Optional[Tuple[Shape, Key]]:
+        """把单元编码为 (形状, 键)；无法编码（多值、user、not 等条件）时返回 None。"""
+        if any(key not in DIMENSIONS for key, values in unit.items() if values):
+            return None
+        shape: List[int] = []
+        key: List[Optional[str]] = []
+        for dim in DIMENSIONS:
+            values = {value for value in unit.get(dim, ()) if value}
+            if not values:
+                shape.append(UNCONSTRAINED)
+                key.append(None)
+                continue
+            if len(values) > 1:
+                return None
+            value = values.pop()
+            if _is_template(value):
+                if dim == "role":
+                    return None
+                shape.append(WILDCARD)
+                key.append(ANY)
+                continue
+            shape.append(LITERAL)
+            key.append(self._literal(dim, value))
+        return tuple(shape), tuple(key)  # type: ignore[return-value]
+
+    def _literal(self, dim: str, value: str) -> str:
+        if dim == "role":
+            return sys.intern(value.strip().lower())
+        if dim == "project":
+            return sys.intern(_project_key(value, self.project_ids))
+        return sys.intern(value.strip())
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def expand_roles(self, roles: Sequence[str]) -> List[str]:
+        """请求角色小写化并加入被蕴含的角色，保持顺序去重。"""
+        expanded: Dict[str, None] = {}
+        for role in roles:
+            role = (role or "").strip().lower()
+            if role:
+                expanded.update(dict.fromkeys(self.implied.get(role, (role,))))
+        return list(expanded)
+
+    def _request_values(self, project: str, system_scope: str, domain: str) -> Tuple[str, str, str]:
+        return _project_key(project, self.project_ids), (system_scope or "").strip(), (domain or "").strip()
+
+    def explain(self, api: str, roles: Sequence[str], project: str = "", system_scope: str = "",
+                domain: str = "", user: str = "") -> Optional[str]:
+        """返回使请求被允许的单元签名（如 "role:admin AND system_scope:all"），拒绝时返回 None。"""
+        entry = self.apis.get(api)
+        if entry is None:
+            return None
+        roles = self.expand_roles(roles)
+        project, system_scope, domain = self._request_values(project, system_scope, domain)
+        rest = (project, system_scope, domain)
+        grants = entry.grants
+        for shape in entry.shapes:
+            tail: List[Optional[str]] = []
+            for code, value in zip(shape[1:], rest):
+                if code == UNCONSTRAINED:
+                    tail.append(None)
+                elif not value:
+                    break
+                else:
+                    tail.append(value if code == LITERAL else ANY)
+            else:
+                if shape[0] == UNCONSTRAINED:
+                    found = grants.get((None, *tail))  # type: ignore[arg-type]
+                    if found is not None:
+                        return found
+                    continue
+                for role in roles:
+                    found = grants.get((role, *tail))  # type: ignore[arg-type]
+                    if found is not None:
+                        return found
+        for unit, signature in entry.complex_units:
+            if _match_unit(unit, set(roles), project, system_scope, domain, (user or "").strip(),
+                           self.project_ids):
+                return signature
+        return None
+
+    def undetermined(self, api: str) -> List[str]:
+        """该 API 中含无法判定条件的单元签名（这些单元按拒绝处理）。"""
+        entry = self.apis.get(api)
+        return list(entry.unknown_units) if entry is not None else []
+
+    def allowed(self, api: str, roles: Sequence[str], project: str = "", system_scope: str = "",
+                domain: str = "", user: str = "") -> bool:
+        return self.explain(api, roles, project, system_scope, domain, user) is not None
+
+    def check_many(self, requests: Iterable[Request]) -> Iterator[bool]:
+        """批量查询：相同的请求只计算一次（审计日志中同一用户反复调用同一 API 的情况占绝大多数）。"""
+        memo: Dict[Request, bool] = {}
+        for request in requests:
+            result = memo.get(request)
+            if result is None:
+                result = memo[request] = self.allowed(*request)
+            yield result
+
+    def describe(self) -> str:
+        shapes = sum(len(entry.shapes) for entry in self.apis.values())
+        keys = sum(len(entry.grants) for entry in self.apis.values())
+        complex_units = sum(len(entry.complex_units) for entry in self.apis.values())
+        unknown_units = sum(len(entry.unknown_units) for entry in self.apis.values())
+        return (
+            f"API {len(self.apis)} 个，最小单元 {self.unit_count} 个，"
+            f"编码键 {keys} 个（形状 {shapes} 种次），逐条判断的单元 {complex_units} 个，"
+            f"无法判定（按拒绝处理）的单元 {unknown_units} 个"
+        )
+
+
+def _role_closure(implied_roles: Dict[str, Sequence[str]]) -> Dict[str, Tuple[str, ...]]:
+    """角色 -> (自身, 直接或间接蕴含的角色...)。"""
+    graph = {role.lower(): [item.lower() for item in items] for role, items in implied_roles.items()}
+    closure: Dict[str, Tuple[str, ...]] = {}
+    for role in graph:
+        seen = [role]
+        for current in seen:
+            seen.extend(item for item in graph.get(current, ()) if item not in seen)
+        closure[role] = tuple(seen)
+    return closure
+
+
+def _signature(unit: Dict[str, Any]) -> str:
+    """
+    普通条件与 policy_parser.unit_signature 一致，如 "role:admin AND system_scope:all"；
+    取反组记为 "NOT (...)"，无法判定的检查记为 "?<原文>"；空单元为 "@"。
+    """
+    plain = Unit.from_dict({key: values for key, values in unit.items() if key not in (NOT_KEY, UNKNOWN_KEY)})
+    parts = [plain.signature] if plain else []
+    for group in unit.get(NOT_KEY, ()):
+        parts.append(f"NOT ({' OR '.join(_signature(inner) for inner in group)})")
+    parts.extend(f"?{check}" for check in unit.get(UNKNOWN_KEY, ()))
+    return " AND ".join(parts) if parts else "@"
+
+
+def _from_parser_unit(unit: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    PolicyRuleParser 的单元把取反拆成逐条件的 not_<维度>，多个 not_* 值无法区分
+    "not (A and B)" 与 "not A and not B"：只有一个取反值时转换为取反组，多于一个时记为无法判定。
+    """
+    negated = [(key[4:], value) for key, values in unit.items() if key.startswith("not_") for value in values if value]
+    if not negated:
+        return unit
+    result = {key: values for key, values in unit.items() if not key.startswith("not_")}
+    if len(negated) == 1:
+        dim, value = negated[0]
+        result[NOT_KEY] = list(result.get(NOT_KEY, ())) + [[{dim: [value]}]]
+    else:
+        checks = [f"not {dim}:{value}" for dim, value in negated]
+        result[UNKNOWN_KEY] = list(result.get(UNKNOWN_KEY, ())) + [" and ".join(checks)]
+    return result
+
+
+def _match_value(dim: str, expected: str, actual: str, project_ids: Dict[str, str]) -> bool:
+    if _is_template(expected):
+        return bool(actual)
+    if dim == "project":
+        expected = _project_key(expected, project_ids)
+    return expected.strip() == actual
+
+
+def _match_unit(unit: Dict[str, Any], roles: set, project: str, system_scope: str, domain: str,
+                user: str, project_ids: Dict[str, str]) -> bool:
+    """逐条判断无法编码的单元（各条件为"与"关系；取反组中任一单元满足则该条件不成立）。"""
+    request = {"project": project, "system_scope": system_scope, "domain": domain, "user": user}
+    for key, values in unit.items():
+        if key == UNKNOWN_KEY:
+            if values:
+                return False
+            continue
+        if key == NOT_KEY:
+            for group in values:
+                if any(_match_unit(inner, roles, project, system_scope, domain, user, project_ids)
+                       for inner in group):
+                    return False
+            continue
+        for value in values:
+            if not value:
+                continue
+            if key == "role":
+                hit = value.strip().lower() in roles
+            elif key == "user" and _is_template(value):
+                hit = False
+            elif key in request:
+                hit = _match_value(key, value, request[key], project_ids)
+            else:
+                hit = False
+            if not hit:
+                return False
+    return True
+
+
+def _merge_units(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    merged = {key: list(values) for key, values in left.items()}
+    for key, values in right.items():
+        merged.setdefault(key, []).extend(values)
+    return merged
+
+
+def _undecidable(unit: Dict[str, Any]) -> bool:
+    """单元是否含无法判定的条件；属主检查在正向时按不满足处理，取反后则无法判定。"""
+    return bool(unit.get(UNKNOWN_KEY)) or any(_is_template(value) for value in unit.get("user", ()))
+
+
+def compile_rule(rule: Any, normalize_field: Callable[[str], Optional[str]]) -> List[Dict[str, Any]]:
+    """
+    把 oslo_policy 解析出的规则对象展开为授权单元列表（各单元为"或"关系，返回空列表表示拒绝）：
+      - TrueCheck（"@"、空表达式）为 [{}]，无条件允许；FalseCheck（"!"）为 []；
+      - and 取笛卡尔积，任一子表达式为拒绝则整体拒绝；or 合并各子表达式的单元；
+      - not 整体取反为一个取反组，被取反的子表达式含无法判定的条件时整体无法判定；
+      - role / 可映射字段的检查保留原值，其余检查（不受支持的字段、http、未定义的 rule 等）记为无法判定。
+    normalize_field 为 PolicyRuleParser._normalize_field_name。
+    """
+    from oslo_policy import _checks
+
+    if isinstance(rule, _checks.TrueCheck):
+        return [{}]
+    if isinstance(rule, _checks.FalseCheck):
+        return []
+    if isinstance(rule, _checks.AndCheck):
+        units: List[Dict[str, Any]] = [{}]
+        for sub_rule in rule.rules:
+            sub_units = compile_rule(sub_rule, normalize_field)
+            units = [_merge_units(left, right) for left in units for right in sub_units]
+            if not units:
+                return []
+        return units
+    if isinstance(rule, _checks.OrCheck):
+        return [unit for sub_rule in rule.rules for unit in compile_rule(sub_rule, normalize_field)]
+    if isinstance(rule, _checks.NotCheck):
+        inner = compile_rule(rule.rule, normalize_field)
+        if not inner:
+            return [{}]
+        if any(not unit for unit in inner):
+            return []
+        if any(_undecidable(unit) for unit in inner):
+            return [{UNKNOWN_KEY: [str(rule)]}]
+        return [{NOT_KEY: [inner]}]
+    if isinstance(rule, _checks.RoleCheck):
+        return [{"role": [rule.match]}]
+    if isinstance(rule, _checks.GenericCheck):
+        field = normalize_field(rule.kind)
+        if field is not None:
+            return [{field: [rule.match]}]
+    return [{UNKNOWN_KEY: [str(rule)]}]
+
+
+# ---------------------------------------------------------------------------
+# 由策略文件构建
+# ---------------------------------------------------------------------------
+
+def _ensure_fileparser_path() -> None:
+    for name in FILEPARSER_DIRS:
+        path = ROOT_DIR / name
+        if path.is_dir():
+            if str(path) not in sys.path:
+                sys.path.insert(0, str(path))
+            return
+
+
+def parse_policy_units(policy_paths: Sequence[str],
+                       parse_cache_path: Optional[str] = "") -> Dict[str, List[Dict[str, Any]]]:
+    """
+    读取策略文件并展开为 {策略名: 授权单元列表}，读取与规则引用替换的流程与 run_graph_pipeline.build_policy_graph 一致：
+    先提取全部文件共享的规则定义，再逐条解析并经 compile_rule 展开。
+    结果存入解析缓存（键带 COMPILE_VERSION，与策略图的最小匹配单元互不混用）；
+    parse_cache_path 为空字符串时使用默认解析缓存，None 表示不用缓存。
+    """
+    _ensure_fileparser_path()
+    from policypreprocess import process_policy_file
+    from policy_parser import PolicyRuleParser
+    from parse_cache import DEFAULT_CACHE_PATH, ParseCache, expression_key
+
+    raw_policies: Dict[str, str] = {}
+    for path in policy_paths:
+        if not os.path.exists(path):
+            print(f"⚠ 策略文件不存在: {path}", file=sys.stderr)
+            continue
+        for name, info in process_policy_file(path).items():
+            raw_policies[name] = info["expression"]
+
+    parser = PolicyRuleParser()
+    parser.extract_rule_definitions(raw_policies)
+    items = [(name, expr) for name, expr in raw_policies.items() if not parser._is_rule_definition(name, expr)]
+
+    cache = None
+    if parse_cache_path is not None:
+        cache = ParseCache.open(parse_cache_path or DEFAULT_CACHE_PATH)
+    keys = [
+        expression_key(f"authz:{COMPILE_VERSION} {parser.substitute_rule_references(expr)}") for _, expr in items
+    ] if cache else []
+    hits = cache.get_many(keys) if cache else {}
+
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    new_entries = {}
+    for index, (name, expr) in enumerate(items):
+        if cache and keys[index] in hits:
+            result[name] = hits[keys[index]][0]
+            continue
+        parser._current_policy_name = name
+        parsed = parser.parse_single_policy(name, expr)
+        if parsed is None:
+            print(f"⚠ 跳过解析失败的策略：{name}", file=sys.stderr)
+            continue
+        units = result[name] = compile_rule(parsed, parser._normalize_field_name)
+        if cache:
+            new_entries[keys[index]] = (units, [_signature(unit) for unit in units])
+    if cache:
+        cache.put_many(new_entries)
+        cache.close()
+    return result
+
+
+def build_index(policy_paths: Sequence[str], project_map: Optional[Dict[str, str]] = None,
+                parse_cache_path: Optional[str] = "",
+                implied_roles: Optional[Dict[str, Sequence[str]]] = None) -> AuthzIndex:
+    index = AuthzIndex(project_map, implied_roles)
+    for api, units in parse_policy_units(policy_paths, parse_cache_path).items():
+        index.add_policy(api, units)
+    return index
+
+
+_loaded: Dict[Tuple[Any, ...], Tuple[Tuple[int, ...], AuthzIndex]] = {}
+
+
+def load_index(policy_paths: Sequence[str], project_map: Optional[Dict[str, str]] = None) -> AuthzIndex:
+    """按策略文件 mtime 缓存编译结果，常驻进程中策略文件更新后自动重新编译。"""
+    key = (tuple(policy_paths), tuple(sorted((project_map or {}).items())))
+    mtimes = tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else -1 for path in policy_paths)
+    cached = _loaded.get(key)
+    if cached and cached[0] == mtimes:
+        return cached[1]
+    index = build_index(policy_paths, project_map)
+    _loaded[key] = (mtimes, index)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# 审计日志批量校验
+# ---------------------------------------------------------------------------
+
+def normalize_api(api: str) -> str:
+    """审计日志中的 API 统一为策略名："METHOD /url" 经 API 目录解析，策略名去掉末尾括号说明。"""
+    api = (api or "").strip()
+    if not api:
+        return ""
+    from Tools.ApiCatalog import load_catalog, parse_endpoint
+
+    if parse_endpoint(api) is not None:
+        policies = load_catalog().resolve(api)
+        if policies:
+            return policies[0]
+    return re.sub(r"\(.*\)$", "", api).strip()
+
+
+def load_identity(snapshot_path: Optional[str], rolegrant_path: Optional[str], projectinfo_path: Optional[str]
+                  ) -> Tuple[Dict[str, str], Dict[Tuple[str, str], List[str]], Dict[str, str]]:
+    """
+    (user_map, role_map, project_map)，来源的选择与 Authorization_scope_check.load_identity 相同：
+    显式传入 --identity-snapshot 或未显式指定 CSV 时优先读取身份快照，否则（或快照不存在时）读取 rolegrant.csv 与 projectinfo.csv。
+    """
+    from DynamicDetect.Authorization_scope_check import load_identity as load_detect_identity
+
+    return load_detect_identity(snapshot_path, rolegrant_path, projectinfo_path)
+
+
+def audit_requests(rows: Iterable[Dict[str, str]], user_map: Dict[str, str],
+                   role_map: Dict[Tuple[str, str], List[str]]) -> Iterator[Tuple[Dict[str, str], Request]]:
+    """把审计日志行转换为 Request（角色按 (用户名, 项目 ID) 从身份快照查找）。"""
+    api_cache: Dict[str, str] = {}
+    for row in rows:
+        raw_api = row.get("api") or ""
+        api = api_cache.get(raw_api)
+        if api is None:
+            api = api_cache[raw_api] = normalize_api(raw_api)
+        user_id = (row.get("user_id") or "").strip()
+        project_id = (row.get("project_id") or "").strip()
+        user_name = (row.get("user_name") or "").strip() or user_map.get(user_id, "")
+        roles = tuple(role_map.get((user_name, project_id), ()))
+        yield row, Request(
+            api, roles, project_id, (row.get("system_scope") or "").strip(),
+            (row.get("domain_id") or "").strip(), user_id,
+        )
+
+
+def run_audit(index: AuthzIndex, audit_paths: Sequence[str], user_map: Dict[str, str],
+              role_map: Dict[Tuple[str, str], List[str]], show_limit: int) -> int:
+    """
+    逐行校验审计日志，输出与审计结果不一致的请求，返回不一致条数。
+    审计允许而策略拒绝、且该 API 含无法判定的单元时，计为无法判定而不计入不一致。
+    """
+    rows: List[Dict[str, str]] = []
+    for path in audit_paths:
+        if not os.path.exists(path):
+            print(f"⚠ 审计日志不存在: {path}")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            rows.extend(csv.DictReader(f))
+    pairs = list(audit_requests(rows, user_map, role_map))
+
+    start = time.perf_counter()
+    results = list(index.check_many(request for _, request in pairs))
+    elapsed = time.perf_counter() - start
+
+    unknown = 0
+    undetermined = 0
+    mismatches = []
+    for (row, request), allowed in zip(pairs, results):
+        if request.api not in index:
+            unknown += 1
+            continue
+        audited = (row.get("authorized") or "").strip().lower() == "yes"
+        if audited and not allowed and index.undetermined(request.api):
+            undetermined += 1
+            continue
+        if audited != allowed:
+            mismatches.append((row, request, audited))
+
+    rate = len(results) / elapsed if elapsed > 0 else float("inf")
+    print(f"校验 {len(results)} 条请求，用时 {elapsed * 1000:.1f} ms（{rate:,.0f} 次/秒）")
+    if unknown:
+        print(f"⚠ {unknown} 条请求的 API 不在策略中，已跳过")
+    if undetermined:
+        print(f"⚠ {undetermined} 条审计允许的请求因策略含无法判定的条件（按拒绝处理）未计入不一致")
+    print(f"与审计结果不一致: {len(mismatches)} 条")
+    for row, request, audited in mismatches[:show_limit]:
+        roles = ",".join(request.roles) or "(无角色)"
+        verdict = "审计允许/策略拒绝" if audited else "审计拒绝/策略允许"
+        print(f"  {verdict}  {row.get('timestamp', '')}  {request.api}  "
+              f"user={row.get('user_name') or request.user}  project={row.get('project_name') or request.project}  "
+              f"roles={roles}")
+    if len(mismatches) > show_limit:
+        print(f"  ... 其余 {len(mismatches) - show_limit} 条未显示（--show 调整）")
+    return len(mismatches)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="编译后的授权索引：角色/项目/系统范围 -> API 是否允许")
+    parser.add_argument("--policy-file", default=DEFAULT_POLICY_FILE,
+                        help="策略文件路径，逗号分隔，默认 %(default)s")
+    parser.add_argument("--identity-snapshot", default=None,
+                        help=f"身份快照路径，默认 {snapshot_store.SNAPSHOT_PATH}，用于项目名与项目 ID 的转换及审计日志的角色查找；"
+                             "未显式传入 --rolegrant-file/--projectinfo-file 时，快照存在则优先于两个 CSV")
+    parser.add_argument("--rolegrant-file", default=None,
+                        help=f"rolegrant.csv 路径（审计日志的角色查找），默认 {DEFAULT_ROLEGRANT_FILE}")
+    parser.add_argument("--projectinfo-file", default=None,
+                        help=f"projectinfo.csv 路径，默认 {DEFAULT_PROJECTINFO_FILE}")
+    parser.add_argument("--no-implied-roles", action="store_true",
+                        help="不按 Keystone 默认角色蕴含（admin→member→reader、manager→member）展开请求角色")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("show", help="查看索引规模")
+
+    check_parser = sub.add_parser("check", help="单次查询")
+    check_parser.add_argument("api", help="策略名，如 identity:create_project；也可为 \"METHOD /url\"")
+    check_parser.add_argument("--role", action="append", default=[], help="角色名，可重复传入")
+    check_parser.add_argument("--project", default="", help="项目名或项目 ID")
+    check_parser.add_argument("--system-scope", default="", help="系统范围，如 all")
+    check_parser.add_argument("--domain", default="", help="域 ID")
+    check_parser.add_argument("--user", default="", help="用户 ID（仅用于 user_id:<字面值> 条件）")
+
+    audit_parser = sub.add_parser("audit", help="按审计日志批量校验")
+    audit_parser.add_argument("--audit-file", action="append", default=None,
+                              help=f"审计 CSV 路径，可重复传入，默认 {DEFAULT_AUDIT_FILE}")
+    audit_parser.add_argument("--show", type=int, default=20, help="最多显示的不一致条数，默认 %(default)s")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    user_map, role_map, project_map = load_identity(args.identity_snapshot, args.rolegrant_file, args.projectinfo_file)
+    if args.command == "audit" and not role_map:
+        print("✗ 没有可用的角色来源：身份快照不存在且 rolegrant.csv 为空或不存在，"
+              "请用 --identity-snapshot 或 --rolegrant-file 指定", file=sys.stderr)
+        sys.exit(2)
+    policy_paths = [path.strip() for path in args.policy_file.split(",") if path.strip()]
+    start = time.perf_counter()
+    index = build_index(policy_paths, project_map, implied_roles={} if args.no_implied_roles else None)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    if args.command == "show":
+        print(f"编译 {', '.join(policy_paths)} 用时 {build_ms:.0f} ms")
+        print(index.describe())
+        return
+
+    if args.command == "check":
+        api = normalize_api(args.api)
+        if api not in index:
+            print(f"未知 API: {args.api}")
+            sys.exit(2)
+        matched = index.explain(api, args.role, args.project, args.system_scope, args.domain, args.user)
+        if matched is None:
+            undetermined = index.undetermined(api)
+            detail = f"  无法判定的单元（按拒绝处理）: {'; '.join(undetermined)}" if undetermined else ""
+            print(f"拒绝  {api}{detail}")
+            sys.exit(1)
+        print(f"允许  {api}  匹配单元: {matched}")
+        return
+
+    audit_paths = args.audit_file or [DEFAULT_AUDIT_FILE]
+    sys.exit(1 if run_audit(index, audit_paths, user_map, role_map, max(0, args.show)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,20 @@
 该模块提供一个简单的输出框架，可根据错误编号打印对应的信息。
 默认情况下会输出 “read n policy rules, all Meet configure safety baseline”。
 后续如需扩展新的错误编号，只需在 ERROR_TEMPLATES 中补充即可。
+
+除文本输出外，还可通过结构化输出（NDJSON，每条问题一行 JSON）供 Web 与 CI 直接消费：
+设置环境变量 POLICY_CHECK_NDJSON=<文件路径> 时追加写入该文件（文本输出不变）；
+设置为 "-" 时改为向 stdout 逐条输出 JSON，文本块不再打印。
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, TextIO
+import argparse
+import json
+import re
 import sys
 import os
+import threading
+import time
 
 # 预置的错误信息模版，可随时扩展
 ERROR_TEMPLATES: Dict[str, Dict[str, str]] = {
@@ -81,6 +90,84 @@ ERROR_TEMPLATES: Dict[str, Dict[str, str]] = {
 
 DEFAULT_MESSAGE = "read n policy rules, all Meet configure safety baseline"
 
+NDJSON_ENV = "POLICY_CHECK_NDJSON"
+NDJSON_STDOUT = "-"
+_LINE_PATTERN = re.compile(r"line\s+(\d+)\s*:\s*(.*)")
+
+
+class NdjsonSink:
+    """
+    结构化输出：每条问题写为一行 JSON 并立即 flush，长时间运行的检测可被消费方逐条读取。
+
+    target 为 "-" 时写 stdout，其余视为文件路径并以追加方式打开（多个检测脚本可写同一文件）。
+    """
+
+    def __init__(self, target: str) -> None:
+        self.target = target
+        self._lock = threading.Lock()
+        self._stream: Optional[TextIO] = None
+
+    @property
+    def is_stdout(self) -> bool:
+        return self.target == NDJSON_STDOUT
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if self.is_stdout:
+                stream = sys.stdout
+            else:
+                if self._stream is None:
+                    self._stream = open(self.target, "a", encoding="utf-8")
+                stream = self._stream
+            stream.write(line + "\n")
+            stream.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+
+def sink_from_env() -> Optional[NdjsonSink]:
+    target = os.environ.get(NDJSON_ENV, "").strip()
+    return NdjsonSink(target) if target else None
+
+
+def build_record(
+    error_code: str,
+    fault_type: str,
+    fault_info: str,
+    recommendation: str,
+    info: Dict[str, Any],
+    checker: str,
+) -> Dict[str, Any]:
+    """将一条问题整理为结构化记录：错误码、策略、文件、行号、规则及文本字段。"""
+    policy_block = info.get("policy_name", "") or ""
+    lines: List[int] = []
+    api = info.get("api") or ""
+    for entry in policy_block.split("\n"):
+        match = _LINE_PATTERN.search(entry)
+        if match:
+            lines.append(int(match.group(1)))
+            # 未显式提供 api 时取首个 "line N: <name>" 中的策略名
+            if not api and match.group(2).strip():
+                api = match.group(2).split()[0]
+    return {
+        "code": error_code,
+        "type": fault_type,
+        "info": fault_info,
+        "recommendation": recommendation,
+        "policy": policy_block,
+        "api": api,
+        "file": info.get("file", ""),
+        "lines": lines,
+        "rule": info.get("rule") or info.get("original_expr") or "",
+        "checker": checker,
+        "ts": round(time.time(), 3),
+    }
+
 
 class PolicyCheckReporter:
     """
@@ -88,10 +175,15 @@ class PolicyCheckReporter:
 
     Attributes:
         output_func: 用于输出的函数，默认打印到 stdout。
+        sink:        结构化输出（NdjsonSink），默认由环境变量 POLICY_CHECK_NDJSON 决定。
+        checker:     记录中标识来源检测脚本的名称，默认取入口脚本文件名。
     """
 
-    def __init__(self, output_func=print) -> None:
+    def __init__(self, output_func=print, sink: Optional[NdjsonSink] = None,
+                 checker: Optional[str] = None) -> None:
         self.output = output_func
+        self.sink = sink if sink is not None else sink_from_env()
+        self.checker = checker or os.path.basename(sys.argv[0] or "")
 
     def report(self, error_code: str = "", **info: Any) -> None:
         """
@@ -135,6 +227,13 @@ class PolicyCheckReporter:
             )
             return
 
+        if self.sink is not None:
+            self.sink.write(build_record(
+                error_code, fault_type, fault_info, recommendation, info, self.checker
+            ))
+            if self.sink.is_stdout:
+                return
+
         policy_block = policy_name.split("\n") if policy_name else []
         formatted_policy = "\n".join(f"  {line}" for line in policy_block) if policy_block else ""
 
@@ -159,7 +258,58 @@ def ensure_repo_on_path() -> None:
         sys.path.insert(0, repo_root)
 
 
+def load_findings(path: str) -> List[Dict[str, Any]]:
+    """读取 NDJSON 结构化结果，忽略空行与非 JSON 行（如混入的普通日志）。"""
+    findings = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            try:
+                findings.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return findings
+
+
+def gate(path: str, fail_on: List[str], max_findings: Optional[int]) -> int:
+    """CI 门禁：按错误码统计，命中 fail_on 中的错误码或总数超过上限时返回非 0。"""
+    findings = load_findings(path)
+    by_code: Dict[str, int] = {}
+    for item in findings:
+        code = str(item.get("code", ""))
+        by_code[code] = by_code.get(code, 0) + 1
+    print(f"findings: {len(findings)}")
+    for code in sorted(by_code, key=lambda c: (len(c), c)):
+        fault_type = ERROR_TEMPLATES.get(code, {}).get("fault_type", "")
+        print(f"  code {code:>2} x {by_code[code]}  {fault_type}")
+    blocked = [code for code in fail_on if by_code.get(code)]
+    if blocked:
+        print(f"✗ 命中阻断错误码: {', '.join(blocked)}")
+        return 1
+    if max_findings is not None and len(findings) > max_findings:
+        print(f"✗ 问题数 {len(findings)} 超过上限 {max_findings}")
+        return 1
+    print("✓ 通过")
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="策略核查输出工具")
+    sub = parser.add_subparsers(dest="command")
+    gate_parser = sub.add_parser("gate", help="读取 NDJSON 结果并按错误码判定是否通过")
+    gate_parser.add_argument("path", help="POLICY_CHECK_NDJSON 写出的文件")
+    gate_parser.add_argument("--fail-on", default="", help="逗号分隔的阻断错误码，例如 1,4,12")
+    gate_parser.add_argument("--max-findings", type=int, default=None, help="允许的问题总数上限")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
     ensure_repo_on_path()
+    args = parse_args()
+    if args.command == "gate":
+        codes = [code.strip() for code in args.fail_on.split(",") if code.strip()]
+        sys.exit(gate(args.path, codes, args.max_findings))
     reporter = PolicyCheckReporter()
     reporter.report()  # 默认输出
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+常驻检测服务：在容器内保持一个长期运行的 Python 进程，预先导入各检测脚本（neo4j / oslo_policy / yaml
+只导入一次）。
+检测请求经本地 Unix socket 提交，每个请求在从服务进程 fork 出的一次性子进程中执行，输出逐行流式返回，
+因此每次静态/动态检测只花费检测本身的计算时间（Neo4j driver 在子进程内创建，请求结束时关闭）；检测脚本修改的模块全局状态（如 pipeline_trace 的追踪器）
+随子进程退出而丢弃，不会带入后续请求。
+
+超过超时时间（默认 POLICY_DETECTOR_TIMEOUT=1800 秒，0 表示不限）或客户端提前断开（例如 Web 任务超时）时，
+服务终止该子进程及其派生的进程组。检测脚本或其依赖的仓库模块（Tools/*、policy_parser 等）更新后，
+下一个请求开始前服务自动重新加载；仓库之外的依赖（neo4j、oslo_policy 等）升级后需重启服务。
+
+用法：
+  python /root/Tools/DetectorService.py serve            # 前台运行服务
+  python /root/Tools/DetectorService.py start            # 后台启动（已运行时直接返回）
+  python /root/Tools/DetectorService.py status
+  python /root/Tools/DetectorService.py stop
+  python /root/Tools/DetectorService.py call static-stat [脚本参数...]
+  python /root/Tools/DetectorService.py call --timeout 600 pipeline [脚本参数...]
+
+call 为轻量客户端（只依赖标准库）：服务不可用时会在后台拉起服务，并退回直接执行对应脚本，
+因此调用方无需关心服务是否已启动。
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Tools.ScriptTable import DETECTORS, first_existing  # noqa: E402
+
+SOCKET_PATH = os.environ.get("POLICY_DETECTOR_SOCKET", "/tmp/policy_detector.sock")
+LOG_PATH = os.environ.get("POLICY_DETECTOR_LOG", "/tmp/policy_detector.log")
+END_MARKER = "__DETECTOR_SERVICE_END__"
+CONNECT_TIMEOUT = 1.0
+START_TIMEOUT = 30.0
+# 单个检测请求的默认超时（秒），0 表示不限；call 可用 --timeout 覆盖
+REQUEST_TIMEOUT = float(os.environ.get("POLICY_DETECTOR_TIMEOUT", "1800"))
+# 等待子进程期间检查客户端是否断开的间隔（秒）
+POLL_INTERVAL = 0.2
+# 随请求转发给服务的环境变量前缀（OpenStack 凭证、结构化输出设置等）
+FORWARD_ENV_PREFIXES = ("OS_", "POLICY_CHECK_", "IDENTITY_SNAPSHOT_")
+
+# 检测脚本按需导入的重量级依赖；服务启动时预先导入，请求执行时不再承担导入开销
+WARM_IMPORTS = ("neo4j", "yaml", "oslo_policy._parser", "oslo_policy._checks", "keystoneauth1.session")
+
+
+def resolve_script(name: str) -> Path:
+    candidates = DETECTORS.get(name)
+    if not candidates:
+        raise KeyError(f"unknown detector: {name}")
+    return first_existing(candidates)
+
+
+# ---------------------------------------------------------------------------
+# 服务端
+# ---------------------------------------------------------------------------
+
+def _repo_modules() -> List[Tuple[str, str]]:
+    """sys.modules 中来自仓库目录的模块 (模块名, 文件路径)，不含服务自身。"""
+    own = os.path.abspath(__file__)
+    root = str(ROOT_DIR) + os.sep
+    result = []
+    for module_name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if not path or module_name == "__main__":
+            continue
+        path = os.path.abspath(path)
+        if path.startswith(root) and path != own:
+            result.append((module_name, path))
+    return result
+
+
+def _repo_module_files() -> Dict[str, int]:
+    files = {}
+    for _, path in _repo_modules():
+        with contextlib.suppress(OSError):
+            files[path] = os.stat(path).st_mtime_ns
+    return files
+
+
+def _kill_group(pid: int) -> None:
+    """终止子进程及其派生的进程（子进程启动时已成为独立进程组）。"""
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(pid, signal.SIGKILL)
+    with contextlib.suppress(ChildProcessError):
+        os.waitpid(pid, 0)
+
+
+class _StreamWriter(io.TextIOBase):
+    """把 print 输出即时写回客户端 socket。"""
+
+    def __init__(self, conn: socket.socket) -> None:
+        self.conn = conn
+        self.last = "\n"
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self.conn.sendall(text.encode("utf-8", "replace"))
+            self.last = text[-1]
+        return len(text)
+
+
+class DetectorService:
+    """预加载检测模块，每个请求在 fork 出的子进程中执行；脚本或仓库内依赖更新后自动重新加载。"""
+
+    def __init__(self, socket_path: str = SOCKET_PATH) -> None:
+        self.socket_path = socket_path
+        self._modules: Dict[str, Tuple[Any, int]] = {}
+        # 已加载的仓库内模块文件 -> mtime，用于发现依赖更新
+        self._deps: Dict[str, int] = {}
+        # 加载与 fork 互斥，避免子进程继承到导入进行到一半的模块
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server: Optional[socket.socket] = None
+
+    def _load(self, name: str) -> Any:
+        path = resolve_script(name)
+        mtime = path.stat().st_mtime_ns
+        cached = self._modules.get(name)
+        if cached and cached[1] == mtime:
+            return cached[0]
+        # run_graph_pipeline 依赖同目录模块（policy_parser 等）
+        if str(path.parent) not in sys.path:
+            sys.path.insert(0, str(path.parent))
+        spec = importlib.util.spec_from_file_location(f"detector_{name.replace('-', '_')}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self._modules[name] = (module, mtime)
+        self._deps.update(_repo_module_files())
+        return module
+
+    def _refresh_stale_deps(self) -> None:
+        """仓库内依赖模块有更新时，从 sys.modules 移除全部仓库模块并重新加载检测脚本。"""
+        stale = []
+        for path, mtime in self._deps.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    stale.append(path)
+            except OSError:
+                stale.append(path)
+        if not stale:
+            return
+        print(f"依赖已更新，重新加载检测模块: {', '.join(sorted(stale))}", flush=True)
+        for module_name in [name for name, _ in _repo_modules()]:
+            sys.modules.pop(module_name, None)
+            # 包（如命名空间包 Tools）上缓存的子模块属性也要去掉，否则 from Tools import X 仍取到旧模块
+            package, _, attr = module_name.rpartition(".")
+            if package in sys.modules:
+                with contextlib.suppress(AttributeError):
+                    delattr(sys.modules[package], attr)
+        self._modules.clear()
+        self._deps.clear()
+        for name in DETECTORS:
+            self._load(name)
+
+    def preload(self) -> None:
+        for module in WARM_IMPORTS:
+            try:
+                importlib.import_module(module)
+            except ImportError as exc:
+                print(f"⚠ 预导入 {module} 失败: {exc}")
+        for name in DETECTORS:
+            try:
+                self._load(name)
+            except Exception as exc:
+                print(f"⚠ 预加载 {name} 失败: {exc}")
+
+    def _execute(self, module: Any, name: str, argv: List[str], env: Dict[str, str], out: _StreamWriter) -> int:
+        """在子进程中执行检测脚本的 main()，返回退出码。"""
+        os.environ.update(env)
+        sys.argv = [str(resolve_script(name))] + list(argv)
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            try:
+                module.main()
+                return 0
+            except SystemExit as exc:
+                code = exc.code
+                if code is None:
+                    return 0
+                if isinstance(code, int):
+                    return code
+                print(code)
+                return 1
+            except subprocess.CalledProcessError as exc:
+                print(f"\n✗ 命令执行失败: {exc}")
+                return exc.returncode or 1
+            except Exception:
+                traceback.print_exc()
+                return 1
+
+    def _child(self, module: Any, name: str, argv: List[str], env: Dict[str, str], out: _StreamWriter) -> None:
+        code = 1
+        try:
+            os.setpgid(0, 0)
+            if self._server is not None:
+                self._server.close()
+            code = self._execute(module, name, argv, env, out)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except BaseException:
+            with contextlib.suppress(Exception):
+                out.write(traceback.format_exc())
+        finally:
+            neo4j_driver = sys.modules.get("Tools.Neo4jDriver")
+            if neo4j_driver is not None:
+                with contextlib.suppress(Exception):
+                    neo4j_driver.close_all()
+            os._exit(code if isinstance(code, int) and 0 <= code <= 255 else 1)
+
+    def run(self, name: str, argv: List[str], env: Dict[str, str], out: _StreamWriter,
+            timeout: Optional[float] = None) -> int:
+        """
+        在 fork 出的子进程中执行检测并等待结束。
+
+        超时返回 124；客户端断开时终止子进程并抛出 BrokenPipeError。
+        """
+        timeout = REQUEST_TIMEOUT if timeout is None else timeout
+        with self._load_lock:
+            self._refresh_stale_deps()
+            module = self._load(name)
+            pid = os.fork()
+            if pid == 0:
+                self._child(module, name, argv, env, out)
+        deadline = time.monotonic() + timeout if timeout > 0 else None
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                code = os.waitstatus_to_exitcode(status)
+                return code if code >= 0 else 128 - code
+            if deadline is not None and time.monotonic() > deadline:
+                _kill_group(pid)
+                out.write(f"\n✗ 检测超时（{timeout:g} 秒），已终止\n")
+                return 124
+            readable, _, _ = select.select([out.conn], [], [], POLL_INTERVAL)
+            if readable and not out.conn.recv(1, socket.MSG_PEEK):
+                _kill_group(pid)
+                raise BrokenPipeError("client disconnected")
+
+    def handle(self, conn: socket.socket) -> None:
+        with conn:
+            try:
+                request = json.loads(conn.makefile("r", encoding="utf-8").readline() or "{}")
+            except json.JSONDecodeError:
+                return
+            op = request.get("op")
+            out = _StreamWriter(conn)
+            try:
+                if op == "ping":
+                    out.write(f"pid {os.getpid()} detectors {','.join(sorted(self._modules))}\n")
+                    code = 0
+                elif op == "stop":
+                    self._stop.set()
+                    code = 0
+                elif op == "run":
+                    code = self.run(
+                        request.get("detector", ""), request.get("argv", []), request.get("env", {}), out,
+                        request.get("timeout"),
+                    )
+                else:
+                    out.write(f"unknown op: {op}\n")
+                    code = 2
+                if out.last != "\n":
+                    out.write("\n")
+                out.write(f"{END_MARKER} {code}\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端提前断开（例如 Web 任务超时），丢弃剩余输出
+                pass
+            except Exception as exc:
+                # 未知检测名、脚本缺失或导入失败
+                with contextlib.suppress(OSError):
+                    out.write(f"\n✗ 检测服务执行失败: {exc!r}\n{END_MARKER} 1\n")
+
+    def serve(self) -> None:
+        self.preload()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        server.listen(16)
+        self._server = server
+        server.settimeout(1.0)
+        print(f"✓ 检测服务已启动: {self.socket_path} (pid {os.getpid()})", flush=True)
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+
+# ---------------------------------------------------------------------------
+# 客户端
+# ---------------------------------------------------------------------------
+
+def _connect(socket_path: str) -> Optional[socket.socket]:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(CONNECT_TIMEOUT)
+    try:
+        conn.connect(socket_path)
+    except OSError:
+        conn.close()
+        return None
+    conn.settimeout(None)
+    return conn
+
+
+def request(socket_path: str, payload: Dict[str, Any]) -> Optional[int]:
+    """发送请求并把输出转写到 stdout；服务不可用时返回 None。"""
+    conn = _connect(socket_path)
+    if conn is None:
+        return None
+    with conn:
+        conn.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        for line in conn.makefile("r", encoding="utf-8", errors="replace"):
+            if line.startswith(END_MARKER):
+                return int(line.split()[1])
+            sys.stdout.write(line)
+            sys.stdout.flush()
+    # 服务在执行中退出：不重放请求，交由调用方判断
+    return 255
+
+
+def start_background(socket_path: str, wait: bool) -> bool:
+    if _connect(socket_path) is not None:
+        return True
+    with open(LOG_PATH, "ab") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--socket", socket_path, "serve"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    if not wait:
+        return False
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        conn = _connect(socket_path)
+        if conn is not None:
+            conn.close()
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def call(socket_path: str, name: str, argv: List[str], timeout: Optional[float] = None) -> int:
+    script = resolve_script(name)
+    env = {key: value for key, value in os.environ.items() if key.startswith(FORWARD_ENV_PREFIXES)}
+    payload = {"op": "run", "detector": name, "argv": argv, "env": env}
+    if timeout is not None:
+        payload["timeout"] = timeout
+    code = request(socket_path, payload)
+    if code is not None:
+        return code
+    # 服务未运行：后台拉起供后续请求使用，本次直接执行脚本
+    start_background(socket_path, wait=False)
+    sys.stdout.flush()
+    timeout = REQUEST_TIMEOUT if timeout is None else timeout
+    try:
+        return subprocess.call([sys.executable, str(script)] + argv, timeout=timeout if timeout > 0 else None)
+    except subprocess.TimeoutExpired:
+        print(f"\n✗ 检测超时（{timeout:g} 秒），已终止")
+        return 124
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="常驻检测服务")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket 路径，默认 %(default)s")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="前台运行服务")
+    sub.add_parser("start", help="后台启动服务并等待就绪")
+    sub.add_parser("status", help="查看服务状态")
+    sub.add_parser("stop", help="停止服务")
+    call_parser = sub.add_parser("call", help="提交检测请求")
+    call_parser.add_argument("--timeout", type=float, default=None,
+                             help=f"本次检测的超时秒数，0 表示不限，默认 {REQUEST_TIMEOUT:g}（POLICY_DETECTOR_TIMEOUT）")
+    call_parser.add_argument("detector", choices=sorted(DETECTORS))
+    call_parser.add_argument("args", nargs=argparse.REMAINDER, help="传给检测脚本的参数")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "serve":
+        DetectorService(args.socket).serve()
+    elif args.command == "start":
+        if not start_background(args.socket, wait=True):
+            print(f"✗ 检测服务启动失败，详见 {LOG_PATH}")
+            sys.exit(1)
+        print(f"✓ 检测服务运行中: {args.socket}")
+    elif args.command == "status":
+        if request(args.socket, {"op": "ping"}) is None:
+            print("检测服务未运行")
+            sys.exit(1)
+    elif args.command == "stop":
+        if request(args.socket, {"op": "stop"}) is None:
+            print("检测服务未运行")
+    else:
+        sys.exit(call(args.socket, args.detector, args.args, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
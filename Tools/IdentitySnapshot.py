@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Keystone 身份快照：一次性收集 user/project/role/domain 及角色授权关系，写入单个 JSON 文件。
+
+快照文件（容器内路径）：
+  - /root/policy-fileparser/data/assistfile/EnvInfo/identity_snapshot.json
+
+格式：
+  {
+    "version": 1,
+    "generated_at": "2025-12-25T12:00:00Z",
+    "generated_ts": 1766664000.0,
+    "users": [{"id", "name", "domain_id", "email"}],
+    "projects": [{"id", "name", "domain_id"}],
+    "roles": [{"id", "name"}],
+    "domains": [{"id", "name"}],
+    "role_assignments": [{"user_id", "role_id", "project_id", "system_scope"}]
+  }
+
+身份子图构建、动态检测、Web 环境概览以及 rolegrant.csv 等 CSV 均读取该快照；
+仅在显式刷新（refresh）或快照过期（超过 max-age 秒）时才调用 openstack CLI。
+
+用法：
+  python /root/Tools/IdentitySnapshot.py refresh
+  python /root/Tools/IdentitySnapshot.py show
+  python /root/Tools/IdentitySnapshot.py export-csv --max-age 3600
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as dt
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ENVINFO_DIR = "/root/policy-fileparser/data/assistfile/EnvInfo"
+SNAPSHOT_PATH = os.path.join(ENVINFO_DIR, "identity_snapshot.json")
+SNAPSHOT_VERSION = 1
+# 默认 1 小时后视为过期，可通过环境变量 IDENTITY_SNAPSHOT_MAX_AGE 或 --max-age 调整
+DEFAULT_MAX_AGE = int(os.environ.get("IDENTITY_SNAPSHOT_MAX_AGE", "3600"))
+
+USER_CSV = "userinfo.csv"
+PROJECT_CSV = "projectinfo.csv"
+ROLE_CSV = "roleinfo.csv"
+ROLEGRANT_CSV = "rolegrant.csv"
+
+
+def run_json(cmd: List[str]) -> List[Dict[str, Any]]:
+    """以 JSON 格式执行 openstack 命令并返回列表."""
+    try:
+        out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True)
+        return json.loads(out)
+    except subprocess.CalledProcessError as exc:
+        print(f"命令失败: {' '.join(cmd)}", file=sys.stderr)
+        print(exc.output, file=sys.stderr)
+        print("建议使用 admin 凭证重试。", file=sys.stderr)
+        return []
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"执行/解析失败: {' '.join(cmd)}: {exc}", file=sys.stderr)
+        return []
+
+
+def _id_name_rows(data: List[Dict[str, Any]], *extra: str) -> List[Dict[str, str]]:
+    rows = []
+    for item in data:
+        if "ID" not in item or "Name" not in item:
+            continue
+        row = {"id": item["ID"], "name": item["Name"]}
+        for key in extra:
+            row[key.lower().replace(" ", "_")] = item.get(key) or ""
+        rows.append(row)
+    return rows
+
+
+def collect_snapshot() -> Dict[str, Any]:
+    """通过 openstack CLI 收集一次完整的身份快照（共 5 次调用）。"""
+    users = _id_name_rows(
+        run_json(["openstack", "user", "list", "--long", "-f", "json"]),
+        "Domain",
+        "Email",
+    )
+    for user in users:
+        user["domain_id"] = user.pop("domain", "")
+    projects = _id_name_rows(
+        run_json(["openstack", "project", "list", "--long", "-f", "json"]),
+        "Domain ID",
+    )
+    roles = _id_name_rows(run_json(["openstack", "role", "list", "-f", "json"]))
+    domains = _id_name_rows(run_json(["openstack", "domain", "list", "-f", "json"]))
+
+    assignments = []
+    for item in run_json(["openstack", "role", "assignment", "list", "-f", "json"]):
+        user_id = item.get("User") or ""
+        role_id = item.get("Role") or ""
+        project_id = item.get("Project") or None
+        system_scope = item.get("System") or None
+        if user_id and role_id and (project_id or system_scope):
+            assignments.append(
+                {
+                    "user_id": user_id,
+                    "role_id": role_id,
+                    "project_id": project_id,
+                    "system_scope": system_scope,
+                }
+            )
+
+    now = time.time()
+    return {
+        "version": SNAPSHOT_VERSION,
+        "generated_at": dt.datetime.utcfromtimestamp(now).isoformat(timespec="seconds") + "Z",
+        "generated_ts": now,
+        "users": users,
+        "projects": projects,
+        "roles": roles,
+        "domains": domains,
+        "role_assignments": assignments,
+    }
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    """读取快照文件；不存在、损坏或版本不符时返回 None。"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"⚠ 身份快照读取失败: {path}: {exc}", file=sys.stderr)
+        return None
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return None
+    return data
+
+
+def save_snapshot(snapshot: Dict[str, Any], path: str = SNAPSHOT_PATH) -> None:
+    """原子写入快照（先写临时文件再 rename），避免并发读取到半个文件。"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def snapshot_age(snapshot: Dict[str, Any]) -> float:
+    return max(0.0, time.time() - float(snapshot.get("generated_ts") or 0))
+
+
+def is_stale(snapshot: Optional[Dict[str, Any]], max_age: Optional[float] = DEFAULT_MAX_AGE) -> bool:
+    """max_age 为 None 或负数时快照永不过期。"""
+    if not snapshot:
+        return True
+    if max_age is None or max_age < 0:
+        return False
+    return snapshot_age(snapshot) > max_age
+
+
+def get_snapshot(
+    path: str = SNAPSHOT_PATH,
+    max_age: Optional[float] = DEFAULT_MAX_AGE,
+    refresh: bool = False,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    返回 (快照, 是否刚刷新)。
+
+    仅当 refresh=True、快照缺失或已过期时才访问 Keystone，并将结果落盘。
+    """
+    snapshot = None if refresh else load_snapshot(path)
+    if snapshot is not None and not is_stale(snapshot, max_age):
+        return snapshot, False
+    snapshot = collect_snapshot()
+    if snapshot["users"] or snapshot["projects"] or snapshot["roles"]:
+        save_snapshot(snapshot, path)
+    return snapshot, True
+
+
+class IdentityModel:
+    """
+    身份数据的内存模型：一次性建立以 id / name 为键的索引，供身份子图构建与各检测脚本复用，
+    避免在 users/roles/projects 列表上反复线性查找。
+
+    users/roles/projects 中的元素既可以是 keystoneclient 资源对象，也可以是带 id/name 属性的任意对象；
+    role_assignments 为 {user_id, role_id, project_id, system_scope} 字典列表。
+    """
+
+    def __init__(
+        self,
+        users: Iterable[Any],
+        roles: Iterable[Any],
+        projects: Iterable[Any],
+        role_assignments: Iterable[Dict[str, Optional[str]]],
+        domains: Iterable[Any] = (),
+        generated_at: Optional[str] = None,
+    ) -> None:
+        self.users = list(users)
+        self.roles = list(roles)
+        self.projects = list(projects)
+        self.domains = list(domains)
+        self.role_assignments = list(role_assignments)
+        self.generated_at = generated_at
+
+        self.users_by_id = {u.id: u for u in self.users}
+        self.roles_by_id = {r.id: r for r in self.roles}
+        self.projects_by_id = {p.id: p for p in self.projects}
+        self.users_by_name = {u.name: u for u in self.users}
+        self.roles_by_name = {r.name: r for r in self.roles}
+        self.projects_by_name = {p.name: p for p in self.projects}
+
+        self.assignments_by_user: Dict[str, List[Dict[str, Optional[str]]]] = defaultdict(list)
+        for item in self.role_assignments:
+            self.assignments_by_user[item["user_id"]].append(item)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "IdentityModel":
+        def _ns(items: Iterable[Dict[str, Any]]) -> List[SimpleNamespace]:
+            return [SimpleNamespace(**item) for item in items]
+
+        users = [
+            SimpleNamespace(**{**u, "email": u.get("email") or f"{u['name']}@example.com"})
+            for u in snapshot.get("users", [])
+        ]
+        return cls(
+            users,
+            _ns(snapshot.get("roles", [])),
+            _ns(snapshot.get("projects", [])),
+            [
+                {
+                    "user_id": a["user_id"],
+                    "role_id": a["role_id"],
+                    "project_id": a.get("project_id"),
+                    "system_scope": a.get("system_scope"),
+                }
+                for a in snapshot.get("role_assignments", [])
+            ],
+            domains=_ns(snapshot.get("domains", [])),
+            generated_at=snapshot.get("generated_at"),
+        )
+
+    def user(self, user_id: Optional[str]) -> Any:
+        return self.users_by_id.get(user_id)
+
+    def role(self, role_id: Optional[str]) -> Any:
+        return self.roles_by_id.get(role_id)
+
+    def project(self, project_id: Optional[str]) -> Any:
+        return self.projects_by_id.get(project_id)
+
+    def user_name_map(self) -> Dict[str, str]:
+        return {user_id: user.name for user_id, user in self.users_by_id.items()}
+
+    def project_name_map(self) -> Dict[str, str]:
+        return {project_id: project.name for project_id, project in self.projects_by_id.items()}
+
+    def project_roles_by_user_name(self) -> Dict[Tuple[str, str], List[str]]:
+        """(user_name, project_id) -> [role_name, ...]，与 rolegrant.csv 的读取结果一致。"""
+        mapping: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        for _uid, user_name, project_id, _pname, _rid, role_name in self.rolegrant_rows():
+            if user_name and project_id and role_name:
+                key = (user_name, project_id)
+                if role_name not in mapping[key]:
+                    mapping[key].append(role_name)
+        return mapping
+
+    def rolegrant_rows(self) -> List[Tuple[str, str, str, str, str, str]]:
+        """按 rolegrant.csv 列顺序展开项目级授权 (user_id,user_name,project_id,project_name,role_id,role_name)。"""
+        rows = []
+        for item in self.role_assignments:
+            project_id = item.get("project_id")
+            if not project_id:
+                continue
+            user = self.users_by_id.get(item["user_id"])
+            project = self.projects_by_id.get(project_id)
+            role = self.roles_by_id.get(item["role_id"])
+            rows.append(
+                (
+                    item["user_id"],
+                    user.name if user else "",
+                    project_id,
+                    project.name if project else "",
+                    item["role_id"],
+                    role.name if role else "",
+                )
+            )
+        return rows
+
+
+def load_identity_model(path: str = SNAPSHOT_PATH) -> Optional[IdentityModel]:
+    """读取快照并构建 IdentityModel，快照不存在时返回 None。"""
+    snapshot = load_snapshot(path)
+    return IdentityModel.from_snapshot(snapshot) if snapshot is not None else None
+
+
+def rolegrant_rows(snapshot: Dict[str, Any]) -> List[Tuple[str, str, str, str, str, str]]:
+    return IdentityModel.from_snapshot(snapshot).rolegrant_rows()
+
+
+def _write_csv(path: str, rows: List[Tuple[str, ...]], header: Tuple[str, ...]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_envinfo_csvs(snapshot: Dict[str, Any], directory: str = ENVINFO_DIR) -> int:
+    """由快照生成 userinfo/projectinfo/roleinfo/rolegrant 四个 CSV，返回授权记录数。"""
+    _write_csv(
+        os.path.join(directory, USER_CSV),
+        [(u["id"], u["name"]) for u in snapshot.get("users", [])],
+        ("user_id", "user_name"),
+    )
+    _write_csv(
+        os.path.join(directory, PROJECT_CSV),
+        [(p["id"], p["name"]) for p in snapshot.get("projects", [])],
+        ("project_id", "project_name"),
+    )
+    _write_csv(
+        os.path.join(directory, ROLE_CSV),
+        [(r["id"], r["name"]) for r in snapshot.get("roles", [])],
+        ("role_id", "role_name"),
+    )
+    grants = rolegrant_rows(snapshot)
+    _write_csv(
+        os.path.join(directory, ROLEGRANT_CSV),
+        grants,
+        ("user_id", "user_name", "project_id", "project_name", "role_id", "role_name"),
+    )
+    return len(grants)
+
+
+def describe(snapshot: Dict[str, Any]) -> str:
+    return (
+        f"generated_at={snapshot.get('generated_at')} "
+        f"age={snapshot_age(snapshot):.0f}s "
+        f"users={len(snapshot.get('users', []))} "
+        f"projects={len(snapshot.get('projects', []))} "
+        f"roles={len(snapshot.get('roles', []))} "
+        f"domains={len(snapshot.get('domains', []))} "
+        f"assignments={len(snapshot.get('role_assignments', []))}"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Keystone 身份快照管理")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help="快照文件路径，默认 %(default)s")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("refresh", help="立即从 Keystone 重新收集快照")
+
+    show_parser = subparsers.add_parser("show", help="查看快照概要（--json 输出完整内容）")
+    show_parser.add_argument("--json", action="store_true")
+    show_parser.add_argument("--max-age", type=float, default=None,
+                             help="给定时，快照缺失或超过该秒数先自动刷新（负数表示永不过期）；默认只读取现有快照")
+
+    export_parser = subparsers.add_parser("export-csv", help="由快照生成 EnvInfo 下的 CSV")
+    export_parser.add_argument("--output-dir", default=ENVINFO_DIR)
+    export_parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE,
+                               help="快照过期秒数，过期自动刷新；负数表示永不过期")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "refresh":
+        snapshot, _ = get_snapshot(args.snapshot, refresh=True)
+        print(f"✓ 身份快照已刷新 -> {args.snapshot}")
+        print(describe(snapshot))
+    elif args.command == "show":
+        if args.max_age is not None:
+            snapshot, _ = get_snapshot(args.snapshot, max_age=args.max_age)
+        else:
+            snapshot = load_snapshot(args.snapshot)
+        if snapshot is None:
+            print(f"⚠ 身份快照不存在: {args.snapshot}")
+            sys.exit(1)
+        print(json.dumps(snapshot, ensure_ascii=False) if args.json else describe(snapshot))
+    elif args.command == "export-csv":
+        snapshot, refreshed = get_snapshot(args.snapshot, max_age=args.max_age)
+        total = write_envinfo_csvs(snapshot, args.output_dir)
+        source = "Keystone" if refreshed else "快照"
+        print(f"已从{source}生成 {total} 条授权记录 -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
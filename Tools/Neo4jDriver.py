@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+共享的 Neo4j driver 工厂：各检测脚本、策略图构建与 Web 图查询统一从这里获取 driver。
+
+- 同一进程内同一 (uri, user, password) 只创建一个 driver，连接池在调用之间复用
+  （Web 进程中尤其明显）；调用方的 close() 不会真正关闭，进程退出时统一关闭。
+- 连接池大小、空闲连接存活检查、事务重试时间与默认 fetch size 可通过环境变量调整：
+    NEO4J_POOL_SIZE（默认 16）、NEO4J_LIVENESS_TIMEOUT（秒，默认 30）、
+    NEO4J_MAX_RETRY_TIME（秒，默认 15）、NEO4J_CONNECTION_TIMEOUT（秒，默认 10）、
+    NEO4J_FETCH_SIZE（每批拉取的记录数，默认 1000；-1 表示一次性拉取）。
+- read / write / execute_read / execute_write 在托管事务中执行，遇到瞬时错误
+  （TransientError、连接中断、集群切主等）时由 driver 自动重试。
+- stream 逐批拉取并逐条产出记录，客户端只缓冲一批（fetch size）记录，用于结果规模随图增长的导出与检测；
+  配合 ORDER BY 与 group_records 可按策略分组消费，内存占用与图规模无关。
+
+用法：
+  driver = get_driver("bolt://localhost:7687", "neo4j", "Password")
+  records = read(driver, "MATCH (p:PolicyNode) RETURN p.name AS name")
+  for name, group in group_records(stream(driver, "... ORDER BY p.name"), "name"): ...
+  write(driver, "MATCH (n) DETACH DELETE n")
+"""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+POOL_SIZE = int(os.environ.get("NEO4J_POOL_SIZE", "16"))
+# 空闲超过该秒数的连接在取用前先做一次存活检查（替代各脚本自行执行的 RETURN 1）
+LIVENESS_CHECK_TIMEOUT = float(os.environ.get("NEO4J_LIVENESS_TIMEOUT", "30"))
+MAX_RETRY_TIME = float(os.environ.get("NEO4J_MAX_RETRY_TIME", "15"))
+CONNECTION_TIMEOUT = float(os.environ.get("NEO4J_CONNECTION_TIMEOUT", "10"))
+FETCH_SIZE = int(os.environ.get("NEO4J_FETCH_SIZE", "1000"))
+
+_drivers: Dict[Tuple[str, str, str], "SharedDriver"] = {}
+_lock = threading.Lock()
+
+
+class SharedDriver:
+    """共享 driver 的代理：close() 与 with 语句退出时不关闭连接池，其余属性转发给真实 driver。"""
+
+    def __init__(self, driver: Any) -> None:
+        self._driver = driver
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "SharedDriver":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._driver, name)
+
+
+def get_driver(uri: str, user: str, password: str, verify: bool = True) -> SharedDriver:
+    """
+    获取 (uri, user, password) 对应的共享 driver。
+
+    首次创建时（verify=True）验证连通性，失败则抛出异常且不缓存；之后的调用直接复用。
+    """
+    key = (uri, user, password)
+    with _lock:
+        shared = _drivers.get(key)
+        if shared is not None:
+            return shared
+        from neo4j import GraphDatabase
+
+        driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=POOL_SIZE,
+            liveness_check_timeout=LIVENESS_CHECK_TIMEOUT,
+            max_transaction_retry_time=MAX_RETRY_TIME,
+            connection_timeout=CONNECTION_TIMEOUT,
+            fetch_size=FETCH_SIZE,
+        )
+        if verify:
+            try:
+                driver.verify_connectivity()
+            except Exception:
+                driver.close()
+                raise
+        shared = _drivers[key] = SharedDriver(driver)
+        return shared
+
+
+def close_all() -> None:
+    """关闭本进程创建的全部 driver（进程退出时自动调用）。"""
+    with _lock:
+        drivers = list(_drivers.values())
+        _drivers.clear()
+    for shared in drivers:
+        try:
+            shared._driver.close()
+        except Exception:
+            pass
+
+
+atexit.register(close_all)
+
+
+def _session_kwargs(fetch_size: Optional[int], database: Optional[str]) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {}
+    if fetch_size is not None:
+        kwargs["fetch_size"] = fetch_size
+    if database:
+        kwargs["database"] = database
+    return kwargs
+
+
+def execute_read(driver: Any, work: Callable[..., Any], *args: Any, fetch_size: Optional[int] = None,
+                 database: Optional[str] = None, **kwargs: Any) -> Any:
+    """在托管读事务中执行 work(tx, *args, **kwargs)；瞬时错误时整体重试，work 不应有外部副作用。"""
+    with driver.session(**_session_kwargs(fetch_size, database)) as session:
+        return session.execute_read(work, *args, **kwargs)
+
+
+def execute_write(driver: Any, work: Callable[..., Any], *args: Any, database: Optional[str] = None,
+                  **kwargs: Any) -> Any:
+    """在托管写事务中执行 work(tx, *args, **kwargs)；瞬时错误时整体重试。"""
+    with driver.session(**_session_kwargs(None, database)) as session:
+        return session.execute_write(work, *args, **kwargs)
+
+
+def read(driver: Any, query: str, parameters: Optional[Dict[str, Any]] = None,
+         fetch_size: Optional[int] = None, **params: Any) -> List[Any]:
+    """执行只读查询并返回全部记录（在事务内取完，重试时不会返回半份结果）。"""
+    return execute_read(driver, lambda tx: list(tx.run(query, parameters, **params)), fetch_size=fetch_size)
+
+
+def write(driver: Any, query: str, parameters: Optional[Dict[str, Any]] = None, **params: Any) -> Any:
+    """执行写查询，返回 SummaryCounters（nodes_created、relationships_deleted 等）。"""
+    return execute_write(driver, lambda tx: tx.run(query, parameters, **params).consume().counters)
+
+
+def stream(driver: Any, query: str, parameters: Optional[Dict[str, Any]] = None,
+           fetch_size: Optional[int] = None, **params: Any) -> Iterator[Any]:
+    """
+    在自动提交事务中执行查询并逐条产出记录，每次从服务端拉取 fetch_size 条（默认 NEO4J_FETCH_SIZE）。
+
+    记录产出后调用方已开始处理，因此不做自动重试；中途失败时异常直接抛给调用方。
+    """
+    with driver.session(**_session_kwargs(fetch_size, None)) as session:
+        yield from session.run(query, parameters, **params)
+
+
+def group_records(records: Iterable[Any], key: str) -> Iterator[Tuple[Any, List[Any]]]:
+    """把按 key 排序（ORDER BY）的记录流切分为 (key 值, 该组记录列表)，同一时刻只保留一组。"""
+    for value, group in itertools.groupby(records, key=lambda record: record[key]):
+        yield value, list(group)
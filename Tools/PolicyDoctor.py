@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+policy-doctor：各检测/生成脚本的统一入口。
+
+子命令只登记脚本路径，选中后才加载对应脚本（按 `python 脚本` 的方式执行），
+因此 `policy-doctor --help` 与 `policy-doctor <子命令> --help` 不会导入 neo4j / oslo_policy /
+keystoneauth1 / yaml 等重量级依赖；各脚本自身也只在真正连接图数据库或解析策略时才导入它们。
+
+用法：
+  python /root/Tools/PolicyDoctor.py --help
+  python /root/Tools/PolicyDoctor.py static-unknown roles --level high --list
+  python /root/Tools/PolicyDoctor.py policy-gen csv-to-yaml --csv-files a.csv --output out.yaml
+  python /root/Tools/PolicyDoctor.py import-budget --budget-ms 60
+
+容器内可链接为命令：ln -s /root/Tools/PolicyDoctor.py /usr/local/bin/policy-doctor
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import runpy
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Tools.ScriptTable import DETECTORS, first_existing  # noqa: E402
+
+# 子命令 -> (候选脚本路径（相对仓库根目录；容器内 fileparser 挂载为 policy-fileparser）, 说明)
+COMMANDS: Dict[str, Tuple[List[str], str]] = {
+    "pipeline": (DETECTORS["pipeline"], "构建身份/策略子图（run_graph_pipeline.py）"),
+    "static-stat": (DETECTORS["static-stat"], "策略统计检测（StatisticCheck.py）"),
+    "static-unknown": (DETECTORS["static-unknown"], "高低权限错配检测与角色集合管理（UnkownStatisticCheck.py）"),
+    "dynamic": (DETECTORS["dynamic"], "授权范围动态检测（Authorization_scope_check.py）"),
+    "policy-gen": (["policy-fileparser/PolicyGen.py", "fileparser/PolicyGen.py"], "由策略图/CSV 生成策略文件（PolicyGen.py）"),
+    "policyset": (["Tools/Policyset.py"], "Keystone 策略文件管理（Policyset.py）"),
+    "identity-snapshot": (["Tools/IdentitySnapshot.py"], "身份快照（IdentitySnapshot.py）"),
+    "api-catalog": (["Tools/ApiCatalog.py"], "API ↔ Policy 目录查询（ApiCatalog.py）"),
+    "authz": (["Tools/AuthzIndex.py"], "授权索引：角色/项目能否调用 API、审计日志批量校验（AuthzIndex.py）"),
+    "detector-service": (["Tools/DetectorService.py"], "常驻检测服务（DetectorService.py）"),
+}
+
+# 轻量命令不应导入的重量级依赖（顶层包名）
+HEAVY_MODULES = ("neo4j", "oslo_policy", "oslo_config", "keystoneauth1", "keystoneclient", "yaml", "pandas")
+# import-budget 检查的轻量命令：全部 --help 以及不访问图数据库的子命令
+BUDGET_CASES: List[List[str]] = [["--help"]] + [[name, "--help"] for name in COMMANDS] + [
+    ["static-unknown", "roles", "--level", "high", "--list"],
+    ["policy-gen", "csv-to-yaml", "--help"],
+]
+DEFAULT_BUDGET_MS = 60.0
+IMPORT_LINE = re.compile(r"^import time:\s+\d+\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+def resolve_script(name: str) -> Path:
+    return first_existing(COMMANDS[name][0])
+
+
+def run_script(name: str, argv: List[str]) -> None:
+    """以 `python 脚本 参数...` 的语义执行子命令脚本（脚本目录加入 sys.path，__name__ 为 __main__）。"""
+    path = resolve_script(name)
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    sys.argv = [str(path)] + list(argv)
+    runpy.run_path(str(path), run_name="__main__")
+
+
+# ---------------------------------------------------------------------------
+# 导入耗时预算检查
+# ---------------------------------------------------------------------------
+
+def _wall_time(command: List[str], repeat: int) -> float:
+    """多次执行取最短墙钟时间（秒），排除偶发的调度抖动。"""
+    import subprocess
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=str(ROOT_DIR))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _imported_modules(command: List[str]) -> Set[str]:
+    """借助 -X importtime 收集命令执行期间导入的全部模块名。"""
+    import subprocess
+
+    result = subprocess.run(
+        [command[0], "-X", "importtime"] + command[1:],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, cwd=str(ROOT_DIR),
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.add(match.group(1))
+    return modules
+
+
+def check_import_budget(budget_ms: float, repeat: int) -> int:
+    """
+    逐个执行 BUDGET_CASES，检查没有导入 HEAVY_MODULES 中的依赖，返回不满足的命令数。
+    同时输出扣除解释器空启动（python -c pass）后的耗时；墙钟时间受机器负载影响，
+    超过 budget_ms 只作提示，不计入失败。
+    """
+    baseline = _wall_time([sys.executable, "-c", "pass"], repeat)
+    print(f"解释器空启动: {baseline * 1000:.1f} ms，参考耗时: +{budget_ms:.0f} ms")
+    failures = 0
+    slow = 0
+    for case in BUDGET_CASES:
+        command = [sys.executable, os.path.abspath(__file__)] + case
+        elapsed = (_wall_time(command, repeat) - baseline) * 1000
+        heavy = sorted({name.split(".")[0] for name in _imported_modules(command)} & set(HEAVY_MODULES))
+        failures += bool(heavy)
+        slow += elapsed > budget_ms
+        detail = f"  导入了 {', '.join(heavy)}" if heavy else ""
+        note = " (超出参考耗时)" if elapsed > budget_ms else ""
+        print(f"{'✗' if heavy else '✓'} {' '.join(case):<50} +{elapsed:6.1f} ms{note}{detail}")
+    if slow:
+        print(f"提示: {slow} 条命令超出参考耗时（仅供参考，不影响结果）")
+    print("全部命令未导入重量级依赖" if not failures else f"{failures} 条命令导入了重量级依赖")
+    return failures
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="policy-doctor",
+        description="策略错配检测工具统一入口；子命令参数原样传给对应脚本",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="子命令：\n" + "\n".join(f"  {name:<18} {text}" for name, (_, text) in COMMANDS.items())
+        + f"\n  {'import-budget':<18} 检查轻量命令是否导入重量级依赖（同时输出启动耗时）",
+    )
+    parser.add_argument("command", choices=sorted(COMMANDS) + ["import-budget"], metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="传给子命令的参数")
+    return parser.parse_args()
+
+
+def parse_budget_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="policy-doctor import-budget", description="轻量命令重量级依赖导入检查")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="扣除解释器空启动后的参考耗时（毫秒），超出只提示，默认 %(default)s")
+    parser.add_argument("--repeat", type=int, default=5, help="每条命令执行次数（取最短），默认 %(default)s")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "import-budget":
+        budget = parse_budget_args(args.args)
+        sys.exit(1 if check_import_budget(budget.budget_ms, max(1, budget.repeat)) else 0)
+    run_script(args.command, args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+策略解析结果的紧凑数据模型，供 policypreprocess / policy_parser / openstackpolicygraph 与各检测脚本共用。
+
+- Condition：单个条件（如 role:admin），同一 (key, value) 全局只保留一个实例，键与值均 intern；
+- Unit：最小匹配单元（DNF 中的一个合取项），以 Condition 元组存储，哈希预先计算；
+- Rule：一条策略表达式及其展开得到的 Unit；
+- Policy：策略名、规则列表与来源信息（文件、行号、原始条目）。
+
+所有类都使用 __slots__，不再为每个策略/单元创建嵌套 dict 与重复字符串。
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+_CONDITIONS: Dict[Tuple[str, str], "Condition"] = {}
+
+
+def intern_str(value: Any) -> str:
+    return sys.intern(str(value))
+
+
+class Condition:
+    """不可变条件 key:value，通过 Condition.of 获取共享实例。"""
+
+    __slots__ = ("key", "value", "_hash")
+
+    def __init__(self, key: str, value: str) -> None:
+        self.key = intern_str(key)
+        self.value = intern_str(value)
+        self._hash = hash((self.key, self.value))
+
+    @classmethod
+    def of(cls, key: str, value: str) -> "Condition":
+        cached = _CONDITIONS.get((key, value))
+        if cached is None:
+            cached = cls(key, value)
+            _CONDITIONS[(cached.key, cached.value)] = cached
+        return cached
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Condition):
+            return NotImplemented
+        return self.key == other.key and self.value == other.value
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __lt__(self, other: "Condition") -> bool:
+        return (self.key, self.value) < (other.key, other.value)
+
+    def __repr__(self) -> str:
+        return f"Condition({self.key!r}, {self.value!r})"
+
+    def __str__(self) -> str:
+        return f"{self.key}:{self.value}"
+
+
+class Unit:
+    """
+    最小匹配单元。conditions 按键排序、同一键下保持 DNF 展开时的值顺序，
+    expression 与原先 `_unit_to_expression` 的输出一致；signature 为去重排序后的规范签名。
+    """
+
+    __slots__ = ("conditions", "_hash", "_signature")
+
+    def __init__(self, conditions: Iterable[Condition] = ()) -> None:
+        self.conditions: Tuple[Condition, ...] = tuple(conditions)
+        self._hash = hash(self.conditions)
+        self._signature: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, unit: Mapping[str, Iterable[Any]]) -> "Unit":
+        """由 {'role': ['admin'], ...} 形式的单元构建，空值被忽略。"""
+        return cls(
+            Condition.of(intern_str(key), intern_str(value))
+            for key in sorted(unit.keys())
+            for value in unit.get(key, [])
+            if value
+        )
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        result: Dict[str, List[str]] = {}
+        for cond in self.conditions:
+            result.setdefault(cond.key, []).append(cond.value)
+        return result
+
+    @property
+    def condition_set(self) -> FrozenSet[Condition]:
+        return frozenset(self.conditions)
+
+    @property
+    def expression(self) -> str:
+        """如 "role:admin and system_scope:all"；空单元为空字符串。"""
+        return " and ".join(str(cond) for cond in self.conditions)
+
+    @property
+    def signature(self) -> str:
+        """如 "role:admin|member AND system_scope:all"；空单元为 "@"。"""
+        if self._signature is None:
+            grouped: Dict[str, set] = {}
+            for cond in self.conditions:
+                grouped.setdefault(cond.key, set()).add(cond.value)
+            parts = [f"{key}:{'|'.join(sorted(values))}" for key, values in sorted(grouped.items())]
+            self._signature = intern_str(" AND ".join(parts) if parts else "@")
+        return self._signature
+
+    def issubset(self, other: "Unit") -> bool:
+        return self.condition_set <= other.condition_set
+
+    def __bool__(self) -> bool:
+        return bool(self.conditions)
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Unit):
+            return NotImplemented
+        return self._hash == other._hash and self.conditions == other.conditions
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"Unit({self.expression or '@'})"
+
+
+class Rule:
+    """一条策略表达式及其最小匹配单元。"""
+
+    __slots__ = ("expression", "units")
+
+    def __init__(self, expression: str, units: Iterable[Unit]) -> None:
+        self.expression = expression
+        self.units: Tuple[Unit, ...] = tuple(units)
+
+    @property
+    def unit_signatures(self) -> List[str]:
+        return [unit.signature for unit in self.units]
+
+    def unit_expressions(self) -> List[str]:
+        """写入图时使用的单元表达式；没有非空单元时退回原表达式。"""
+        return [unit.expression for unit in self.units if unit] or [self.expression]
+
+    def __repr__(self) -> str:
+        return f"Rule({self.expression!r}, units={len(self.units)})"
+
+
+class Policy:
+    """策略名、规则与来源信息；raw_entries 为 [{'line': 行号, 'value': 原始表达式}]。"""
+
+    __slots__ = ("name", "rules", "file", "lines", "raw_entries")
+
+    def __init__(
+        self,
+        name: str,
+        file: str = "",
+        lines: Iterable[int] = (),
+        raw_entries: Iterable[Dict[str, Any]] = (),
+        rules: Iterable[Rule] = (),
+    ) -> None:
+        self.name = intern_str(name)
+        self.file = intern_str(file or "")
+        self.lines: Tuple[int, ...] = tuple(lines)
+        self.raw_entries: List[Dict[str, Any]] = list(raw_entries)
+        self.rules: List[Rule] = list(rules)
+
+    @property
+    def expressions(self) -> List[str]:
+        return [rule.expression for rule in self.rules]
+
+    @property
+    def unit_signatures(self) -> List[str]:
+        return [sig for rule in self.rules for sig in rule.unit_signatures]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {"file": self.file, "lines": list(self.lines), "raw_entries": self.raw_entries}
+
+    def __repr__(self) -> str:
+        return f"Policy({self.name!r}, rules={len(self.rules)})"
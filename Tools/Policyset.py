@@ -21,23 +21,27 @@ import shutil
 import sys
 from typing import Dict, Any
 
-try:
-    import yaml
-except ImportError:
-    print("缺少 PyYAML，请先安装：pip install pyyaml", file=sys.stderr)
-    sys.exit(1)
-
 
 DEFAULT_SRC = "/root/policy-fileparser/policy.yaml" #默认文件
 TARGET_POLICY = "/etc/keystone/keystone_policy.yaml" #keystone实际读取的文件
 KEYSTONE_CONF = "/etc/keystone/keystone.conf"
 
 
+def _yaml():
+    """按需导入 PyYAML，--help 等不读写策略文件的调用不承担导入开销。"""
+    try:
+        import yaml
+    except ImportError:
+        print("缺少 PyYAML，请先安装：pip install pyyaml", file=sys.stderr)
+        sys.exit(1)
+    return yaml
+
+
 def load_policy(path: str) -> Dict[str, Any]:
     if not os.path.exists(path):
         return {}
     with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = _yaml().safe_load(f) or {}
         if not isinstance(data, dict):
             raise ValueError(f"策略文件格式错误: {path}")
         return data
@@ -46,7 +50,7 @@ def load_policy(path: str) -> Dict[str, Any]:
 def save_policy(path: str, data: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+        _yaml().safe_dump(data, f, allow_unicode=True, sort_keys=False)
 
 
 def backup(path: str) -> None:
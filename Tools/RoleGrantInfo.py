@@ -9,16 +9,24 @@
   - /root/policy-fileparser/data/assistfile/EnvInfo/roleinfo.csv   (role_id,role_name)
   - /root/policy-fileparser/data/assistfile/EnvInfo/rolegrant.csv  (user_id,user_name,project_id,project_name,role_id,role_name)
 
-需要使用 admin 凭证执行，否则会提示权限不足。
+数据来源为 Tools/IdentitySnapshot.py 维护的身份快照；快照新鲜时不再调用 openstack CLI，
+仅在快照缺失/过期或传入 --refresh 时重新收集（此时需要使用 admin 凭证执行，否则会提示权限不足）。
 """
 
 from __future__ import annotations
 
-import json
+import argparse
 import os
 import subprocess
 import sys
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import Dict
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Tools import IdentitySnapshot as snapshot_store  # noqa: E402
 
 ASSIST_DIR = "/root/policy-fileparser/data/assistfile/EnvInfo"
 ENVINFO_DIR = "/root/policy-fileparser/data/assistfile/EnvInfo"
@@ -28,31 +36,6 @@ ROLE_CSV = os.path.join(ASSIST_DIR, "roleinfo.csv")
 ROLEGRANT_CSV = os.path.join(ASSIST_DIR, "rolegrant.csv")
 
 
-def run_json(cmd: List[str]) -> List[Dict[str, str]]:
-    """以 JSON 格式执行 openstack 命令并返回列表."""
-    try:
-        out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True)
-        return json.loads(out)
-    except subprocess.CalledProcessError as exc:
-        print(f"命令失败: {' '.join(cmd)}", file=sys.stderr)
-        print(exc.output, file=sys.stderr)
-        print("建议使用 admin 凭证重试。", file=sys.stderr)
-        return []
-    except json.JSONDecodeError as exc:
-        print(f"解析 JSON 失败: {exc}", file=sys.stderr)
-        return []
-
-
-def write_csv(path: str, rows: List[Tuple[str, ...]], header: Tuple[str, ...]) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    import csv
-
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(rows)
-
-
 def get_current_os_env() -> Dict[str, str]:
     try:
         out = subprocess.check_output(["bash", "-lc", "env | grep ^OS_"], text=True)
@@ -67,72 +50,6 @@ def get_current_os_env() -> Dict[str, str]:
     return current
 
 
-def collect_users() -> Dict[str, str]:
-    data = run_json(["openstack", "user", "list", "-f", "json", "-c", "ID", "-c", "Name"])
-    mapping = {item["ID"]: item["Name"] for item in data if "ID" in item and "Name" in item}
-    write_csv(USER_CSV, [(uid, name) for uid, name in mapping.items()], ("user_id", "user_name"))
-    return mapping
-
-
-def collect_projects() -> Dict[str, str]:
-    data = run_json(["openstack", "project", "list", "-f", "json", "-c", "ID", "-c", "Name"])
-    mapping = {item["ID"]: item["Name"] for item in data if "ID" in item and "Name" in item}
-    write_csv(PROJECT_CSV, [(pid, name) for pid, name in mapping.items()], ("project_id", "project_name"))
-    return mapping
-
-
-def collect_roles() -> Dict[str, str]:
-    data = run_json(["openstack", "role", "list", "-f", "json", "-c", "ID", "-c", "Name"])
-    mapping = {item["Name"]: item["ID"] for item in data if "ID" in item and "Name" in item}
-    write_csv(ROLE_CSV, [(rid, name) for name, rid in mapping.items()], ("role_id", "role_name"))
-    return mapping
-
-
-def collect_assignments(users: Dict[str, str], projects: Dict[str, str], roles: Dict[str, str]) -> List[Tuple[str, str, str, str, str, str]]:
-    rows: List[Tuple[str, str, str, str, str, str]] = []
-    user_ids = list(users.keys())
-    project_ids = list(projects.keys())
-
-    for uid in user_ids:
-        for pid in project_ids:
-            # 查询用户在项目上的角色
-            assignments = run_json(
-                [
-                    "openstack",
-                    "role",
-                    "assignment",
-                    "list",
-                    "--user",
-                    uid,
-                    "--project",
-                    pid,
-                    "--names",
-                    "-f",
-                    "json",
-                    "-c",
-                    "Role",
-                ]
-            )
-            if not assignments:
-                continue
-            for item in assignments:
-                role_name = item.get("Role")
-                if not role_name:
-                    continue
-                role_id = roles.get(role_name, "")
-                rows.append(
-                    (
-                        uid,
-                        users.get(uid, ""),
-                        pid,
-                        projects.get(pid, ""),
-                        role_id,
-                        role_name,
-                    )
-                )
-    return rows
-
-
 def check_openrc_files(users: Dict[str, str]) -> None:
     for user_id, user_name in users.items():
         if user_name == "admin":
@@ -143,7 +60,16 @@ def check_openrc_files(users: Dict[str, str]) -> None:
             print(f"{user_name} lost {openrc_name} file, recommend delete the {user_name}.")
 
 
-def main() -> None:
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="由身份快照生成 user/project/role/rolegrant CSV")
+    parser.add_argument("--snapshot", default=snapshot_store.SNAPSHOT_PATH, help="身份快照路径")
+    parser.add_argument("--refresh", action="store_true", help="忽略现有快照，重新从 Keystone 收集")
+    parser.add_argument("--max-age", type=float, default=snapshot_store.DEFAULT_MAX_AGE,
+                        help="快照过期秒数，默认 %(default)s；负数表示永不过期")
+    return parser.parse_args()
+
+
+def require_admin() -> None:
     print("当前环境变量:")
     try:
         env_out = subprocess.check_output(["bash", "-lc", "env | grep ^OS_"], text=True)
@@ -162,25 +88,27 @@ def main() -> None:
             print(f"当前项目: {current_project}")
         sys.exit(1)
 
-    users = collect_users()
-    projects = collect_projects()
-    roles = collect_roles()
 
-    if not users or not projects or not roles:
+def main() -> None:
+    args = parse_args()
+    cached = None if args.refresh else snapshot_store.load_snapshot(args.snapshot)
+    if snapshot_store.is_stale(cached, args.max_age):
+        require_admin()
+        snapshot, _ = snapshot_store.get_snapshot(args.snapshot, refresh=True)
+    else:
+        snapshot = cached
+        print(f"使用身份快照: {snapshot_store.describe(snapshot)}")
+
+    if not snapshot["users"] or not snapshot["projects"] or not snapshot["roles"]:
         print("获取用户/项目/角色信息失败，终止。", file=sys.stderr)
         sys.exit(1)
 
-    assignments = collect_assignments(users, projects, roles)
-    if not assignments:
+    total = snapshot_store.write_envinfo_csvs(snapshot, ASSIST_DIR)
+    if not total:
         print("未发现任何角色授权记录（可能缺少权限或没有授权）。")
-    write_csv(
-        ROLEGRANT_CSV,
-        assignments,
-        ("user_id", "user_name", "project_id", "project_name", "role_id", "role_name"),
-    )
-    print(f"已生成 {len(assignments)} 条授权记录 -> {ROLEGRANT_CSV}")
-
-    check_openrc_files(users)
+    print(f"已生成 {total} 条授权记录 -> {ROLEGRANT_CSV}")
+
+    check_openrc_files({u["id"]: u["name"] for u in snapshot["users"]})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+检测脚本登记表：DetectorService 与 PolicyDoctor 共用。
+
+只依赖标准库 pathlib，policy-doctor 等轻量入口导入它时不会连带导入服务端用到的 socket / subprocess 等模块。
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+# 检测名 -> 候选脚本路径（相对仓库根目录；容器内 fileparser 挂载为 policy-fileparser）
+DETECTORS: Dict[str, List[str]] = {
+    "pipeline": ["policy-fileparser/run_graph_pipeline.py", "fileparser/run_graph_pipeline.py"],
+    "static-stat": ["StatisticDetect/StatisticCheck.py"],
+    "static-unknown": ["StatisticDetect/UnkownStatisticCheck.py"],
+    "dynamic": ["DynamicDetect/Authorization_scope_check.py"],
+}
+
+
+def first_existing(candidates: List[str]) -> Path:
+    """返回候选路径中第一个存在的脚本；都不存在时返回第一个（由调用方报错）。"""
+    for rel in candidates:
+        path = ROOT_DIR / rel
+        if path.exists():
+            return path
+    return ROOT_DIR / candidates[0]
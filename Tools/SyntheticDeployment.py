@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+离线合成部署数据生成器：无需 OpenStack 环境，按参数生成可用于性能测试的策略文件、身份快照与 RBAC 日志。
+
+输出目录结构（--output-dir）：
+  - policies/<service>-policy.yaml   每个服务一份策略文件（含 rule: 别名定义）
+  - identity_snapshot.json           与 Tools/IdentitySnapshot.py 格式一致的身份快照
+  - EnvInfo/*.csv                    由快照导出的 userinfo/projectinfo/roleinfo/rolegrant.csv
+  - keystone.log                     与 keystone.common.rbac_enforcer 输出格式一致的 RBAC 日志
+  - manifest.json                    生成参数与规模统计
+
+规模参数：
+  - --scale 以当前测试环境规模（1 个服务 × 200 条策略、10 用户、5 项目、8 角色、600 次请求）为基准整体放大，
+    例如 --scale 10 / 100 / 1000；单独指定的 --services/--policies/--users 等参数优先。
+  - --rule-depth / --or-fanout 控制表达式嵌套深度与每层 or 分支数，--ref-density 控制 rule: 引用比例。
+  - --assignment-dist 控制每个用户的授权数量分布（uniform / zipf）。
+
+用法：
+  python /root/Tools/SyntheticDeployment.py --output-dir /tmp/synth --scale 10
+  python /root/policy-fileparser/run_graph_pipeline.py \\
+      --policy-files "$(ls /tmp/synth/policies/*.yaml | paste -sd,)" \\
+      --identity-snapshot /tmp/synth/identity_snapshot.json --identity-max-age -1
+  python /root/Tools/extract_keystone_rbac.py --log /tmp/synth/keystone.log
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from Tools import IdentitySnapshot as snapshot_store  # noqa: E402
+
+# 基准规模（scale=1），对应当前测试环境
+BASE_SIZES = {
+    "services": 1,
+    "policies": 200,
+    "users": 10,
+    "projects": 5,
+    "roles": 8,
+    "requests": 600,
+}
+
+BASE_ROLES = ["admin", "member", "reader"]
+SERVICE_NAMES = ["identity", "compute", "image", "volume", "network", "placement", "orchestration", "object"]
+RESOURCES = ["project", "user", "role", "domain", "server", "image", "volume", "port", "flavor", "quota",
+             "credential", "endpoint", "region", "group", "policy", "limit", "trust", "token"]
+VERBS = ["get", "list", "create", "update", "delete"]
+TARGET_ATTRS = ["project_id", "user_id", "domain_id"]
+
+
+def _service_names(count: int) -> List[str]:
+    names = []
+    for i in range(count):
+        base = SERVICE_NAMES[i % len(SERVICE_NAMES)]
+        names.append(base if i < len(SERVICE_NAMES) else f"{base}{i // len(SERVICE_NAMES)}")
+    return names
+
+
+def _hex_id(rng: random.Random) -> str:
+    return uuid.UUID(int=rng.getrandbits(128)).hex
+
+
+class PolicyGenerator:
+    """按深度 / or 扇出 / rule: 引用密度生成 oslo.policy 表达式。"""
+
+    def __init__(self, rng: random.Random, roles: Sequence[str], depth: int, fanout: int,
+                 ref_density: float, aliases_per_service: int) -> None:
+        self.rng = rng
+        self.roles = list(roles)
+        self.depth = max(0, depth)
+        self.fanout = max(1, fanout)
+        self.ref_density = min(max(ref_density, 0.0), 1.0)
+        self.aliases_per_service = max(0, aliases_per_service)
+
+    def _atom(self, aliases: Sequence[str]) -> str:
+        rng = self.rng
+        if aliases and rng.random() < self.ref_density:
+            return f"rule:{rng.choice(aliases)}"
+        kind = rng.random()
+        if kind < 0.6:
+            return f"role:{rng.choice(self.roles)}"
+        if kind < 0.8:
+            attr = rng.choice(TARGET_ATTRS)
+            return f"{attr}:%(target.{attr})s"
+        if kind < 0.9:
+            return "system_scope:all"
+        return f"project_id:%(project_id)s"
+
+    def expression(self, aliases: Sequence[str], depth: Optional[int] = None) -> str:
+        depth = self.depth if depth is None else depth
+        if depth <= 0:
+            return self._atom(aliases)
+        branches = []
+        for _ in range(self.rng.randint(1, self.fanout)):
+            left = self.expression(aliases, depth - 1)
+            right = self._atom(aliases)
+            branches.append(f"(({left}) and {right})")
+        return " or ".join(branches)
+
+    def alias_definitions(self, service: str) -> List[Tuple[str, str]]:
+        """别名只引用角色 / 属性，不相互引用，避免生成循环引用。"""
+        aliases = []
+        for i in range(self.aliases_per_service):
+            roles = self.rng.sample(self.roles, k=min(len(self.roles), self.rng.randint(1, 3)))
+            expr = " or ".join(f"role:{r}" for r in roles)
+            if self.rng.random() < 0.3:
+                expr = f"({expr}) and system_scope:all"
+            aliases.append((f"{service}_rule_{i}", expr))
+        return aliases
+
+    def service_policies(self, service: str, count: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        aliases = self.alias_definitions(service)
+        alias_names = [name for name, _ in aliases]
+        policies = []
+        for i in range(count):
+            verb = VERBS[i % len(VERBS)]
+            resource = RESOURCES[(i // len(VERBS)) % len(RESOURCES)]
+            suffix = i // (len(VERBS) * len(RESOURCES))
+            name = f"{service}:{verb}_{resource}" + (f"_{suffix}" if suffix else "")
+            policies.append((name, self.expression(alias_names)))
+        return aliases, policies
+
+
+def write_policy_file(path: str, aliases: List[Tuple[str, str]], policies: List[Tuple[str, str]]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# synthetic policy file generated by Tools/SyntheticDeployment.py\n")
+        for name, expr in aliases + policies:
+            f.write(f"{json.dumps(name)}: {json.dumps(expr)}\n")
+
+
+def _assignment_counts(rng: random.Random, users: int, roles: int, projects: int,
+                       mean: float, dist: str) -> List[int]:
+    limit = max(1, roles * projects)
+    counts = []
+    for rank in range(users):
+        if dist == "zipf":
+            # 少量用户拥有大量授权，长尾用户仅 1 个
+            value = int(round(mean * 2.0 / (1 + rank % 50) * (1 + rng.random())))
+        else:
+            value = rng.randint(1, max(1, int(round(mean * 2)) - 1))
+        counts.append(min(limit, max(1, value)))
+    return counts
+
+
+def build_identity(rng: random.Random, users: int, projects: int, roles: int,
+                   mean_assignments: float, dist: str, system_ratio: float) -> Dict[str, Any]:
+    role_names = BASE_ROLES + [f"role{i}" for i in range(max(0, roles - len(BASE_ROLES)))]
+    role_rows = [{"id": _hex_id(rng), "name": name} for name in role_names[:max(roles, 1)]]
+    domain_rows = [{"id": "default", "name": "Default"}]
+    project_rows = [{"id": _hex_id(rng), "name": "admin", "domain_id": "default"}]
+    project_rows += [
+        {"id": _hex_id(rng), "name": f"project{i}", "domain_id": "default"}
+        for i in range(max(0, projects - 1))
+    ]
+    user_rows = [{"id": _hex_id(rng), "name": "admin", "domain_id": "default", "email": ""}]
+    user_rows += [
+        {"id": _hex_id(rng), "name": f"user{i}", "domain_id": "default", "email": f"user{i}@example.com"}
+        for i in range(max(0, users - 1))
+    ]
+
+    admin_role = role_rows[0]
+    assignments = [
+        {"user_id": user_rows[0]["id"], "role_id": admin_role["id"],
+         "project_id": project_rows[0]["id"], "system_scope": None},
+        {"user_id": user_rows[0]["id"], "role_id": admin_role["id"],
+         "project_id": None, "system_scope": "all"},
+    ]
+    counts = _assignment_counts(rng, len(user_rows) - 1, len(role_rows), len(project_rows),
+                                mean_assignments, dist)
+    for user, count in zip(user_rows[1:], counts):
+        seen = set()
+        for _ in range(count):
+            role = rng.choice(role_rows)
+            if rng.random() < system_ratio:
+                key = (role["id"], None, "all")
+            else:
+                key = (role["id"], rng.choice(project_rows)["id"], None)
+            if key in seen:
+                continue
+            seen.add(key)
+            assignments.append(
+                {"user_id": user["id"], "role_id": key[0], "project_id": key[1], "system_scope": key[2]}
+            )
+
+    now = time.time()
+    return {
+        "version": snapshot_store.SNAPSHOT_VERSION,
+        "generated_at": dt.datetime.utcfromtimestamp(now).isoformat(timespec="seconds") + "Z",
+        "generated_ts": now,
+        "synthetic": True,
+        "users": user_rows,
+        "projects": project_rows,
+        "roles": role_rows,
+        "domains": domain_rows,
+        "role_assignments": assignments,
+    }
+
+
+def _log_line(ts: dt.datetime, pid: int, context: str, message: str) -> str:
+    stamp = ts.strftime("%Y-%m-%d %H:%M:%S.") + f"{ts.microsecond // 1000:03d}"
+    return (
+        f"{stamp} {pid} DEBUG keystone.common.rbac_enforcer.enforcer [{context}] RBAC: {message} "
+        "enforce_call /usr/lib/python3/dist-packages/keystone/common/rbac_enforcer/enforcer.py:449\n"
+    )
+
+
+def write_rbac_log(path: str, rng: random.Random, snapshot: Dict[str, Any], apis: Sequence[str],
+                   requests: int, deny_ratio: float) -> int:
+    """生成 Authorizing / Authorization 成对日志行，返回请求数。"""
+    assignments = snapshot["role_assignments"]
+    if not assignments or not apis:
+        return 0
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    ts = dt.datetime(2025, 12, 25, 12, 0, 0)
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(requests):
+            assignment = rng.choice(assignments)
+            req_id = f"req-{uuid.UUID(int=rng.getrandbits(128))}"
+            scope = "all" if assignment["system_scope"] else "None"
+            project_id = assignment["project_id"] or "-"
+            context = f"{scope} {req_id} {assignment['user_id']} {project_id} - - default default"
+            api = rng.choice(apis)
+            pid = rng.randint(100, 140)
+            ts += dt.timedelta(milliseconds=rng.randint(5, 2000))
+            f.write(_log_line(ts, pid, context, f"Authorizing `{api}()`"))
+            ts += dt.timedelta(milliseconds=rng.randint(1, 10))
+            result = "Authorization failed" if rng.random() < deny_ratio else "Authorization granted"
+            f.write(_log_line(ts, pid, context, result))
+    return requests
+
+
+def _size(args: argparse.Namespace, key: str) -> int:
+    value = getattr(args, key)
+    if value is not None:
+        return value
+    return max(1, int(round(BASE_SIZES[key] * args.scale)))
+
+
+def generate(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    sizes = {key: _size(args, key) for key in BASE_SIZES}
+    output_dir = os.path.abspath(args.output_dir)
+
+    snapshot = build_identity(
+        rng, sizes["users"], sizes["projects"], sizes["roles"],
+        args.assignments_per_user, args.assignment_dist, args.system_ratio,
+    )
+    role_names = [r["name"] for r in snapshot["roles"]]
+    policy_gen = PolicyGenerator(rng, role_names, args.rule_depth, args.or_fanout,
+                                 args.ref_density, args.aliases)
+
+    policy_files = []
+    apis: List[str] = []
+    per_service = max(1, sizes["policies"] // sizes["services"])
+    for service in _service_names(sizes["services"]):
+        aliases, policies = policy_gen.service_policies(service, per_service)
+        path = os.path.join(output_dir, "policies", f"{service}-policy.yaml")
+        write_policy_file(path, aliases, policies)
+        policy_files.append(path)
+        apis.extend(name for name, _ in policies)
+
+    snapshot_path = os.path.join(output_dir, "identity_snapshot.json")
+    snapshot_store.save_snapshot(snapshot, snapshot_path)
+    csv_count = snapshot_store.write_envinfo_csvs(snapshot, os.path.join(output_dir, "EnvInfo"))
+
+    log_path = os.path.join(output_dir, "keystone.log")
+    request_count = write_rbac_log(log_path, rng, snapshot, apis, sizes["requests"], args.deny_ratio)
+
+    manifest = {
+        "seed": args.seed,
+        "scale": args.scale,
+        "sizes": sizes,
+        "rule_depth": args.rule_depth,
+        "or_fanout": args.or_fanout,
+        "ref_density": args.ref_density,
+        "aliases_per_service": args.aliases,
+        "assignment_dist": args.assignment_dist,
+        "counts": {
+            "policies": len(apis),
+            "users": len(snapshot["users"]),
+            "projects": len(snapshot["projects"]),
+            "roles": len(snapshot["roles"]),
+            "role_assignments": len(snapshot["role_assignments"]),
+            "requests": request_count,
+            "log_lines": request_count * 2,
+            "envinfo_csv": csv_count,
+        },
+        "policy_files": policy_files,
+        "identity_snapshot": snapshot_path,
+        "keystone_log": log_path,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="离线生成合成策略 / 身份 / RBAC 日志数据")
+    parser.add_argument("--output-dir", required=True, help="输出目录")
+    parser.add_argument("--scale", type=float, default=1.0, help="相对当前测试环境的整体放大倍数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（相同参数输出一致）")
+    parser.add_argument("--services", type=int, help="服务数量")
+    parser.add_argument("--policies", type=int, help="策略总数（按服务均分）")
+    parser.add_argument("--users", type=int, help="用户数量（含 admin）")
+    parser.add_argument("--projects", type=int, help="项目数量（含 admin）")
+    parser.add_argument("--roles", type=int, help="角色数量（含 admin/member/reader）")
+    parser.add_argument("--requests", type=int, help="RBAC 日志中的请求数（每个请求 2 行）")
+    parser.add_argument("--rule-depth", type=int, default=2, help="表达式嵌套深度")
+    parser.add_argument("--or-fanout", type=int, default=2, help="每层 or 的最大分支数")
+    parser.add_argument("--ref-density", type=float, default=0.2, help="原子条件为 rule: 引用的比例")
+    parser.add_argument("--aliases", type=int, default=4, help="每个服务的 rule 别名数量")
+    parser.add_argument("--assignments-per-user", type=float, default=2.0, help="每个用户的平均授权数")
+    parser.add_argument("--assignment-dist", choices=["uniform", "zipf"], default="uniform",
+                        help="授权数量分布")
+    parser.add_argument("--system-ratio", type=float, default=0.05, help="system 范围授权比例")
+    parser.add_argument("--deny-ratio", type=float, default=0.1, help="日志中授权失败的比例")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    manifest = generate(args)
+    counts = manifest["counts"]
+    print(f"✓ 策略文件: {len(manifest['policy_files'])} 个, 策略 {counts['policies']} 条")
+    print(f"✓ 身份快照: 用户 {counts['users']}, 项目 {counts['projects']}, 角色 {counts['roles']}, "
+          f"授权 {counts['role_assignments']} -> {manifest['identity_snapshot']}")
+    print(f"✓ RBAC 日志: {counts['log_lines']} 行 -> {manifest['keystone_log']}")
+    print(f"✓ 清单: {os.path.join(os.path.abspath(args.output_dir), 'manifest.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,36 @@
-import re
-from typing import Dict, List
+import json
+from typing import Callable, Dict, List, Optional
 
 from . import config
 from .exec_utils import docker_exec
 
 
-ANSI_ESCAPE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-
-
-def parse_check_output(output_str: str) -> List[Dict[str, object]]:
-    errors = []
-    output_str = ANSI_ESCAPE.sub("", output_str)
-    blocks = output_str.split("-" * 40)
-
-    for block in blocks:
-        if not block.strip():
-            continue
-        error_item = {
-            "type": "Unknown",
-            "policy": "",
-            "info": "",
-            "recommendation": "",
-            "lines": [],
-        }
-        lines = block.strip().split("\n")
-        current_key = None
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("fault type:"):
-                error_item["type"] = line.split(":", 1)[1].strip()
-            elif line.startswith("fault policy rule:"):
-                current_key = "policy"
-            elif line.startswith("fault info:"):
-                current_key = None
-                error_item["info"] = line.split(":", 1)[1].strip()
-            elif line.startswith("recommendation:"):
-                current_key = None
-                error_item["recommendation"] = line.split(":", 1)[1].strip()
-            elif current_key == "policy":
-                error_item["policy"] += line + "\n"
-                match = re.search(r"line\s+(\d+):", line)
-                if match:
-                    error_item["lines"].append(int(match.group(1)))
-        if error_item["type"] != "Unknown" or error_item["policy"]:
-            errors.append(error_item)
-    return errors
+# 检测脚本以 NDJSON 方式逐条输出问题（见 Tools/CheckOutput.py），不再回解析文本块
+NDJSON_ENV = "POLICY_CHECK_NDJSON=-"
+
+
+def parse_finding(line: str) -> Optional[Dict[str, object]]:
+    """解析一行结构化输出；普通日志行返回 None。"""
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(record, dict) or "code" not in record:
+        return None
+    return {
+        "code": str(record.get("code", "")),
+        "type": record.get("type") or "Unknown",
+        "policy": record.get("policy", ""),
+        "api": record.get("api", ""),
+        "file": record.get("file", ""),
+        "rule": record.get("rule", ""),
+        "info": record.get("info", ""),
+        "recommendation": record.get("recommendation", ""),
+        "lines": record.get("lines", []),
+    }
 
 
 def summarize_errors(errors: List[Dict[str, object]]) -> Dict[str, object]:
@@ -57,47 +41,51 @@ def summarize_errors(errors: List[Dict[str, object]]) -> Dict[str, object]:
     return summary
 
 
-def run_static_check() -> Dict[str, object]:
-    outputs = []
-    res1 = docker_exec(
-        f"python {config.PIPELINE_SCRIPT} --show-check-report",
-        user="admin",
-        project="admin",
-        use_base_env=True,
-    )
-    outputs.append(res1.stdout)
-    outputs.append(res1.stderr)
-
-    res2 = docker_exec(
-        f"python {config.STAT_CHECK_SCRIPT}",
-        user="admin",
-        project="admin",
-        use_base_env=True,
-    )
-    outputs.append(res2.stdout)
-    outputs.append(res2.stderr)
-
-    res3 = docker_exec(
-        f"python {config.STAT_UNKNOWN_SCRIPT} check",
-        user="admin",
-        project="admin",
-        use_base_env=True,
-    )
-    outputs.append(res3.stdout)
-    outputs.append(res3.stderr)
+def _run_checks(commands: List[str], on_output: Optional[Callable[[str], None]]) -> Dict[str, object]:
+    errors: List[Dict[str, object]] = []
+
+    def handle(line: str) -> None:
+        # 问题随检测进度逐条到达：收集结构化记录，日志中只展示一行摘要
+        finding = parse_finding(line)
+        if finding is None:
+            if on_output is not None:
+                on_output(line)
+            return
+        errors.append(finding)
+        if on_output is not None:
+            on_output(f"[{finding['type']}] {finding['api'] or finding['policy'].strip()}\n")
 
-    combined = "\n".join([out for out in outputs if out])
-    errors = parse_check_output(combined)
+    for command in commands:
+        # 以逐行回调方式执行，stderr 同样经 handle 进入任务日志
+        docker_exec(
+            f"{NDJSON_ENV} {command}",
+            user="admin",
+            project="admin",
+            use_base_env=True,
+            on_output=handle,
+        )
     return {"errors": errors, "summary": summarize_errors(errors)}
 
 
-def run_dynamic_check() -> Dict[str, object]:
-    res = docker_exec(
-        f"python {config.DYNAMIC_CHECK_SCRIPT}",
-        user="admin",
-        project="admin",
-        use_base_env=True,
+def _detector_command(name: str, script: str, args: str = "") -> str:
+    """常驻检测服务可用时经其执行（服务未启动时客户端会自动拉起并直接运行脚本）。"""
+    if config.DETECTOR_SERVICE_ENABLED:
+        command = f"python {config.DETECTOR_SERVICE_SCRIPT} call {name}"
+    else:
+        command = f"python {script}"
+    return f"{command} {args}".rstrip()
+
+
+def run_static_check(on_output: Optional[Callable[[str], None]] = None) -> Dict[str, object]:
+    return _run_checks(
+        [
+            _detector_command("pipeline", config.PIPELINE_SCRIPT, "--show-check-report"),
+            _detector_command("static-stat", config.STAT_CHECK_SCRIPT),
+            _detector_command("static-unknown", config.STAT_UNKNOWN_SCRIPT, "check"),
+        ],
+        on_output,
     )
-    combined = res.stdout + ("\n" + res.stderr if res.stderr else "")
-    errors = parse_check_output(combined)
-    return {"errors": errors, "summary": summarize_errors(errors)}
+
+
+def run_dynamic_check(on_output: Optional[Callable[[str], None]] = None) -> Dict[str, object]:
+    return _run_checks([_detector_command("dynamic", config.DYNAMIC_CHECK_SCRIPT)], on_output)
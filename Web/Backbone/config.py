@@ -7,6 +7,10 @@ TEMP_ROOT = WEB_ROOT / "TempFile"
 TEMP_POLICY_DIR = TEMP_ROOT / "policy"
 TEMP_LOG_DIR = TEMP_ROOT / "log"
 STATE_FILE = TEMP_ROOT / "state.json"
+STATE_BLOB_DIR = TEMP_ROOT / "state_blobs"
+RESULT_CACHE_DIR = TEMP_ROOT / "cache"
+TEMP_UPLOAD_DIR = TEMP_ROOT / "uploads"
+ROW_STORE_PATH = TEMP_ROOT / "rows.sqlite3"
 
 SUDO_PASS_FILE = WEB_ROOT / "Backbone" / ".sudo_pass"
 
@@ -34,6 +38,34 @@ STAT_UNKNOWN_SCRIPT = "/root/StatisticDetect/UnkownStatisticCheck.py"
 DYNAMIC_CHECK_SCRIPT = "/root/DynamicDetect/Authorization_scope_check.py"
 EXTRACT_RBAC_SCRIPT = "/root/Tools/extract_keystone_rbac.py"
 ROLEGRANT_SCRIPT = "/root/Tools/RoleGrantInfo.py"
+IDENTITY_SNAPSHOT_SCRIPT = "/root/Tools/IdentitySnapshot.py"
+DETECTOR_SERVICE_SCRIPT = "/root/Tools/DetectorService.py"
+IDENTITY_SNAPSHOT_PATH = "/root/policy-fileparser/data/assistfile/EnvInfo/identity_snapshot.json"
+# 身份快照过期秒数（与 IdentitySnapshot.DEFAULT_MAX_AGE 一致），过期后环境概览与检查缓存键读取前先刷新
+IDENTITY_SNAPSHOT_MAX_AGE = float(os.environ.get("IDENTITY_SNAPSHOT_MAX_AGE", "3600"))
+
+# 后台任务：并发 worker 数、保留的历史任务数、每个任务保留的日志行数
+JOB_WORKERS = int(os.environ.get("WEB_JOB_WORKERS", "2"))
+JOB_HISTORY = 100
+JOB_LOG_LIMIT = 2000
+
+# 容器命令通道：复用常驻的 docker exec bash 进程（WEB_EXEC_CHANNEL=0 时退回每条命令单独 docker exec）
+EXEC_CHANNEL_ENABLED = os.environ.get("WEB_EXEC_CHANNEL", "1") != "0"
+EXEC_CHANNELS = int(os.environ.get("WEB_EXEC_CHANNELS", str(JOB_WORKERS + 1)))
+EXEC_CHANNEL_START_TIMEOUT = 30
+# 通道全部被占用时最多等待的秒数，超时后该命令退回单次 docker exec
+EXEC_CHANNEL_WAIT = float(os.environ.get("WEB_EXEC_CHANNEL_WAIT", "2"))
+
+# 常驻检测服务：检测脚本经容器内的 DetectorService 执行（模块与 Neo4j driver 常驻）；WEB_DETECTOR_SERVICE=0 时每次单独启动 python
+DETECTOR_SERVICE_ENABLED = os.environ.get("WEB_DETECTOR_SERVICE", "1") != "0"
+
+# 结果缓存：按策略/日志/身份快照内容哈希寻址，LRU 淘汰；结果格式变化时递增版本号
+RESULT_CACHE_VERSION = 1
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("WEB_RESULT_CACHE_MB", "256")) * 1024 * 1024
+RESULT_CACHE_MAX_ENTRIES = 200
+
+# 日志行 / 检查结果行存储中保留的数据集数量（按最近使用淘汰）
+ROW_STORE_MAX_DATASETS = 20
 
 HOST_INITIAL_SCRIPT = str(PROJECT_ROOT / "Tools" / "script" / "HostInitial.sh")
 HOST_KEYSTONE_RESTART_SCRIPT = str(PROJECT_ROOT / "Tools" / "script" / "keystoneRestart.sh")
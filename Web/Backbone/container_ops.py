@@ -2,6 +2,7 @@ import re
 from typing import Dict, Optional
 
 from . import config
+from .exec_channel import CHANNELS
 from .exec_utils import docker_container_status, docker_exec, docker_exec_simple, run_sudo
 from .state import STATE
 
@@ -50,8 +51,9 @@ def fetch_context(
         "auth_url": env_map.get("OS_AUTH_URL", ""),
         "region": env_map.get("OS_REGION_NAME", ""),
     }
-    STATE.update_context(context)
-    STATE.save()
+    with STATE.lock:
+        STATE.update_context(context)
+        STATE.save()
     return context
 
 
@@ -87,6 +89,8 @@ def restart_container() -> Dict[str, str]:
     _run("Host init", ["bash", config.HOST_INITIAL_SCRIPT])
     _run("Stop container", ["docker", "stop", config.CONTAINER_NAME])
     _run("Start container", ["docker", "start", config.CONTAINER_NAME])
+    # 容器重启后旧的常驻通道已失效
+    CHANNELS.close()
 
     init_result = docker_exec_simple(f"{config.OPENSTACK_INIT_SCRIPT}")
     if init_result.stdout:
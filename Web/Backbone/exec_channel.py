@@ -0,0 +1,205 @@
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from . import config
+from .exec_utils import CommandResult, _read_sudo_password
+
+
+_END = "__WEB_CHANNEL_END__"
+
+
+class ChannelError(RuntimeError):
+    pass
+
+
+class ExecChannel:
+    """
+    常驻容器内的 bash 进程（sudo docker exec -i ... bash -l），环境只初始化一次。
+
+    每条命令在子 shell 中执行（stdin 重定向到 /dev/null，避免吞掉后续请求），结束后在
+    stdout/stderr 各输出一行带请求 id 的结束标记，据此切分输出并取得返回码。
+    超时或通道异常时关闭进程，下次调用自动重建。
+    """
+
+    def __init__(self, init_commands: List[str]) -> None:
+        self._init_commands = init_commands
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    @staticmethod
+    def _reader(stream, name: str, lines: "queue.Queue") -> None:
+        for line in iter(stream.readline, ""):
+            lines.put((name, line))
+        lines.put((name, None))
+
+    def _start(self) -> None:
+        cmd = ["docker", "exec", "-i", config.CONTAINER_NAME, "bash", "-l"]
+        password = _read_sudo_password()
+        cmd = (["sudo", "-S", "-p", ""] if password else ["sudo"]) + cmd
+        env = os.environ.copy()
+        env.update(config.DOCKER_ENV)
+        self._proc = subprocess.Popen(
+            cmd,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        for stream, name in ((self._proc.stdout, "stdout"), (self._proc.stderr, "stderr")):
+            threading.Thread(target=self._reader, args=(stream, name, self._lines), daemon=True).start()
+        if password:
+            self._proc.stdin.write(password + "\n")
+        # 初始化环境并丢弃握手前的输出（sudo 提示、登录脚本输出等）
+        for line in self._init_commands:
+            self._proc.stdin.write(line + "\n")
+        handshake = self._send("true", timeout=config.EXEC_CHANNEL_START_TIMEOUT, subshell=False)
+        if not handshake.ok:
+            self.close()
+            raise ChannelError(handshake.stderr.strip() or "exec channel handshake failed")
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.close()
+
+    def _send(
+        self,
+        command: str,
+        timeout: Optional[int],
+        on_output: Optional[Callable[[str], None]] = None,
+        subshell: bool = True,
+    ) -> CommandResult:
+        request_id = uuid.uuid4().hex
+        marker = f"{_END}{request_id}"
+        if subshell:
+            # eval 包一层：命令本身的语法错误不会让常驻 shell 退出
+            body = f"( eval {shlex.quote(command)} ) </dev/null"
+            if timeout:
+                # 容器内超时，避免卡住常驻 shell
+                body = f"timeout -k 5 {int(timeout)} bash -c {shlex.quote(command)} </dev/null"
+        else:
+            body = command
+        script = (
+            f"{body}\n"
+            f"__rc=$?; printf '{marker} %s\\n' \"$__rc\"; printf '{marker}\\n' >&2\n"
+        )
+        self._proc.stdin.write(script)
+        self._proc.stdin.flush()
+
+        out: List[str] = []
+        err: List[str] = []
+        returncode = None
+        done = {"stdout": False, "stderr": False}
+        deadline = time.monotonic() + timeout + 10 if timeout else None
+        while not all(done.values()):
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                name, line = self._lines.get(timeout=wait)
+            except queue.Empty:
+                self.close()
+                return CommandResult(stdout="".join(out), stderr="".join(err) + "timeout", returncode=124)
+            if line is None:
+                # 命令执行中通道退出（例如容器重启），不再重放以免重复执行
+                self.close()
+                return CommandResult(stdout="".join(out), stderr="".join(err) + "exec channel closed", returncode=255)
+            index = line.find(marker)
+            if index >= 0:
+                # 命令输出末尾没有换行时，结束标记会接在最后一段输出之后
+                done[name] = True
+                if name == "stdout":
+                    returncode = int(line[index + len(marker):].strip() or 0)
+                line = line[:index]
+                if not line:
+                    continue
+            (out if name == "stdout" else err).append(line)
+            if on_output is not None:
+                on_output(line)
+        return CommandResult(stdout="".join(out), stderr="".join(err), returncode=returncode)
+
+    def run(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> CommandResult:
+        with self._lock:
+            try:
+                if not self.alive:
+                    self._start()
+                return self._send(command, timeout, on_output)
+            except OSError as exc:
+                self.close()
+                raise ChannelError(str(exc)) from exc
+
+
+class ChannelPool:
+    """
+    少量常驻通道，后台任务并发时各自占用一个通道。
+
+    通道全部被长时间检测占用时，最多等待 wait 秒；仍无空闲通道则返回 None，
+    由调用方退回单次 docker exec，避免状态查询等短命令排在长任务之后。
+    """
+
+    def __init__(self, size: int, init_commands: List[str], wait: float = config.EXEC_CHANNEL_WAIT) -> None:
+        self._channels = [ExecChannel(init_commands) for _ in range(max(1, size))]
+        self._free: "queue.Queue" = queue.Queue()
+        self._wait = wait
+        for channel in self._channels:
+            self._free.put(channel)
+
+    def run(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> Optional[CommandResult]:
+        try:
+            channel = self._free.get(timeout=self._wait)
+        except queue.Empty:
+            return None
+        try:
+            return channel.run(command, timeout=timeout, on_output=on_output)
+        finally:
+            self._free.put(channel)
+
+    def close(self) -> None:
+        for channel in self._channels:
+            channel.reset()
+
+
+CHANNELS = ChannelPool(
+    config.EXEC_CHANNELS,
+    [
+        "source /opt/miniconda/etc/profile.d/conda.sh",
+        "conda activate base",
+        "export PYTHONPATH=/root:${PYTHONPATH:-}",
+    ],
+)
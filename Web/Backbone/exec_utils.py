@@ -1,8 +1,11 @@
 import os
+import posixpath
 import shlex
 import subprocess
+import tarfile
+import threading
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from . import config
 
@@ -31,10 +34,13 @@ def run_command(
     env: Optional[dict] = None,
     input_text: Optional[str] = None,
     timeout: Optional[int] = None,
+    on_output: Optional[Callable[[str], None]] = None,
 ) -> CommandResult:
     merged_env = os.environ.copy()
     if env:
         merged_env.update(env)
+    if on_output is not None:
+        return _run_streaming(cmd, cwd, merged_env, input_text, timeout, on_output)
     completed = subprocess.run(
         cmd,
         cwd=cwd,
@@ -51,18 +57,86 @@ def run_command(
     )
 
 
+def _run_streaming(
+    cmd: List[str],
+    cwd: Optional[str],
+    env: dict,
+    input_text: Optional[str],
+    timeout: Optional[int],
+    on_output: Callable[[str], None],
+) -> CommandResult:
+    """
+    逐行回调输出，用于后台任务实时展示日志。stdout 与 stderr 的行都经 on_output 回调（串行调用），
+    但分别收集到 CommandResult.stdout / stderr，与常驻通道的返回方式一致。
+    """
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+    )
+    timer = threading.Timer(timeout, proc.kill) if timeout else None
+    if timer:
+        timer.start()
+    out: List[str] = []
+    err: List[str] = []
+    emit_lock = threading.Lock()
+
+    def pump(stream, lines: List[str]) -> None:
+        for line in stream:
+            lines.append(line)
+            with emit_lock:
+                on_output(line)
+
+    # stderr 由后台线程读取，避免任一管道写满阻塞子进程
+    stderr_reader = threading.Thread(target=pump, args=(proc.stderr, err), daemon=True)
+    stderr_reader.start()
+    try:
+        if input_text:
+            proc.stdin.write(input_text)
+        proc.stdin.close()
+        pump(proc.stdout, out)
+        returncode = proc.wait()
+        stderr_reader.join()
+    finally:
+        if timer:
+            timer.cancel()
+    return CommandResult(stdout="".join(out), stderr="".join(err), returncode=returncode)
+
+
 def run_sudo(
     cmd: List[str],
     cwd: Optional[str] = None,
     env: Optional[dict] = None,
     timeout: Optional[int] = None,
+    on_output: Optional[Callable[[str], None]] = None,
 ) -> CommandResult:
     password = _read_sudo_password()
     if password:
-        sudo_cmd = ["sudo", "-S"] + cmd
-        return run_command(sudo_cmd, cwd=cwd, env=env, input_text=password + "\n", timeout=timeout)
+        sudo_cmd = ["sudo", "-S", "-p", ""] + cmd
+        return run_command(
+            sudo_cmd, cwd=cwd, env=env, input_text=password + "\n", timeout=timeout, on_output=on_output
+        )
     sudo_cmd = ["sudo"] + cmd
-    return run_command(sudo_cmd, cwd=cwd, env=env, timeout=timeout)
+    return run_command(sudo_cmd, cwd=cwd, env=env, timeout=timeout, on_output=on_output)
+
+
+def _channel_exec(
+    command: str,
+    timeout: Optional[int],
+    on_output: Optional[Callable[[str], None]],
+) -> Optional[CommandResult]:
+    """通过常驻通道执行；通道不可用或全部繁忙（等待超过 EXEC_CHANNEL_WAIT 秒）时返回 None，由调用方退回单次 docker exec。"""
+    from .exec_channel import CHANNELS, ChannelError
+
+    try:
+        return CHANNELS.run(command, timeout=timeout, on_output=on_output)
+    except ChannelError:
+        return None
 
 
 def docker_exec(
@@ -72,6 +146,7 @@ def docker_exec(
     domain: Optional[str] = None,
     use_base_env: bool = True,
     timeout: Optional[int] = None,
+    on_output: Optional[Callable[[str], None]] = None,
 ) -> CommandResult:
     parts = []
     if user or project or domain:
@@ -83,6 +158,12 @@ def docker_exec(
         if domain:
             args.append(f"--domain {shlex.quote(domain)}")
         parts.append(f"source {config.CURRENT_USER_SCRIPT} {' '.join(args)}")
+    if config.EXEC_CHANNEL_ENABLED and use_base_env:
+        # 常驻通道中 conda/PYTHONPATH 已初始化，只需在子 shell 内切换用户上下文；
+        # use_base_env=False 的命令需要未激活 conda 的环境，不走常驻通道
+        result = _channel_exec(" && ".join(parts + [command]), timeout, on_output)
+        if result is not None:
+            return result
     if use_base_env:
         parts.append("source /opt/miniconda/etc/profile.d/conda.sh")
         parts.append("conda activate base")
@@ -101,10 +182,15 @@ def docker_exec(
         ],
         env=config.DOCKER_ENV,
         timeout=timeout,
+        on_output=on_output,
     )
 
 
 def docker_exec_simple(command: str, timeout: Optional[int] = None) -> CommandResult:
+    if config.EXEC_CHANNEL_ENABLED:
+        result = _channel_exec(command, timeout, None)
+        if result is not None:
+            return result
     return run_sudo(
         ["docker", "exec", "-i", config.CONTAINER_NAME, "bash", "-lc", command],
         env=config.DOCKER_ENV,
@@ -119,6 +205,55 @@ def docker_cp_to_container(src: str, dest: str) -> CommandResult:
     )
 
 
+def docker_put_file(
+    src: str,
+    dest: str,
+    mode: int = 0o644,
+    owner: str = "root",
+    group: str = "root",
+) -> CommandResult:
+    """
+    以流式 tar 管道把宿主机文件写入容器（docker exec -i ... tar -x），边读边发送，
+    同时通过 tar 头设置属主与权限，省去后续 chown/chmod 调用。
+    """
+    directory, name = posixpath.split(dest)
+    cmd = ["docker", "exec", "-i", config.CONTAINER_NAME, "tar", "-x", "--same-owner", "-C", directory, "-f", "-"]
+    password = _read_sudo_password()
+    cmd = (["sudo", "-S", "-p", ""] if password else ["sudo"]) + cmd
+    env = os.environ.copy()
+    env.update(config.DOCKER_ENV)
+    proc = subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stdout/stderr 由后台线程读取，避免管道写满阻塞 tar 流
+    collected = {}
+    readers = [
+        threading.Thread(target=lambda key, stream: collected.__setitem__(key, stream.read()), args=(key, stream))
+        for key, stream in (("stdout", proc.stdout), ("stderr", proc.stderr))
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        if password:
+            proc.stdin.write((password + "\n").encode("utf-8"))
+        info = tarfile.TarInfo(name)
+        info.size = os.path.getsize(src)
+        info.mtime = int(os.path.getmtime(src))
+        info.mode = mode
+        info.uname, info.gname = owner, group
+        with open(src, "rb") as handle, tarfile.open(fileobj=proc.stdin, mode="w|") as archive:
+            archive.addfile(info, handle)
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass
+    returncode = proc.wait()
+    for reader in readers:
+        reader.join()
+    return CommandResult(
+        stdout=collected.get("stdout", b"").decode("utf-8", "replace"),
+        stderr=collected.get("stderr", b"").decode("utf-8", "replace"),
+        returncode=returncode,
+    )
+
+
 def docker_cp_from_container(src: str, dest: str) -> CommandResult:
     return run_sudo(
         ["docker", "cp", f"{config.CONTAINER_NAME}:{src}", dest],
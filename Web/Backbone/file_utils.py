@@ -0,0 +1,74 @@
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+CHUNK_SIZE = 1 << 20
+
+# (path, size, mtime_ns) -> sha256，避免对未变化的大文件反复计算哈希
+_digests: Dict[Tuple[str, int, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+def _stat_key(path: Path) -> Tuple[str, int, int]:
+    st = path.stat()
+    return (str(path), st.st_size, st.st_mtime_ns)
+
+
+def remember_digest(path: Path, digest: str) -> None:
+    with _digests_lock:
+        _digests[_stat_key(path)] = digest
+
+
+def file_digest(path: Path) -> str:
+    key = _stat_key(path)
+    with _digests_lock:
+        if key in _digests:
+            return _digests[key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    remember_digest(path, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def write_stream(source: Union[BinaryIO, Path], target: Path, digest: Optional[str] = None) -> str:
+    """
+    将上传内容写入 target 并返回 sha256。
+
+    source 为流时分块写入同目录临时文件并边写边算哈希，最后原子替换；
+    source 为已落盘的文件（如断点续传的分片文件）时直接重命名，不再复制。
+    """
+    if isinstance(source, Path):
+        os.replace(source, target)
+        if digest is None:
+            return file_digest(target)
+        remember_digest(target, digest)
+        return digest
+
+    hasher = hashlib.sha256()
+    tmp_path = target.with_name(f".{target.name}.tmp{os.getpid()}.{threading.get_ident()}")
+    try:
+        with open(tmp_path, "wb") as out:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    remember_digest(target, hasher.hexdigest())
+    return hasher.hexdigest()
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """以硬链接生成 dst（失败时退回复制）；先删除 dst，避免改写与其共享 inode 的文件。"""
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -1,84 +1,236 @@
-from typing import Dict, List, Tuple
+import json
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from neo4j import GraphDatabase
+from . import config
+
+if str(config.PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(config.PROJECT_ROOT))
+
+from Tools.Neo4jDriver import get_driver as _shared_driver  # noqa: E402
 
 
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "Password"
 
-_driver = None
+# 节点分组按固定顺序编码为下标，前端据此还原 group/color
+GROUPS = ["PolicyNode", "RuleNode", "ConditionNode", "User", "Token", "Role", "Node"]
+MAX_PAGE = 2000
+MAX_HOPS = 3
+MAX_NEIGHBORHOOD_NODES = 2000
+_CACHE_ENTRIES = 64
+_LABEL_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_generation = 0
+_cache: "OrderedDict[Tuple, Any]" = OrderedDict()
+_cache_lock = threading.Lock()
 
 
 def get_driver():
-    global _driver
-    if _driver is None:
-        _driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    return _driver
-
-
-def get_graph_data(limit: int = 400) -> Dict[str, List[Dict[str, object]]]:
-    drv = get_driver()
-    nodes = []
-    edges = []
-    node_ids = set()
-
-    def serialize_node(node) -> Dict[str, object]:
-        labels = list(node.labels) if node.labels else []
-        label = labels[0] if labels else "Node"
-        color = "#a3bffa"
-        if "PolicyNode" in labels:
-            color = "#fbb6ce"
-        elif "RuleNode" in labels:
-            color = "#9ae6b4"
-        elif "ConditionNode" in labels:
-            color = "#faf089"
-        label_prop = node.get("name") or node.get("expression") or str(node.id)
-        return {
-            "id": node.id,
-            "label": label_prop,
-            "group": label,
-            "color": color,
-            "title": str(dict(node)),
-            "labels": labels,
-            "cond_type": node.get("type", ""),
-        }
-
-    query = "MATCH (n)-[r]->(m) RETURN n, r, m LIMIT $limit"
-    with drv.session() as session:
-        result = session.run(query, limit=limit)
-        for record in result:
-            n, r, m = record["n"], record["r"], record["m"]
-            if n.id not in node_ids:
-                nodes.append(serialize_node(n))
-                node_ids.add(n.id)
-            if m.id not in node_ids:
-                nodes.append(serialize_node(m))
-                node_ids.add(m.id)
-            edges.append({"from": n.id, "to": m.id, "label": type(r).__name__, "arrows": "to"})
-    return {"nodes": nodes, "edges": edges}
+    # Web 可能先于 Neo4j 启动，不在取 driver 时验证连通性，由查询自身报错
+    return _shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, verify=False)
+
+
+def bump_generation() -> None:
+    """图被重建（流水线运行、容器重启）后调用，使按代缓存的查询结果失效。"""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        _cache.clear()
+
+
+def graph_generation(session) -> str:
+    # 本进程触发的重建由计数器区分；节点总数（计数存储，O(1)）兜底识别容器内其他途径的重建
+    total = session.run("MATCH (n) RETURN count(n) AS c").single()["c"]
+    return f"{_generation}.{total}"
+
+
+def _cached(key: Tuple, build) -> Any:
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    encoded = build()
+    with _cache_lock:
+        _cache[key] = encoded
+        while len(_cache) > _CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return encoded
+
+
+def _encode_node(node) -> List[Any]:
+    labels = list(node.labels) if node.labels else []
+    group = next((g for g in GROUPS if g in labels), "Node")
+    label_prop = node.get("name") or node.get("expression") or str(node.id)
+    return [node.id, label_prop, GROUPS.index(group), node.get("type", "")]
+
+
+class _GraphBuilder:
+    """按节点 id 去重累积节点与边，输出紧凑编码：节点为 [id, label, group, cond_type]，边为 [from, to, type]。"""
+
+    def __init__(self) -> None:
+        self.nodes: Dict[int, List[Any]] = {}
+        self.edges: Dict[int, List[Any]] = {}
+
+    def add_node(self, node) -> None:
+        if node.id not in self.nodes:
+            self.nodes[node.id] = _encode_node(node)
+
+    def add_edge(self, rel) -> None:
+        if rel.id not in self.edges:
+            self.edges[rel.id] = [rel.start_node.id, rel.end_node.id, rel.type]
+
+    def expand(self, session, frontier: Iterable[int], hops: int, max_nodes: int) -> bool:
+        """
+        从 frontier 出发逐跳扩展（不区分方向），返回结果是否被截断：
+        超出 max_nodes，或某一跳返回的边数达到查询的 LIMIT（可能还有未取回的边）时为 True。
+        """
+        frontier = list(frontier)
+        truncated = False
+        for _ in range(hops):
+            if not frontier:
+                break
+            budget = max_nodes - len(self.nodes)
+            if budget <= 0:
+                return True
+            limit = budget * 4
+            result = session.run(
+                "MATCH (a)-[r]-(b) WHERE id(a) IN $ids RETURN r, b LIMIT $limit",
+                ids=frontier,
+                limit=limit,
+            )
+            next_frontier = []
+            returned = 0
+            for record in result:
+                returned += 1
+                b = record["b"]
+                if b.id not in self.nodes:
+                    if len(self.nodes) >= max_nodes:
+                        return True
+                    self.add_node(b)
+                    next_frontier.append(b.id)
+                self.add_edge(record["r"])
+            if returned >= limit:
+                truncated = True
+            frontier = next_frontier
+        return truncated
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"groups": GROUPS, "nodes": list(self.nodes.values()), "edges": list(self.edges.values())}
+
+
+def _seed_query(label: Optional[str], prefix: Optional[str]) -> str:
+    match = f"MATCH (n:`{label}`)" if label else "MATCH (n)"
+    where = " WHERE n.name STARTS WITH $prefix" if prefix else ""
+    return match + where
+
+
+def get_graph_page(
+    label: Optional[str] = "PolicyNode",
+    prefix: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 50,
+    hops: int = 2,
+    max_nodes: int = MAX_NEIGHBORHOOD_NODES,
+) -> str:
+    """
+    分页返回图片段（JSON 字符串）：按 label / name 前缀筛选种子节点，按 id 排序后取一页，
+    再向外扩展 hops 跳（默认 2 跳即 策略 -> 规则 -> 条件）。结果按图代缓存。
+    """
+    if label and not _LABEL_RE.match(label):
+        raise ValueError(f"invalid label: {label}")
+    offset = max(0, int(offset))
+    limit = max(1, min(MAX_PAGE, int(limit)))
+    hops = max(0, min(MAX_HOPS, int(hops)))
+    max_nodes = max(limit, min(MAX_NEIGHBORHOOD_NODES, int(max_nodes)))
+    with get_driver().session() as session:
+        generation = graph_generation(session)
+
+        def build() -> str:
+            seed = _seed_query(label, prefix)
+            total = session.run(f"{seed} RETURN count(n) AS c", prefix=prefix).single()["c"]
+            builder = _GraphBuilder()
+            result = session.run(
+                f"{seed} RETURN n ORDER BY id(n) SKIP $offset LIMIT $limit",
+                prefix=prefix,
+                offset=offset,
+                limit=limit,
+            )
+            for record in result:
+                builder.add_node(record["n"])
+            seeds = list(builder.nodes)
+            truncated = builder.expand(session, seeds, hops, max_nodes)
+            data = builder.to_dict()
+            next_offset = offset + len(seeds)
+            data.update(
+                {
+                    "generation": generation,
+                    "total": total,
+                    "offset": offset,
+                    "next_offset": next_offset if next_offset < total else None,
+                    "truncated": truncated,
+                }
+            )
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+        key = ("page", generation, label, prefix, offset, limit, hops, max_nodes)
+        return _cached(key, build)
+
+
+def get_neighborhood(node_id: int, hops: int = 1, max_nodes: int = 500) -> str:
+    """返回以 node_id 为中心的 k 跳邻域（JSON 字符串），供前端逐步展开。"""
+    hops = max(0, min(MAX_HOPS, int(hops)))
+    max_nodes = max(1, min(MAX_NEIGHBORHOOD_NODES, int(max_nodes)))
+    with get_driver().session() as session:
+        generation = graph_generation(session)
+
+        def build() -> str:
+            builder = _GraphBuilder()
+            record = session.run("MATCH (n) WHERE id(n) = $id RETURN n", id=int(node_id)).single()
+            if record is None:
+                raise KeyError(node_id)
+            builder.add_node(record["n"])
+            truncated = builder.expand(session, [int(node_id)], hops, max_nodes)
+            data = builder.to_dict()
+            data.update({"generation": generation, "center": int(node_id), "truncated": truncated})
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+        return _cached(("neighborhood", generation, int(node_id), hops, max_nodes), build)
+
+
+def get_node_detail(node_id: int) -> Optional[Dict[str, Any]]:
+    with get_driver().session() as session:
+        record = session.run("MATCH (n) WHERE id(n) = $id RETURN n", id=int(node_id)).single()
+    if record is None:
+        return None
+    node = record["n"]
+    return {"id": node.id, "labels": list(node.labels), "properties": dict(node)}
+
+
+_STATS_QUERY = """
+CALL { MATCH (n:PolicyNode) RETURN count(n) AS api }
+CALL { MATCH (n:RuleNode) RETURN count(n) AS rule }
+CALL { MATCH (n:User) RETURN count(n) AS user }
+CALL {
+    MATCH (n:ConditionNode) WHERE n.type IN ['role', 'project', 'project_id']
+    RETURN count(DISTINCT CASE WHEN n.type = 'role' THEN n.name END) AS role,
+           count(DISTINCT CASE WHEN n.type <> 'role' THEN n.name END) AS project
+}
+RETURN api, rule, role, project, user
+"""
 
 
 def get_graph_stats() -> Dict[str, int]:
-    drv = get_driver()
-    stats = {
-        "api": 0,
-        "rule": 0,
-        "role": 0,
-        "project": 0,
-        "user": 0,
-    }
-    with drv.session() as session:
-        stats["api"] = session.run("MATCH (n:PolicyNode) RETURN count(n) as c").single()["c"]
-        stats["rule"] = session.run("MATCH (n:RuleNode) RETURN count(n) as c").single()["c"]
-        stats["user"] = session.run("MATCH (n:User) RETURN count(n) as c").single()["c"]
-
-        role_count = session.run(
-            "MATCH (n:ConditionNode {type: 'role'}) RETURN count(DISTINCT n.name) as c"
-        ).single()["c"]
-        proj_count = session.run(
-            "MATCH (n:ConditionNode) WHERE n.type IN ['project', 'project_id'] RETURN count(DISTINCT n.name) as c"
-        ).single()["c"]
-        stats["role"] = role_count
-        stats["project"] = proj_count
-    return stats
+    """一次聚合查询得到统计（标签计数走计数存储，ConditionNode 只扫描一遍），按图代缓存。"""
+    with get_driver().session() as session:
+        generation = graph_generation(session)
+
+        def build() -> Dict[str, int]:
+            record = session.run(_STATS_QUERY).single()
+            return {key: record[key] for key in ("api", "rule", "role", "project", "user")}
+
+        return dict(_cached(("stats", generation), build))
@@ -0,0 +1,143 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from . import config
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+@dataclass
+class Job:
+    kind: str
+    key: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    progress: int = 0
+    stage: str = ""
+    logs: List[str] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _changed: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def update(self, progress: Optional[int] = None, stage: Optional[str] = None) -> None:
+        if progress is not None:
+            self.progress = max(0, min(100, int(progress)))
+        if stage is not None:
+            self.stage = stage
+        self._notify()
+
+    def log(self, line: str) -> None:
+        self.logs.append(line.rstrip("\n"))
+        if len(self.logs) > config.JOB_LOG_LIMIT:
+            del self.logs[: len(self.logs) - config.JOB_LOG_LIMIT]
+        self._notify()
+
+    def wait(self, timeout: float) -> None:
+        with self._changed:
+            if not self.done:
+                self._changed.wait(timeout)
+
+    def to_dict(self, since: int = 0, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "log_offset": len(self.logs),
+            "logs": self.logs[since:],
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result and self.done:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """后台任务队列：线程池执行耗时的容器操作，同一 key 的重复提交合并为同一个任务。"""
+
+    def __init__(self, max_workers: int, history: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="web-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, str] = {}
+        self._history = history
+
+    def submit(self, kind: str, key: str, func: Callable[[Job], Any]) -> Job:
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id and not self._jobs[active_id].done:
+                return self._jobs[active_id]
+            job = Job(kind=kind, key=key)
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+            self._prune()
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def _run(self, job: Job, func: Callable[[Job], Any]) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.update()
+        try:
+            job.result = func(job)
+            job.status = SUCCEEDED
+            job.progress = 100
+        except Exception as exc:
+            job.error = str(exc) or exc.__class__.__name__
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.key) == job.id:
+                    del self._active[job.key]
+            job.update()
+
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs.values() if job.done]
+        overflow = len(self._jobs) - self._history
+        for job in sorted(finished, key=lambda j: j.finished_at or 0)[: max(0, overflow)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self, kind: str) -> Optional[Job]:
+        with self._lock:
+            for job_id in self._active.values():
+                job = self._jobs.get(job_id)
+                if job and job.kind == kind and not job.done:
+                    return job
+        return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+        return [job.to_dict(since=len(job.logs), include_result=False) for job in jobs]
+
+
+JOBS = JobManager(max_workers=config.JOB_WORKERS, history=config.JOB_HISTORY)
@@ -1,12 +1,12 @@
 import csv
 import io
-import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import BinaryIO, Callable, Dict, List, Optional, Union
 
 from . import config
-from .exec_utils import docker_cp_from_container, docker_cp_to_container, docker_exec, docker_exec_simple
+from .exec_utils import docker_cp_from_container, docker_exec, docker_exec_simple, docker_put_file
+from .file_utils import link_or_copy, write_stream
 from .state import STATE
 
 
@@ -37,39 +37,44 @@ def _timestamped_name(prefix: str, suffix: str) -> str:
 
 def export_log() -> Dict[str, str]:
     dest = config.TEMP_LOG_DIR / config.DEFAULT_LOG_NAME
+    # 默认文件可能与导入文件共享 inode（硬链接），先删除再写入
+    dest.unlink(missing_ok=True)
     docker_cp_from_container(config.LOG_FILE_CONTAINER, str(dest))
 
     backup_name = _timestamped_name("OSkeystone", ".log")
-    shutil.copyfile(dest, config.TEMP_LOG_DIR / backup_name)
+    link_or_copy(dest, config.TEMP_LOG_DIR / backup_name)
 
-    STATE.set_current_file("log", config.DEFAULT_LOG_NAME)
-    STATE.reset_log_parse()
-    STATE.save()
+    with STATE.lock:
+        STATE.set_current_file("log", config.DEFAULT_LOG_NAME)
+        STATE.reset_log_parse()
+        STATE.save()
     return {"file": config.DEFAULT_LOG_NAME, "backup": backup_name}
 
 
-def import_log_file(filename: str, content: bytes) -> str:
+def import_log_file(filename: str, source: Union[BinaryIO, Path], digest: Optional[str] = None) -> str:
+    """分块写入上传内容（或直接移入已落盘的分片文件），并设为当前日志文件。"""
     target = config.TEMP_LOG_DIR / filename
     if target.exists():
         filename = _timestamped_name(Path(filename).stem or "keystone", ".log")
         target = config.TEMP_LOG_DIR / filename
-    target.write_bytes(content)
-
-    shutil.copyfile(target, config.TEMP_LOG_DIR / config.DEFAULT_LOG_NAME)
-    STATE.set_current_file("log", config.DEFAULT_LOG_NAME)
-    STATE.reset_log_parse()
-    STATE.reset_checks()
-    STATE.save()
+    write_stream(source, target, digest)
+
+    link_or_copy(target, config.TEMP_LOG_DIR / config.DEFAULT_LOG_NAME)
+    with STATE.lock:
+        STATE.set_current_file("log", config.DEFAULT_LOG_NAME)
+        STATE.reset_log_parse()
+        STATE.reset_checks()
+        STATE.save()
     return config.DEFAULT_LOG_NAME
 
 
 def ensure_log_in_container(path: Path) -> None:
-    docker_exec_simple(f"mkdir -p {config.LOG_DIR_CONTAINER}")
-    docker_exec_simple(f"chown keystone:keystone {config.LOG_DIR_CONTAINER}")
-    docker_exec_simple(f"chmod 750 {config.LOG_DIR_CONTAINER}")
-    docker_cp_to_container(str(path), config.LOG_FILE_CONTAINER)
-    docker_exec_simple(f"chown keystone:keystone {config.LOG_FILE_CONTAINER}")
-    docker_exec_simple(f"chmod 640 {config.LOG_FILE_CONTAINER}")
+    docker_exec_simple(
+        f"mkdir -p {config.LOG_DIR_CONTAINER} && chown keystone:keystone {config.LOG_DIR_CONTAINER}"
+        f" && chmod 750 {config.LOG_DIR_CONTAINER}"
+    )
+    # 流式 tar 管道写入，属主与权限（keystone:keystone 640）由 tar 头设置
+    docker_put_file(str(path), config.LOG_FILE_CONTAINER, mode=0o640, owner="keystone", group="keystone")
 
 
 def _read_container_csv(path: str) -> List[Dict[str, str]]:
@@ -81,18 +86,20 @@ def _read_container_csv(path: str) -> List[Dict[str, str]]:
     return [row for row in reader]
 
 
-def parse_rbac_log() -> Dict[str, List[Dict[str, str]]]:
+def parse_rbac_log(on_output: Optional[Callable[[str], None]] = None) -> Dict[str, List[Dict[str, str]]]:
     docker_exec(
         f"python {config.ROLEGRANT_SCRIPT}",
         user="admin",
         project="admin",
         use_base_env=True,
+        on_output=on_output,
     )
     docker_exec(
         f"python {config.EXTRACT_RBAC_SCRIPT}",
         user="admin",
         project="admin",
         use_base_env=True,
+        on_output=on_output,
     )
 
     rbac_rows = _read_container_csv("/root/policy-fileparser/data/assistfile/rbac_audit_keystone.csv")
@@ -1,28 +1,75 @@
 import json
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
+from . import config
 from .exec_utils import docker_exec
 
 
-def _run_openstack_json(cmd: str) -> List[Dict[str, str]]:
-    result = docker_exec(cmd, user="admin", project="admin", use_base_env=True)
+def _run_snapshot_command(args: str) -> Optional[Dict[str, Any]]:
+    result = docker_exec(
+        f"python {config.IDENTITY_SNAPSHOT_SCRIPT} {args}",
+        user="admin",
+        project="admin",
+        use_base_env=True,
+    )
     if not result.ok:
-        return []
+        return None
     try:
         return json.loads(result.stdout)
     except json.JSONDecodeError:
-        return []
+        return None
 
 
-def collect_env_overview() -> Dict[str, List[Dict[str, str]]]:
-    users = _run_openstack_json("openstack user list -f json")
-    projects = _run_openstack_json("openstack project list -f json")
-    domains = _run_openstack_json("openstack domain list -f json")
-    return {"users": users, "projects": projects, "domains": domains}
+def load_identity_snapshot(refresh: bool = False) -> Dict[str, Any]:
+    """读取容器内的身份快照；快照缺失或已过期（IDENTITY_SNAPSHOT_MAX_AGE）时先刷新，refresh=True 时强制刷新。"""
+    snapshot = None if refresh else _run_snapshot_command(
+        f"show --json --max-age {config.IDENTITY_SNAPSHOT_MAX_AGE:g}"
+    )
+    if snapshot is None:
+        docker_exec(
+            f"python {config.IDENTITY_SNAPSHOT_SCRIPT} refresh",
+            user="admin",
+            project="admin",
+            use_base_env=True,
+        )
+        snapshot = _run_snapshot_command("show --json")
+    return snapshot or {}
+
+
+def identity_digest() -> Optional[str]:
+    """
+    容器内身份快照文件的 sha256，用作检查结果缓存键的一部分；快照不存在时返回 None。
+    快照已过期时先刷新，使缓存键随身份数据更新。
+    """
+    result = docker_exec(
+        f"python {config.IDENTITY_SNAPSHOT_SCRIPT} show --max-age {config.IDENTITY_SNAPSHOT_MAX_AGE:g} "
+        f">/dev/null 2>&1; sha256sum {config.IDENTITY_SNAPSHOT_PATH} 2>/dev/null",
+        user="admin",
+        project="admin",
+        use_base_env=True,
+    )
+    if not result.ok or not result.stdout.strip():
+        return None
+    return result.stdout.split()[0]
+
+
+def _as_cli_rows(items: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    # Keep the `openstack ... -f json` shape the frontend already renders.
+    return [{"ID": item.get("id", ""), "Name": item.get("name", "")} for item in items]
+
+
+def collect_env_overview(refresh: bool = False) -> Dict[str, Any]:
+    snapshot = load_identity_snapshot(refresh=refresh)
+    return {
+        "users": _as_cli_rows(snapshot.get("users", [])),
+        "projects": _as_cli_rows(snapshot.get("projects", [])),
+        "domains": _as_cli_rows(snapshot.get("domains", [])),
+        "generated_at": snapshot.get("generated_at"),
+    }
 
 
-def collect_env_options() -> Dict[str, List[str]]:
-    overview = collect_env_overview()
+def collect_env_options(refresh: bool = False) -> Dict[str, List[str]]:
+    overview = collect_env_overview(refresh=refresh)
     users = [item.get("Name") for item in overview.get("users", []) if item.get("Name")]
     projects = [item.get("Name") for item in overview.get("projects", []) if item.get("Name")]
     domains = [item.get("Name") for item in overview.get("domains", []) if item.get("Name")]
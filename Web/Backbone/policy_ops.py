@@ -1,10 +1,10 @@
-import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import BinaryIO, Callable, Dict, List, Optional, Union
 
 from . import config
 from .exec_utils import docker_cp_from_container, docker_cp_to_container, docker_exec, docker_exec_simple
+from .file_utils import link_or_copy, write_stream
 from .state import STATE
 
 
@@ -43,29 +43,34 @@ def export_policy() -> Dict[str, str]:
     dest = config.TEMP_POLICY_DIR / config.DEFAULT_POLICY_NAME
     if not result.ok:
         return {"error": result.stderr.strip() or "export failed"}
+    # 默认文件可能与导入文件共享 inode（硬链接），先删除再写入
+    dest.unlink(missing_ok=True)
     docker_cp_from_container(config.POLICY_EXPORT_CONTAINER_PATH, str(dest))
 
     backup_name = _timestamped_name("OSpolicy", ".yaml")
-    shutil.copyfile(dest, config.TEMP_POLICY_DIR / backup_name)
+    link_or_copy(dest, config.TEMP_POLICY_DIR / backup_name)
 
-    STATE.set_current_file("policy", config.DEFAULT_POLICY_NAME)
-    STATE.reset_policy_parse()
-    STATE.save()
+    with STATE.lock:
+        STATE.set_current_file("policy", config.DEFAULT_POLICY_NAME)
+        STATE.reset_policy_parse()
+        STATE.save()
     return {"file": config.DEFAULT_POLICY_NAME, "backup": backup_name}
 
 
-def import_policy_file(filename: str, content: bytes) -> str:
+def import_policy_file(filename: str, source: Union[BinaryIO, Path], digest: Optional[str] = None) -> str:
+    """分块写入上传内容（或直接移入已落盘的分片文件），并设为当前策略文件。"""
     target = config.TEMP_POLICY_DIR / filename
     if target.exists():
         filename = _timestamped_name(Path(filename).stem or "policy", ".yaml")
         target = config.TEMP_POLICY_DIR / filename
-    target.write_bytes(content)
-
-    shutil.copyfile(target, config.TEMP_POLICY_DIR / config.DEFAULT_POLICY_NAME)
-    STATE.set_current_file("policy", config.DEFAULT_POLICY_NAME)
-    STATE.reset_policy_parse()
-    STATE.reset_checks()
-    STATE.save()
+    write_stream(source, target, digest)
+
+    link_or_copy(target, config.TEMP_POLICY_DIR / config.DEFAULT_POLICY_NAME)
+    with STATE.lock:
+        STATE.set_current_file("policy", config.DEFAULT_POLICY_NAME)
+        STATE.reset_policy_parse()
+        STATE.reset_checks()
+        STATE.save()
     return config.DEFAULT_POLICY_NAME
 
 
@@ -101,12 +106,13 @@ def ensure_policy_in_container(path: Path) -> None:
     docker_cp_to_container(str(path), config.POLICY_CONTAINER_PATH)
 
 
-def run_policy_pipeline() -> str:
+def run_policy_pipeline(on_output: Optional[Callable[[str], None]] = None) -> str:
     result = docker_exec(
         f"python {config.PIPELINE_SCRIPT} --show-policy-statistic",
         user="admin",
         project="admin",
         use_base_env=True,
+        on_output=on_output,
     )
     return result.stdout + ("\n" + result.stderr if result.stderr else "")
 
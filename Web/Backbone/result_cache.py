@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import config
+
+
+def cache_key(kind: str, **digests: Optional[str]) -> str:
+    """由结果类型与输入内容哈希（policy/log/identity）组合出缓存键。"""
+    parts = [f"v{config.RESULT_CACHE_VERSION}", kind]
+    parts.extend(f"{name}={digests[name] or '-'}" for name in sorted(digests))
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    按内容哈希寻址的结果缓存（解析结果、图统计、检查结果），每个条目一个 JSON 文件。
+
+    命中时刷新访问顺序，写入后按 LRU 淘汰直到满足条目数与磁盘大小上限。
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_entries: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            self._entries[path.stem] = path.stat().st_size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                value = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            os.utime(path, None)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        data = json.dumps(value, ensure_ascii=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+        tmp_path.write_text(data, encoding="utf-8")
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._entries[key] = len(data)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self) -> None:
+        total = sum(self._entries.values())
+        while self._entries and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            key, size = self._entries.popitem(last=False)
+            total -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+RESULTS = ResultCache(config.RESULT_CACHE_DIR, config.RESULT_CACHE_MAX_BYTES, config.RESULT_CACHE_MAX_ENTRIES)
@@ -0,0 +1,216 @@
+import base64
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import config
+
+
+# 每类数据集的列、可筛选列（精确匹配 / 前缀匹配）与可排序列
+SCHEMAS = {
+    "log_rows": {
+        "columns": ["timestamp", "api", "user_name", "project_name", "authorized"],
+        "exact": {"user": "user_name", "project": "project_name", "authorized": "authorized"},
+        "prefix": {"api": "api"},
+        "sort": ["timestamp", "api", "user_name", "project_name", "authorized"],
+        "default_sort": "timestamp",
+    },
+    "findings": {
+        "columns": ["type", "api", "policy", "info", "recommendation", "lines"],
+        "exact": {"type": "type"},
+        "prefix": {"api": "api"},
+        "sort": ["type", "api"],
+        "default_sort": "seq",
+    },
+}
+MAX_PAGE = 1000
+_POLICY_API = re.compile(r"line\s+\d+\s*:\s*(\S+)")
+
+
+def _encode_cursor(value: Any, seq: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, seq]).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> List[Any]:
+    try:
+        value, seq = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return [value, int(seq)]
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+
+
+class RowStore:
+    """
+    SQLite 行存储：日志解析行与检查结果按数据集（内容哈希）落盘并建索引，
+    支持筛选、排序与基于游标（排序值 + 序号）的分页，接口只返回当前页。
+    """
+
+    def __init__(self, path, max_datasets: int) -> None:
+        self.path = path
+        self.max_datasets = max_datasets
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS datasets (
+                    dataset TEXT PRIMARY KEY, kind TEXT, count INTEGER, used_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS log_rows (
+                    dataset TEXT, seq INTEGER, timestamp TEXT, api TEXT, user_name TEXT,
+                    project_name TEXT, authorized TEXT, PRIMARY KEY (dataset, seq)
+                );
+                CREATE INDEX IF NOT EXISTS log_rows_ts ON log_rows (dataset, timestamp, seq);
+                CREATE INDEX IF NOT EXISTS log_rows_api ON log_rows (dataset, api, seq);
+                CREATE INDEX IF NOT EXISTS log_rows_user ON log_rows (dataset, user_name, seq);
+                CREATE INDEX IF NOT EXISTS log_rows_project ON log_rows (dataset, project_name, seq);
+                CREATE INDEX IF NOT EXISTS log_rows_auth ON log_rows (dataset, authorized, seq);
+                CREATE TABLE IF NOT EXISTS findings (
+                    dataset TEXT, seq INTEGER, type TEXT, api TEXT, policy TEXT, info TEXT,
+                    recommendation TEXT, lines TEXT, PRIMARY KEY (dataset, seq)
+                );
+                CREATE INDEX IF NOT EXISTS findings_type ON findings (dataset, type, seq);
+                CREATE INDEX IF NOT EXISTS findings_api ON findings (dataset, api, seq);
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def _ingest(self, kind: str, dataset: str, records: Iterable[List[Any]]) -> None:
+        columns = SCHEMAS[kind]["columns"]
+        with self._lock:
+            conn = self._connect()
+            exists = conn.execute("SELECT 1 FROM datasets WHERE dataset = ?", (dataset,)).fetchone()
+            if exists:
+                conn.execute("UPDATE datasets SET used_at = ? WHERE dataset = ?", (time.time(), dataset))
+                conn.commit()
+                return
+            placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+            count = 0
+            with conn:
+                for seq, values in enumerate(records):
+                    conn.execute(
+                        f"INSERT INTO {kind} (dataset, seq, {', '.join(columns)}) VALUES ({placeholders})",
+                        [dataset, seq] + values,
+                    )
+                    count = seq + 1
+                conn.execute(
+                    "INSERT INTO datasets (dataset, kind, count, used_at) VALUES (?, ?, ?, ?)",
+                    (dataset, kind, count, time.time()),
+                )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        stale = conn.execute(
+            "SELECT dataset, kind FROM datasets ORDER BY used_at DESC LIMIT -1 OFFSET ?",
+            (self.max_datasets,),
+        ).fetchall()
+        with conn:
+            for row in stale:
+                conn.execute(f"DELETE FROM {row['kind']} WHERE dataset = ?", (row["dataset"],))
+                conn.execute("DELETE FROM datasets WHERE dataset = ?", (row["dataset"],))
+
+    def ingest_log_rows(self, dataset: str, rows: List[Dict[str, str]]) -> None:
+        columns = SCHEMAS["log_rows"]["columns"]
+        self._ingest("log_rows", dataset, ([row.get(col, "") for col in columns] for row in rows))
+
+    def ingest_findings(self, dataset: str, errors: List[Dict[str, Any]]) -> None:
+        def record(err: Dict[str, Any]) -> List[Any]:
+            api = err.get("api")
+            if not api:
+                match = _POLICY_API.search(err.get("policy") or "")
+                api = match.group(1) if match else ""
+            return [
+                err.get("type", ""),
+                api,
+                err.get("policy", ""),
+                err.get("info", ""),
+                err.get("recommendation", ""),
+                json.dumps(err.get("lines", [])),
+            ]
+
+        self._ingest("findings", dataset, (record(err) for err in errors))
+
+    def has(self, dataset: Optional[str]) -> bool:
+        if not dataset:
+            return False
+        with self._lock:
+            conn = self._connect()
+            return conn.execute("SELECT 1 FROM datasets WHERE dataset = ?", (dataset,)).fetchone() is not None
+
+    def page(
+        self,
+        kind: str,
+        dataset: str,
+        filters: Dict[str, str],
+        sort: Optional[str] = None,
+        order: str = "asc",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        schema = SCHEMAS[kind]
+        sort = sort or schema["default_sort"]
+        if sort != "seq" and sort not in schema["sort"]:
+            raise ValueError(f"invalid sort: {sort}")
+        descending = order == "desc"
+        limit = max(1, min(MAX_PAGE, int(limit)))
+
+        where = ["dataset = ?"]
+        params: List[Any] = [dataset]
+        for name, column in schema["exact"].items():
+            if filters.get(name):
+                where.append(f"{column} = ?")
+                params.append(filters[name])
+        for name, column in schema["prefix"].items():
+            if filters.get(name):
+                escaped = filters[name].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                where.append(f"{column} LIKE ? ESCAPE '\\'")
+                params.append(escaped + "%")
+        filter_sql = " AND ".join(where)
+        filter_params = list(params)
+
+        page_where = list(where)
+        if cursor:
+            value, seq = _decode_cursor(cursor)
+            op = "<" if descending else ">"
+            if sort == "seq":
+                page_where.append(f"seq {op} ?")
+                params.append(seq)
+            else:
+                page_where.append(f"({sort} {op} ? OR ({sort} = ? AND seq {op} ?))")
+                params.extend([value, value, seq])
+        direction = "DESC" if descending else "ASC"
+        order_sql = f"seq {direction}" if sort == "seq" else f"{sort} {direction}, seq {direction}"
+
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                f"SELECT * FROM {kind} WHERE {' AND '.join(page_where)} ORDER BY {order_sql} LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+            total = conn.execute(f"SELECT count(*) FROM {kind} WHERE {filter_sql}", filter_params).fetchone()[0]
+
+        items = []
+        for row in rows[:limit]:
+            item = {col: row[col] for col in schema["columns"]}
+            if kind == "findings":
+                item["lines"] = json.loads(item["lines"] or "[]")
+            item["seq"] = row["seq"]
+            items.append(item)
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = _encode_cursor(None if sort == "seq" else last[sort], last["seq"])
+        return {"items": items, "total": total, "next_cursor": next_cursor}
+
+
+ROWS = RowStore(config.ROW_STORE_PATH, config.ROW_STORE_MAX_DATASETS)
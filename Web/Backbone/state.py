@@ -1,4 +1,8 @@
+import copy
+import hashlib
 import json
+import os
+import threading
 from dataclasses import dataclass, field
 from typing import Any, Dict, Optional
 
@@ -19,6 +23,7 @@ DEFAULT_STATE = {
     "policy_parse": {
         "ready": False,
         "file": None,
+        "digest": None,
         "excel": [],
         "stats": {},
         "summary": {},
@@ -26,13 +31,15 @@ DEFAULT_STATE = {
     "log_parse": {
         "ready": False,
         "file": None,
-        "rows": [],
+        "digest": None,
         "summary": {},
     },
     "checks": {
-        "static": {"ready": False, "errors": [], "summary": {}},
-        "dynamic": {"ready": False, "errors": [], "summary": {}},
+        "static": {"ready": False, "digest": None, "summary": {}},
+        "dynamic": {"ready": False, "digest": None, "summary": {}},
     },
+    # 容器中当前已加载（策略图 / 日志解析结果）对应的内容哈希
+    "loaded": {"policy": None, "log": None},
     "env_options": {
         "ready": False,
         "users": [],
@@ -42,33 +49,113 @@ DEFAULT_STATE = {
 }
 
 
+# 大结果字段单独按内容哈希存为 blob，元数据中只保留 {"$blob": digest} 引用
+BLOB_REF = "$blob"
+
+
+def _is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and BLOB_REF in value
+
+
+def _atomic_write(path, text: str) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp{os.getpid()}.{threading.get_ident()}")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
 @dataclass
 class StateStore:
     data: Dict[str, Any] = field(default_factory=dict)
+    # 后台任务与请求线程共享同一份状态，写入需持有该锁
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+    # 已读取/写入的 blob 内容，按 digest 缓存，避免重复读盘
+    _blobs: Dict[str, Any] = field(default_factory=dict, repr=False)
 
     def load(self) -> None:
+        # 只读取元数据，blob 在首次 get 时才加载
         if config.STATE_FILE.exists():
             try:
                 self.data = json.loads(config.STATE_FILE.read_text(encoding="utf-8"))
                 for key, value in DEFAULT_STATE.items():
                     if key not in self.data:
-                        self.data[key] = json.loads(json.dumps(value))
+                        self.data[key] = copy.deepcopy(value)
+                self._migrate_inline()
                 return
             except (json.JSONDecodeError, OSError):
                 pass
-        self.data = json.loads(json.dumps(DEFAULT_STATE))
+        self.data = copy.deepcopy(DEFAULT_STATE)
 
     def save(self) -> None:
-        config.STATE_FILE.write_text(json.dumps(self.data, ensure_ascii=True, indent=2), encoding="utf-8")
+        # 元数据很小，每次整体原子替换；blob 在 set_* 时已写入，这里不再重写
+        with self.lock:
+            _atomic_write(config.STATE_FILE, json.dumps(self.data, ensure_ascii=True, separators=(",", ":")))
+            self._prune_blobs()
+
+    def _blob(self, value: Any) -> Dict[str, str]:
+        text = json.dumps(value, ensure_ascii=True, separators=(",", ":"))
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        path = config.STATE_BLOB_DIR / f"{digest}.json"
+        if not path.exists():
+            config.STATE_BLOB_DIR.mkdir(parents=True, exist_ok=True)
+            _atomic_write(path, text)
+        self._blobs[digest] = value
+        return {BLOB_REF: digest}
+
+    def _migrate_inline(self) -> None:
+        # 旧版 state.json 中内联保存的大字段转存为 blob；日志行与检查结果已改存 RowStore
+        policy_parse = self.data.get("policy_parse", {})
+        if isinstance(policy_parse.get("excel"), list):
+            policy_parse["excel"] = self._blob(policy_parse["excel"])
+        self.data.get("log_parse", {}).pop("rows", None)
+        for check in self.data.get("checks", {}).values():
+            check.pop("errors", None)
+
+    def _load_blob(self, digest: str) -> Any:
+        if digest not in self._blobs:
+            path = config.STATE_BLOB_DIR / f"{digest}.json"
+            try:
+                self._blobs[digest] = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                return []
+        return self._blobs[digest]
+
+    def _referenced(self, value: Any, found: set) -> set:
+        if _is_blob_ref(value):
+            found.add(value[BLOB_REF])
+        elif isinstance(value, dict):
+            for item in value.values():
+                self._referenced(item, found)
+        return found
+
+    def _prune_blobs(self) -> None:
+        referenced = self._referenced(self.data, set())
+        for digest in list(self._blobs):
+            if digest not in referenced:
+                del self._blobs[digest]
+        if not config.STATE_BLOB_DIR.exists():
+            return
+        for path in config.STATE_BLOB_DIR.glob("*.json"):
+            if path.stem not in referenced:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _resolve(self, value: Any) -> Any:
+        if _is_blob_ref(value):
+            return self._load_blob(value[BLOB_REF])
+        if isinstance(value, dict):
+            return {key: self._resolve(item) for key, item in value.items()}
+        return value
 
     def reset_policy_parse(self) -> None:
-        self.data["policy_parse"] = json.loads(json.dumps(DEFAULT_STATE["policy_parse"]))
+        self.data["policy_parse"] = copy.deepcopy(DEFAULT_STATE["policy_parse"])
 
     def reset_log_parse(self) -> None:
-        self.data["log_parse"] = json.loads(json.dumps(DEFAULT_STATE["log_parse"]))
+        self.data["log_parse"] = copy.deepcopy(DEFAULT_STATE["log_parse"])
 
     def reset_checks(self) -> None:
-        self.data["checks"] = json.loads(json.dumps(DEFAULT_STATE["checks"]))
+        self.data["checks"] = copy.deepcopy(DEFAULT_STATE["checks"])
 
     def set_env_options(self, users: list, projects: list, domains: list) -> None:
         self.data["env_options"] = {
@@ -79,7 +166,7 @@ class StateStore:
         }
 
     def reset_env_options(self) -> None:
-        self.data["env_options"] = json.loads(json.dumps(DEFAULT_STATE["env_options"]))
+        self.data["env_options"] = copy.deepcopy(DEFAULT_STATE["env_options"])
 
     def update_context(self, context: Dict[str, str]) -> None:
         self.data["context"].update(context)
@@ -88,31 +175,44 @@ class StateStore:
         key = "current_policy_file" if file_type == "policy" else "current_log_file"
         self.data[key] = filename
 
-    def set_policy_parse(self, filename: str, excel: list, stats: dict, summary: dict) -> None:
+    def set_policy_parse(
+        self, filename: str, excel: list, stats: dict, summary: dict, digest: Optional[str] = None
+    ) -> None:
         self.data["policy_parse"] = {
             "ready": True,
             "file": filename,
-            "excel": excel,
+            "digest": digest,
+            "excel": self._blob(excel),
             "stats": stats,
             "summary": summary,
         }
 
-    def set_log_parse(self, filename: str, rows: list, summary: dict) -> None:
+    def set_log_parse(self, filename: str, summary: dict, digest: Optional[str] = None) -> None:
         self.data["log_parse"] = {
             "ready": True,
             "file": filename,
-            "rows": rows,
+            "digest": digest,
             "summary": summary,
         }
 
-    def set_check_result(self, check_type: str, errors: list, summary: dict) -> None:
+    def set_check_result(self, check_type: str, summary: dict, digest: Optional[str] = None) -> None:
         self.data["checks"][check_type] = {
             "ready": True,
-            "errors": errors,
+            "digest": digest,
             "summary": summary,
         }
 
+    def set_loaded(self, kind: str, digest: Optional[str]) -> None:
+        self.data["loaded"][kind] = digest
+
     def get(self, key: str, default=None):
+        """返回 key 对应的值，其中的 blob 引用被解析为实际内容。"""
+        if key not in self.data:
+            return default
+        return self._resolve(self.data[key])
+
+    def meta(self, key: str, default=None):
+        """只读元数据（ready/file/digest 等），不加载 blob。"""
         return self.data.get(key, default)
 
 
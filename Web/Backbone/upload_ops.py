@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import json
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+from . import config
+from .file_utils import CHUNK_SIZE
+from .log_ops import import_log_file
+from .policy_ops import import_policy_file
+
+IMPORTERS = {"policy": import_policy_file, "log": import_log_file}
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class UploadError(ValueError):
+    pass
+
+
+def open_upload_stream(stream: BinaryIO, gzipped: bool) -> BinaryIO:
+    """需要服务端解压时包装为 gzip 流，读取时边读边解压。"""
+    return gzip.GzipFile(fileobj=stream, mode="rb") if gzipped else stream
+
+
+def is_gzip_name(filename: str) -> bool:
+    return filename.lower().endswith(".gz")
+
+
+def strip_gzip_suffix(filename: str) -> str:
+    return filename[:-3] if is_gzip_name(filename) else filename
+
+
+class UploadManager:
+    """
+    断点续传上传：分片按偏移追加到 TempFile/uploads/<id>.part，元数据写入 <id>.json。
+
+    客户端中断后可通过 status 查询已接收字节数并从该偏移继续；finish 时（必要时流式解压）
+    移入 policy/log 目录并设为当前文件。哈希随分片增量计算，进程重启后在 finish 时补算。
+
+    每个 upload_id 使用独立的锁，慢速客户端只阻塞自己的分片；导入（选择目标文件名、
+    设为当前文件）按 policy/log 类型串行，持锁期间只做本地文件操作。
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._upload_locks: Dict[str, threading.Lock] = {}
+        self._import_locks = {kind: threading.Lock() for kind in IMPORTERS}
+        self._hashers: Dict[str, Any] = {}
+
+    def _upload_lock(self, upload_id: str) -> threading.Lock:
+        with self._lock:
+            return self._upload_locks.setdefault(upload_id, threading.Lock())
+
+    def _forget(self, upload_id: str) -> None:
+        with self._lock:
+            self._upload_locks.pop(upload_id, None)
+            self._hashers.pop(upload_id, None)
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def _load(self, upload_id: str) -> Dict[str, Any]:
+        if not upload_id.isalnum():
+            raise UploadError("invalid upload id")
+        try:
+            return json.loads(self._meta_path(upload_id).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            raise UploadError("upload not found")
+
+    def start(self, kind: str, filename: str, size: Optional[int], gzipped: bool) -> Dict[str, Any]:
+        if kind not in IMPORTERS:
+            raise UploadError("invalid type")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        meta = {"id": upload_id, "kind": kind, "filename": filename, "size": size, "gzip": gzipped}
+        self._meta_path(upload_id).write_text(json.dumps(meta), encoding="utf-8")
+        self._part_path(upload_id).touch()
+        self._hashers[upload_id] = hashlib.sha256()
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._load(upload_id)
+        meta["received"] = self._part_path(upload_id).stat().st_size
+        return meta
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO) -> Dict[str, Any]:
+        self._load(upload_id)
+        with self._upload_lock(upload_id):
+            meta = self._load(upload_id)
+            part = self._part_path(upload_id)
+            received = part.stat().st_size
+            if offset != received:
+                raise UploadError(f"offset mismatch: expected {received}")
+            hasher = self._hashers.get(upload_id) if received else self._hashers.setdefault(upload_id, hashlib.sha256())
+            with open(part, "ab") as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    out.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+            meta["received"] = part.stat().st_size
+            return meta
+
+    def finish(self, upload_id: str) -> Dict[str, Any]:
+        self._load(upload_id)
+        with self._upload_lock(upload_id):
+            meta = self._load(upload_id)
+            part = self._part_path(upload_id)
+            received = part.stat().st_size
+            if meta.get("size") is not None and received != meta["size"]:
+                raise UploadError(f"incomplete upload: {received}/{meta['size']}")
+            importer = IMPORTERS[meta["kind"]]
+            filename = meta["filename"]
+            hasher = self._hashers.get(upload_id)
+            with open(part, "rb") as head:
+                gzipped = meta.get("gzip") or head.read(2) == GZIP_MAGIC
+            with self._import_locks[meta["kind"]]:
+                if gzipped:
+                    with open(part, "rb") as raw:
+                        stored = importer(filename, open_upload_stream(raw, True))
+                    part.unlink()
+                else:
+                    digest = hasher.hexdigest() if hasher is not None else None
+                    stored = importer(filename, part, digest)
+            self._meta_path(upload_id).unlink()
+        self._forget(upload_id)
+        return {"file": stored}
+
+    def abort(self, upload_id: str) -> None:
+        self._load(upload_id)
+        with self._upload_lock(upload_id):
+            for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+                path.unlink(missing_ok=True)
+        self._forget(upload_id)
+
+
+UPLOADS = UploadManager(config.TEMP_UPLOAD_DIR)
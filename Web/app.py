@@ -1,14 +1,19 @@
+import json
 import os
+import threading
+import time
 
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
 from werkzeug.utils import secure_filename
 
 from Backbone import config
 from Backbone.check_ops import run_dynamic_check, run_static_check
 from Backbone.container_ops import exec_terminal_command, get_container_status, restart_container, switch_context
-from Backbone.graph_ops import get_graph_data, get_graph_stats
+from Backbone.file_utils import file_digest
+from Backbone.graph_ops import bump_generation, get_graph_page, get_graph_stats, get_neighborhood, get_node_detail
+from Backbone.jobs import JOBS
 from Backbone.log_ops import choose_default_log_file, ensure_log_in_container, export_log, import_log_file, list_log_files, parse_rbac_log
-from Backbone.openstack_ops import collect_env_options, collect_env_overview
+from Backbone.openstack_ops import collect_env_options, collect_env_overview, identity_digest
 from Backbone.policy_ops import (
     apply_policy_to_container,
     choose_default_policy_file,
@@ -20,30 +25,37 @@ from Backbone.policy_ops import (
     restart_keystone,
     run_policy_pipeline,
 )
+from Backbone.result_cache import RESULTS, cache_key
+from Backbone.row_store import ROWS
 from Backbone.state import STATE
+from Backbone.upload_ops import UPLOADS, UploadError, is_gzip_name, open_upload_stream, strip_gzip_suffix
 
 app = Flask(__name__)
 app.config["JSON_SORT_KEYS"] = False
 
+# 容器中同一时刻只加载一份策略图 / 日志，加载操作串行执行
+_CONTAINER_SYNC = threading.Lock()
+
 
 def _ensure_current_files() -> None:
-    policy_file = STATE.get("current_policy_file")
-    if not policy_file or not (config.TEMP_POLICY_DIR / policy_file).exists():
-        policy_file = choose_default_policy_file()
-        STATE.set_current_file("policy", policy_file)
-        STATE.reset_policy_parse()
+    with STATE.lock:
+        policy_file = STATE.get("current_policy_file")
+        if not policy_file or not (config.TEMP_POLICY_DIR / policy_file).exists():
+            policy_file = choose_default_policy_file()
+            STATE.set_current_file("policy", policy_file)
+            STATE.reset_policy_parse()
 
-    log_file = STATE.get("current_log_file")
-    if not log_file or not (config.TEMP_LOG_DIR / log_file).exists():
-        log_file = choose_default_log_file()
-        STATE.set_current_file("log", log_file)
-        STATE.reset_log_parse()
+        log_file = STATE.get("current_log_file")
+        if not log_file or not (config.TEMP_LOG_DIR / log_file).exists():
+            log_file = choose_default_log_file()
+            STATE.set_current_file("log", log_file)
+            STATE.reset_log_parse()
 
-    STATE.save()
+        STATE.save()
 
 
 def _normalize_filename(filename: str, default_ext: str) -> str:
-    cleaned = secure_filename(filename)
+    cleaned = secure_filename(strip_gzip_suffix(filename))
     if not cleaned:
         cleaned = f"upload{default_ext}"
     if not cleaned.lower().endswith(default_ext):
@@ -75,6 +87,8 @@ def api_state():
             "log_parse": STATE.get("log_parse"),
             "checks": STATE.get("checks"),
             "env_options": STATE.get("env_options"),
+            "jobs": JOBS.list(),
+            "cache": RESULTS.stats(),
         }
     )
 
@@ -100,14 +114,15 @@ def api_context_options():
     cached = STATE.get("env_options", {})
     if cached.get("ready") and not refresh:
         return jsonify(cached)
-    options = collect_env_options()
-    STATE.set_env_options(
-        users=options.get("users", []),
-        projects=options.get("projects", []),
-        domains=options.get("domains", []),
-    )
-    STATE.save()
-    return jsonify(STATE.get("env_options"))
+    options = collect_env_options(refresh=refresh)
+    with STATE.lock:
+        STATE.set_env_options(
+            users=options.get("users", []),
+            projects=options.get("projects", []),
+            domains=options.get("domains", []),
+        )
+        STATE.save()
+        return jsonify(STATE.get("env_options"))
 
 
 @app.route("/api/terminal", methods=["POST"])
@@ -123,6 +138,7 @@ def api_terminal():
 @app.route("/api/container/restart", methods=["POST"])
 def api_container_restart():
     result = restart_container()
+    bump_generation()
     return jsonify(result)
 
 
@@ -146,8 +162,7 @@ def api_import_policy():
         return jsonify({"error": "no file"}), 400
     file = request.files["file"]
     filename = _normalize_filename(file.filename or "policy.yaml", ".yaml")
-    content = file.read()
-    stored = import_policy_file(filename, content)
+    stored = import_policy_file(filename, open_upload_stream(file.stream, is_gzip_name(file.filename or "")))
     return jsonify({"file": stored})
 
 
@@ -157,19 +172,58 @@ def api_import_log():
         return jsonify({"error": "no file"}), 400
     file = request.files["file"]
     filename = _normalize_filename(file.filename or "keystone.log", ".log")
-    content = file.read()
-    stored = import_log_file(filename, content)
+    stored = import_log_file(filename, open_upload_stream(file.stream, is_gzip_name(file.filename or "")))
     return jsonify({"file": stored})
 
 
+@app.route("/api/upload/start", methods=["POST"])
+def api_upload_start():
+    payload = request.get_json(silent=True) or {}
+    file_type = payload.get("type")
+    raw_name = payload.get("filename") or ""
+    default_name, ext = ("policy.yaml", ".yaml") if file_type == "policy" else ("keystone.log", ".log")
+    try:
+        status = UPLOADS.start(
+            file_type,
+            _normalize_filename(raw_name or default_name, ext),
+            payload.get("size"),
+            is_gzip_name(raw_name),
+        )
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(status)
+
+
+@app.route("/api/upload/<upload_id>", methods=["GET", "PUT", "DELETE"])
+def api_upload_chunk(upload_id):
+    try:
+        if request.method == "GET":
+            return jsonify(UPLOADS.status(upload_id))
+        if request.method == "DELETE":
+            UPLOADS.abort(upload_id)
+            return jsonify({"ok": True})
+        # 请求体为原始字节分片，直接流式追加到磁盘
+        offset = request.args.get("offset", 0, type=int)
+        return jsonify(UPLOADS.append(upload_id, offset, request.stream))
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 409 if "offset" in str(exc) else 404
+
+
+@app.route("/api/upload/<upload_id>/finish", methods=["POST"])
+def api_upload_finish(upload_id):
+    try:
+        return jsonify(UPLOADS.finish(upload_id))
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
 @app.route("/api/apply/policy", methods=["POST"])
 def api_apply_policy():
     if "file" not in request.files:
         return jsonify({"error": "no file"}), 400
     file = request.files["file"]
     filename = _normalize_filename(file.filename or "policy.yaml", ".yaml")
-    content = file.read()
-    stored = import_policy_file(filename, content)
+    stored = import_policy_file(filename, open_upload_stream(file.stream, is_gzip_name(file.filename or "")))
 
     restart_log = restart_container()
     path = config.TEMP_POLICY_DIR / stored
@@ -185,13 +239,14 @@ def api_select_file():
     filename = payload.get("filename")
     if file_type not in ("policy", "log"):
         return jsonify({"error": "invalid type"}), 400
-    STATE.set_current_file(file_type, filename)
-    if file_type == "policy":
-        STATE.reset_policy_parse()
-    else:
-        STATE.reset_log_parse()
-    STATE.reset_checks()
-    STATE.save()
+    with STATE.lock:
+        STATE.set_current_file(file_type, filename)
+        if file_type == "policy":
+            STATE.reset_policy_parse()
+        else:
+            STATE.reset_log_parse()
+        STATE.reset_checks()
+        STATE.save()
     return jsonify({"ok": True})
 
 
@@ -211,22 +266,61 @@ def api_file_content():
     return jsonify({"filename": filename, "content": content})
 
 
-@app.route("/api/policy/parse", methods=["POST"])
-def api_parse_policy():
-    _ensure_current_files()
-    filename = STATE.get("current_policy_file")
-    if not filename:
-        return jsonify({"error": "no policy file"}), 400
-    payload = request.get_json(silent=True) or {}
-    force = payload.get("force", False)
-    cached = STATE.get("policy_parse", {})
-    if cached.get("ready") and cached.get("file") == filename and not force:
-        return jsonify(cached)
-
-    path = config.TEMP_POLICY_DIR / filename
-
-    ensure_policy_in_container(path)
-    pipeline_log = run_policy_pipeline()
+def _job_response(job):
+    return jsonify(job.to_dict()), 202
+
+
+def _verify_digest(path, digest):
+    if file_digest(path) != digest:
+        raise RuntimeError(f"{path.name} changed while job was queued")
+
+
+def _is_current(kind, path, digest):
+    """
+    任务开始时的文件仍是当前选中的文件且内容未变（调用方持有 STATE.lock）。
+    任务运行期间用户可能经 /api/files/select 切换了文件，此时结果只写入结果缓存，不写回 STATE。
+    """
+    key = "current_policy_file" if kind == "policy" else "current_log_file"
+    return STATE.get(key) == path.name and path.exists() and file_digest(path) == digest
+
+
+def _sync_policy(job, path, digest, force=False):
+    """确保容器内的策略文件与策略图对应 digest，已加载且未强制时跳过；返回 pipeline 日志。"""
+    with _CONTAINER_SYNC:
+        if not force and STATE.meta("loaded", {}).get("policy") == digest:
+            return ""
+        _verify_digest(path, digest)
+        job.update(stage="copy policy")
+        ensure_policy_in_container(path)
+        job.update(stage="run pipeline")
+        pipeline_log = run_policy_pipeline(on_output=job.log)
+        bump_generation()
+        with STATE.lock:
+            STATE.set_loaded("policy", digest)
+            STATE.save()
+        return pipeline_log
+
+
+def _sync_log(job, path, digest, force=False):
+    """确保容器内的日志解析结果对应 digest，已加载且未强制时跳过（返回 None）。"""
+    with _CONTAINER_SYNC:
+        if not force and STATE.meta("loaded", {}).get("log") == digest:
+            return None
+        _verify_digest(path, digest)
+        job.update(stage="copy log")
+        ensure_log_in_container(path)
+        job.update(stage="parse log")
+        parsed = parse_rbac_log(on_output=job.log)
+        with STATE.lock:
+            STATE.set_loaded("log", digest)
+            STATE.save()
+        return parsed
+
+
+def _policy_parse_job(job, filename, path, digest):
+    job.update(5)
+    pipeline_log = _sync_policy(job, path, digest, force=True)
+    job.update(85, "collect stats")
     excel = parse_policy_file(path)
     stats = {}
     try:
@@ -235,13 +329,93 @@ def api_parse_policy():
         stats = {}
 
     summary = {"lines": len(excel)}
-    STATE.set_policy_parse(filename, excel, stats, summary)
-    STATE.save()
-    payload = dict(STATE.get("policy_parse") or {})
+    RESULTS.put(cache_key("policy_parse", policy=digest), {"excel": excel, "stats": stats, "summary": summary})
+    with STATE.lock:
+        if not _is_current("policy", path, digest):
+            job.log("当前策略文件已切换，解析结果不写回状态")
+            return {"ready": False, "file": filename, "digest": digest, "summary": summary, "stale": True,
+                    "log": pipeline_log}
+        STATE.set_policy_parse(filename, excel, stats, summary, digest)
+        STATE.save()
+        payload = dict(STATE.get("policy_parse") or {})
     payload["log"] = pipeline_log
+    return payload
+
+
+def _log_parse_job(job, filename, path, digest):
+    job.update(5)
+    parsed = _sync_log(job, path, digest, force=True)
+    rows = parsed.get("rows", [])
+
+    summary = {"rows": len(rows)}
+    RESULTS.put(cache_key("log_parse", log=digest), {"rows": rows, "summary": summary})
+    ROWS.ingest_log_rows(digest, rows)
+    with STATE.lock:
+        if not _is_current("log", path, digest):
+            job.log("当前日志文件已切换，解析结果不写回状态")
+            return {"ready": False, "file": filename, "digest": digest, "summary": summary, "stale": True}
+        STATE.set_log_parse(filename, summary, digest)
+        STATE.save()
+        return STATE.get("log_parse")
+
+
+def _check_job(job, check_type, runner, result_key, policy, log=None):
+    # 策略/日志解析可能来自缓存，检查前确保容器中加载的是对应版本
+    _sync_policy(job, *policy)
+    if log is not None:
+        _sync_log(job, *log)
+    job.update(10, f"{check_type} check")
+    result = runner(on_output=job.log)
+    # 静态检查会重新运行建图流水线
+    bump_generation()
+    RESULTS.put(result_key, result)
+    ROWS.ingest_findings(result_key, result["errors"])
+    with STATE.lock:
+        if not _is_current("policy", *policy) or (log is not None and not _is_current("log", *log)):
+            job.log("当前策略/日志文件已切换，检查结果不写回状态")
+            return {"ready": False, "digest": result_key, "summary": result["summary"], "stale": True}
+        STATE.set_check_result(check_type, result["summary"], result_key)
+        STATE.save()
+        return STATE.get("checks")[check_type]
+
+
+def _cached_response(payload):
+    payload = dict(payload)
+    payload["cached"] = True
     return jsonify(payload)
 
 
+@app.route("/api/policy/parse", methods=["POST"])
+def api_parse_policy():
+    _ensure_current_files()
+    filename = STATE.get("current_policy_file")
+    if not filename:
+        return jsonify({"error": "no policy file"}), 400
+    payload = request.get_json(silent=True) or {}
+    force = payload.get("force", False)
+    path = config.TEMP_POLICY_DIR / filename
+    digest = file_digest(path)
+    cached = STATE.meta("policy_parse", {})
+    if cached.get("ready") and cached.get("file") == filename and cached.get("digest") == digest and not force:
+        return jsonify(STATE.get("policy_parse"))
+
+    hit = None if force else RESULTS.get(cache_key("policy_parse", policy=digest))
+    if hit is not None:
+        with STATE.lock:
+            STATE.set_policy_parse(filename, hit["excel"], hit["stats"], hit["summary"], digest)
+            STATE.save()
+            result = STATE.get("policy_parse")
+        # 结果直接返回，容器中的策略图在后台切换到该版本
+        if STATE.meta("loaded", {}).get("policy") != digest:
+            JOBS.submit("policy_sync", f"policy_sync:{digest}", lambda job: _sync_policy(job, path, digest))
+        return _cached_response(result)
+
+    # 同一份策略内容的重复提交合并为同一个任务
+    key = f"policy_parse:{digest}"
+    job = JOBS.submit("policy_parse", key, lambda job: _policy_parse_job(job, filename, path, digest))
+    return _job_response(job)
+
+
 @app.route("/api/log/parse", methods=["POST"])
 def api_parse_log():
     _ensure_current_files()
@@ -250,74 +424,250 @@ def api_parse_log():
         return jsonify({"error": "no log file"}), 400
     payload = request.get_json(silent=True) or {}
     force = payload.get("force", False)
-    cached = STATE.get("log_parse", {})
-    if cached.get("ready") and cached.get("file") == filename and not force:
-        return jsonify(cached)
-
     path = config.TEMP_LOG_DIR / filename
-
-    ensure_log_in_container(path)
-    parsed = parse_rbac_log()
-    rows = parsed.get("rows", [])
-
-    summary = {"rows": len(rows)}
-    STATE.set_log_parse(filename, rows, summary)
-    STATE.save()
-    return jsonify(STATE.get("log_parse"))
+    digest = file_digest(path)
+    cached = STATE.meta("log_parse", {})
+    if cached.get("ready") and cached.get("file") == filename and cached.get("digest") == digest and not force:
+        return jsonify(STATE.get("log_parse"))
+
+    hit = None if force else RESULTS.get(cache_key("log_parse", log=digest))
+    if hit is not None:
+        ROWS.ingest_log_rows(digest, hit["rows"])
+        with STATE.lock:
+            STATE.set_log_parse(filename, hit["summary"], digest)
+            STATE.save()
+            return _cached_response(STATE.get("log_parse"))
+
+    key = f"log_parse:{digest}"
+    job = JOBS.submit("log_parse", key, lambda job: _log_parse_job(job, filename, path, digest))
+    return _job_response(job)
+
+
+@app.route("/api/jobs")
+def api_jobs():
+    return jsonify({"jobs": JOBS.list()})
+
+
+@app.route("/api/jobs/<job_id>")
+def api_job(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    since = request.args.get("since", 0, type=int)
+    return jsonify(job.to_dict(since=since))
+
+
+@app.route("/api/jobs/<job_id>/events")
+def api_job_events(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    since = request.args.get("since", 0, type=int)
+
+    def stream():
+        offset = since
+        last_state = None
+        last_sent = time.time()
+        while True:
+            snapshot = job.to_dict(since=offset, include_result=False)
+            state = (snapshot["status"], snapshot["progress"], snapshot["stage"])
+            if snapshot["logs"] or state != last_state:
+                offset = snapshot["log_offset"]
+                last_state = state
+                last_sent = time.time()
+                yield f"event: progress\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+            elif time.time() - last_sent > 15:
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+            if job.done:
+                yield f"event: done\ndata: {json.dumps(job.to_dict(since=offset), ensure_ascii=False)}\n\n"
+                return
+            job.wait(timeout=1)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def _json_text(text):
+    return Response(text, mimetype="application/json")
 
 
 @app.route("/api/graph")
 def api_graph():
+    args = request.args
+    try:
+        text = get_graph_page(
+            label=args.get("label", "PolicyNode") or None,
+            prefix=args.get("prefix") or None,
+            offset=args.get("offset", 0, type=int),
+            limit=args.get("limit", 50, type=int),
+            hops=args.get("hops", 2, type=int),
+            max_nodes=args.get("max_nodes", 2000, type=int),
+        )
+        return _json_text(text)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
+
+
+@app.route("/api/graph/neighborhood")
+def api_graph_neighborhood():
+    node_id = request.args.get("node", type=int)
+    if node_id is None:
+        return jsonify({"error": "missing node"}), 400
+    try:
+        text = get_neighborhood(
+            node_id,
+            hops=request.args.get("hops", 1, type=int),
+            max_nodes=request.args.get("max_nodes", 500, type=int),
+        )
+        return _json_text(text)
+    except KeyError:
+        return jsonify({"error": "node not found"}), 404
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
+
+
+@app.route("/api/graph/node/<int:node_id>")
+def api_graph_node(node_id):
     try:
-        data = get_graph_data()
-        return jsonify(data)
+        detail = get_node_detail(node_id)
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
+    if detail is None:
+        return jsonify({"error": "node not found"}), 404
+    return jsonify(detail)
+
+
+def _parsed_digest(kind, directory, filename):
+    """当前文件已解析且内容未变时返回其 digest，否则返回 None。"""
+    parsed = STATE.meta(f"{kind}_parse", {})
+    if not filename or not parsed.get("ready") or parsed.get("file") != filename:
+        return None
+    digest = file_digest(directory / filename)
+    return digest if parsed.get("digest") == digest else None
+
+
+def _check_response(check_type, result_key, force, submit):
+    cached = STATE.meta("checks", {}).get(check_type, {})
+    if cached.get("ready") and cached.get("digest") == result_key and not force:
+        return jsonify(STATE.get("checks")[check_type])
+    hit = None if force else RESULTS.get(result_key)
+    if hit is not None:
+        ROWS.ingest_findings(result_key, hit["errors"])
+        with STATE.lock:
+            STATE.set_check_result(check_type, hit["summary"], result_key)
+            STATE.save()
+            return _cached_response(STATE.get("checks")[check_type])
+    return _job_response(submit())
 
 
 @app.route("/api/check/static", methods=["POST"])
 def api_check_static():
-    policy_state = STATE.get("policy_parse", {})
     current_policy = STATE.get("current_policy_file")
-    if not policy_state.get("ready") or policy_state.get("file") != current_policy:
+    policy_hash = _parsed_digest("policy", config.TEMP_POLICY_DIR, current_policy)
+    if policy_hash is None:
         return jsonify({"error": "policy not parsed"}), 400
     payload = request.get_json(silent=True) or {}
     force = payload.get("force", False)
-    cached = STATE.get("checks", {}).get("static", {})
-    if cached.get("ready") and not force:
-        return jsonify(cached)
 
-    result = run_static_check()
-    STATE.set_check_result("static", result["errors"], result["summary"])
-    STATE.save()
-    return jsonify(result)
+    policy = (config.TEMP_POLICY_DIR / current_policy, policy_hash)
+    result_key = cache_key("check_static", policy=policy_hash, identity=identity_digest())
+    return _check_response(
+        "static",
+        result_key,
+        force,
+        lambda: JOBS.submit(
+            "check_static",
+            f"check_static:{result_key}",
+            lambda job: _check_job(job, "static", run_static_check, result_key, policy),
+        ),
+    )
 
 
 @app.route("/api/check/dynamic", methods=["POST"])
 def api_check_dynamic():
-    policy_state = STATE.get("policy_parse", {})
-    log_state = STATE.get("log_parse", {})
     current_policy = STATE.get("current_policy_file")
     current_log = STATE.get("current_log_file")
-    if not policy_state.get("ready") or policy_state.get("file") != current_policy:
+    policy_hash = _parsed_digest("policy", config.TEMP_POLICY_DIR, current_policy)
+    if policy_hash is None:
         return jsonify({"error": "policy not parsed"}), 400
-    if not log_state.get("ready") or log_state.get("file") != current_log:
+    log_hash = _parsed_digest("log", config.TEMP_LOG_DIR, current_log)
+    if log_hash is None:
         return jsonify({"error": "log not parsed"}), 400
     payload = request.get_json(silent=True) or {}
     force = payload.get("force", False)
-    cached = STATE.get("checks", {}).get("dynamic", {})
-    if cached.get("ready") and not force:
-        return jsonify(cached)
 
-    result = run_dynamic_check()
-    STATE.set_check_result("dynamic", result["errors"], result["summary"])
-    STATE.save()
-    return jsonify(result)
+    policy = (config.TEMP_POLICY_DIR / current_policy, policy_hash)
+    log = (config.TEMP_LOG_DIR / current_log, log_hash)
+    result_key = cache_key("check_dynamic", policy=policy_hash, log=log_hash, identity=identity_digest())
+    return _check_response(
+        "dynamic",
+        result_key,
+        force,
+        lambda: JOBS.submit(
+            "check_dynamic",
+            f"check_dynamic:{result_key}",
+            lambda job: _check_job(job, "dynamic", run_dynamic_check, result_key, policy, log),
+        ),
+    )
+
+
+def _restore_dataset(dataset, ingest, cached_key, field):
+    """行存储中的数据集被淘汰时，从结果缓存恢复；两处都没有时返回 False。"""
+    if ROWS.has(dataset):
+        return True
+    hit = RESULTS.get(cached_key)
+    if hit is None:
+        return False
+    ingest(dataset, hit[field])
+    return True
+
+
+def _page_response(kind, dataset, filter_names):
+    args = request.args
+    try:
+        page = ROWS.page(
+            kind,
+            dataset,
+            {name: args.get(name, "") for name in filter_names},
+            sort=args.get("sort") or None,
+            order=args.get("order", "asc"),
+            cursor=args.get("cursor") or None,
+            limit=args.get("limit", 100, type=int),
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(page)
+
+
+@app.route("/api/log/rows")
+def api_log_rows():
+    digest = _parsed_digest("log", config.TEMP_LOG_DIR, STATE.get("current_log_file"))
+    if digest is None:
+        return jsonify({"error": "log not parsed"}), 400
+    if not _restore_dataset(digest, ROWS.ingest_log_rows, cache_key("log_parse", log=digest), "rows"):
+        return jsonify({"error": "log rows expired, parse again"}), 404
+    return _page_response("log_rows", digest, ("api", "user", "project", "authorized"))
+
+
+@app.route("/api/check/<check_type>/findings")
+def api_check_findings(check_type):
+    if check_type not in ("static", "dynamic"):
+        return jsonify({"error": "invalid type"}), 400
+    check = STATE.meta("checks", {}).get(check_type, {})
+    dataset = check.get("digest")
+    if not check.get("ready") or not dataset:
+        return jsonify({"error": "check not run"}), 400
+    if not _restore_dataset(dataset, ROWS.ingest_findings, dataset, "errors"):
+        return jsonify({"error": "findings expired, run check again"}), 404
+    return _page_response("findings", dataset, ("type", "api"))
 
 
 @app.route("/api/env/overview")
 def api_env_overview():
-    overview = collect_env_overview()
+    refresh = request.args.get("refresh") == "1"
+    overview = collect_env_overview(refresh=refresh)
     return jsonify(overview)
 
 
@@ -11,6 +11,12 @@ const state = {
     policyParse: {},
     logParse: {},
     checks: { static: {}, dynamic: {} },
+    // 日志行与检查结果按页从服务端加载，key 为对应数据集的 digest
+    logRows: { key: null, items: [], cursor: null, total: 0, filters: { api: '', user: '', project: '', authorized: '' } },
+    findings: {
+        static: { key: null, items: [], cursor: null, total: 0 },
+        dynamic: { key: null, items: [], cursor: null, total: 0 },
+    },
     envOptions: { ready: false, users: [], domains: [], projects: [] },
     terminalHistory: [],
     commandHistory: [],
@@ -56,6 +62,44 @@ async function fetchJson(url, options = {}) {
     return data;
 }
 
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// 提交后台任务：接口返回 202 + job_id 时轮询 /api/jobs/<id> 直至完成，
+// 期间在遮罩层显示进度；命中缓存（200）时直接返回结果。
+async function runJob(url, body, label) {
+    const res = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body || {}),
+    });
+    let data = null;
+    try {
+        data = await res.json();
+    } catch (err) {
+        data = null;
+    }
+    if (!res.ok) {
+        const message = data && data.error ? data.error : `HTTP ${res.status}`;
+        throw new Error(message);
+    }
+    if (res.status !== 202 || !data || !data.job_id) {
+        return data;
+    }
+    let since = 0;
+    let job = data;
+    while (job.status !== 'succeeded' && job.status !== 'failed') {
+        await sleep(1000);
+        job = await fetchJson(`/api/jobs/${job.job_id}?since=${since}`);
+        since = job.log_offset;
+        const lastLine = job.logs && job.logs.length ? job.logs[job.logs.length - 1] : '';
+        els.overlayText.textContent = `${label} ${job.progress}% ${job.stage || ''}${lastLine ? ` | ${lastLine}` : ''}`;
+    }
+    if (job.status === 'failed') {
+        throw new Error(job.error || 'job failed');
+    }
+    return job.result;
+}
+
 function showOverlay(text) {
     els.overlayText.textContent = text;
     els.overlay.classList.add('active');
@@ -345,11 +389,7 @@ async function ensurePolicyParsed() {
     }
     showOverlay('解析 policy...');
     try {
-        const data = await fetchJson('/api/policy/parse', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ force: false }),
-        });
+        const data = await runJob('/api/policy/parse', { force: false }, '解析 policy...');
         state.policyParse = data;
         renderPolicy();
         loadGraph(true);
@@ -400,16 +440,60 @@ function renderPolicyStats() {
         .join('');
 }
 
+const GROUP_COLORS = { PolicyNode: '#fbb6ce', RuleNode: '#9ae6b4', ConditionNode: '#faf089' };
+
+// 后端紧凑编码：节点 [id, label, groupIdx, cond_type]，边 [from, to, type]
+function decodeGraph(data) {
+    const groups = data.groups || [];
+    const nodes = (data.nodes || []).map(([id, label, groupIdx, condType]) => {
+        const group = groups[groupIdx] || 'Node';
+        return { id, label, group, color: GROUP_COLORS[group] || '#a3bffa', labels: [group], cond_type: condType || '' };
+    });
+    const edges = (data.edges || []).map(([from, to, type]) => ({ id: `${from}-${type}-${to}`, from, to, label: type, arrows: 'to' }));
+    return { nodes, edges };
+}
+
+function mergeGraph(data) {
+    const { nodes, edges } = decodeGraph(data);
+    const fresh = nodes.filter((node) => !state.graph.nodes.get(node.id));
+    fresh.forEach((node) => {
+        state.graph.baseColors[node.id] = node.color;
+    });
+    state.graph.nodes.add(fresh);
+    state.graph.edges.update(edges);
+}
+
+async function expandGraphNode(nodeId) {
+    try {
+        const data = await fetchJson(`/api/graph/neighborhood?node=${nodeId}&hops=1`);
+        mergeGraph(data);
+    } catch (err) {
+        console.error(err);
+    }
+}
+
+async function showGraphNodeDetail(nodeId) {
+    const node = state.graph.nodes.get(nodeId);
+    if (!node || node.title) return;
+    try {
+        const detail = await fetchJson(`/api/graph/node/${nodeId}`);
+        state.graph.nodes.update({ id: nodeId, title: JSON.stringify(detail.properties, null, 1) });
+    } catch (err) {
+        console.error(err);
+    }
+}
+
 async function loadGraph(force = false) {
     if (state.graph.network && !force) return;
     try {
         const data = await fetchJson('/api/graph');
+        const decoded = decodeGraph(data);
         state.graph.data = data;
-        state.graph.nodes = new vis.DataSet(data.nodes || []);
-        state.graph.edges = new vis.DataSet(data.edges || []);
+        state.graph.nodes = new vis.DataSet(decoded.nodes);
+        state.graph.edges = new vis.DataSet(decoded.edges);
         state.graph.baseColors = {};
-        (data.nodes || []).forEach((node) => {
-            state.graph.baseColors[node.id] = node.color || '#a3bffa';
+        decoded.nodes.forEach((node) => {
+            state.graph.baseColors[node.id] = node.color;
         });
         const options = {
             nodes: { shape: 'dot', size: 16, font: { size: 12 } },
@@ -428,9 +512,14 @@ async function loadGraph(force = false) {
             const nodeId = params.nodes[0];
             const node = state.graph.nodes.get(nodeId);
             if (!node) return;
+            showGraphNodeDetail(nodeId);
             setFocus({ type: 'api', value: node.label });
             highlightGraph(nodeId);
         });
+        // 双击节点按需加载其一跳邻域
+        state.graph.network.on('doubleClick', (params) => {
+            if (params.nodes.length) expandGraphNode(params.nodes[0]);
+        });
         applyGraphFocus();
     } catch (err) {
         console.error(err);
@@ -475,11 +564,26 @@ function applyGraphFocus() {
         }
         return node.label.toLowerCase().includes(focusValue);
     });
-    if (!matched.length) return;
+    if (!matched.length) {
+        // 当前页未加载该 API 时按名称前缀向后端查询并合并
+        if (state.focus.type === 'api') loadGraphByPrefix(state.focus.value);
+        return;
+    }
     const focusId = matched[0].id;
     highlightGraph(focusId, state.focusColor);
 }
 
+async function loadGraphByPrefix(prefix) {
+    try {
+        const data = await fetchJson(`/api/graph?prefix=${encodeURIComponent(prefix)}&limit=5`);
+        mergeGraph(data);
+        const first = (data.nodes || [])[0];
+        if (first && state.focus.value === prefix) highlightGraph(first[0], state.focusColor);
+    } catch (err) {
+        console.error(err);
+    }
+}
+
 function setFocus({ type, value, line = null, color = undefined }) {
     if (state.selectedErrorIdx !== null && color === undefined) {
         return;
@@ -531,11 +635,7 @@ async function ensureLogParsed() {
     }
     showOverlay('解析 log...');
     try {
-        const data = await fetchJson('/api/log/parse', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ force: false }),
-        });
+        const data = await runJob('/api/log/parse', { force: false }, '解析 log...');
         state.logParse = data;
         renderLog();
     } catch (err) {
@@ -545,19 +645,103 @@ async function ensureLogParsed() {
     }
 }
 
-function renderLog() {
-    const rows = state.logParse.rows || [];
+const LOG_PAGE_SIZE = 200;
+
+async function loadLogRows(reset = true) {
+    const page = state.logRows;
+    if (reset) {
+        page.key = state.logParse.digest;
+        page.items = [];
+        page.cursor = null;
+    }
+    const params = new URLSearchParams({ limit: LOG_PAGE_SIZE, ...page.filters });
+    if (page.cursor) params.set('cursor', page.cursor);
+    try {
+        const data = await fetchJson(`/api/log/rows?${params}`);
+        page.items = page.items.concat(data.items || []);
+        page.cursor = data.next_cursor;
+        page.total = data.total || 0;
+    } catch (err) {
+        console.error(err);
+    }
+    renderLogRows();
+}
+
+function ensureLogToolbar() {
+    if (els.logTable.querySelector('.log-filters')) return;
+    els.logTable.innerHTML = `<div class="log-filters">
+            <input data-filter="api" placeholder="API 前缀">
+            <input data-filter="user" placeholder="User">
+            <input data-filter="project" placeholder="Project">
+            <select data-filter="authorized"><option value="">全部</option><option value="yes">授权通过</option><option value="no">授权失败</option><option value="unknown">未知</option></select>
+            <span class="log-total"></span>
+        </div>
+        <div class="log-rows"></div>
+        <button class="log-more" type="button">加载更多</button>`;
+    els.logTable.querySelectorAll('[data-filter]').forEach((input) => {
+        input.addEventListener('change', () => {
+            state.logRows.filters[input.dataset.filter] = input.value.trim();
+            loadLogRows(true);
+        });
+    });
+    els.logTable.querySelector('.log-more').addEventListener('click', () => loadLogRows(false));
+}
+
+function renderLogRows() {
+    ensureLogToolbar();
+    const page = state.logRows;
     let html = '<table><thead><tr><th>Time</th><th>API</th><th>User</th><th>Project</th></tr></thead><tbody>';
-    rows.forEach((row) => {
+    page.items.forEach((row) => {
         html += `<tr><td>${row.timestamp || ''}</td><td>${row.api || ''}</td><td>${row.user_name || ''}</td><td>${row.project_name || ''}</td></tr>`;
     });
     html += '</tbody></table>';
-    els.logTable.innerHTML = html;
+    els.logTable.querySelector('.log-rows').innerHTML = html;
+    els.logTable.querySelector('.log-total').textContent = `${page.items.length} / ${page.total}`;
+    els.logTable.querySelector('.log-more').style.display = page.cursor ? 'inline-flex' : 'none';
+}
+
+function renderLog() {
+    if (state.logRows.key !== state.logParse.digest) {
+        loadLogRows(true);
+        return;
+    }
+    renderLogRows();
+}
+
+const FINDINGS_PAGE_SIZE = 200;
+
+async function loadFindings(view, reset = true) {
+    const page = state.findings[view];
+    const digest = (state.checks[view] || {}).digest;
+    if (reset) {
+        page.key = digest;
+        page.items = [];
+        page.cursor = null;
+        page.total = 0;
+    }
+    if (digest) {
+        const params = new URLSearchParams({ limit: FINDINGS_PAGE_SIZE });
+        if (page.cursor) params.set('cursor', page.cursor);
+        try {
+            const data = await fetchJson(`/api/check/${view}/findings?${params}`);
+            page.items = page.items.concat(data.items || []);
+            page.cursor = data.next_cursor;
+            page.total = data.total || 0;
+        } catch (err) {
+            console.error(err);
+        }
+    }
+    if (view === state.checkView) renderChecks();
 }
 
 function renderChecks() {
     const current = state.checks[state.checkView] || {};
-    const errors = current.errors || [];
+    const page = state.findings[state.checkView];
+    if (current.ready && page.key !== current.digest) {
+        loadFindings(state.checkView, true);
+        return;
+    }
+    const errors = current.ready ? page.items : [];
     if (state.selectedErrorIdx !== null && state.selectedErrorIdx >= errors.length) {
         state.selectedErrorIdx = null;
         state.focusColor = null;
@@ -580,6 +764,10 @@ function renderChecks() {
                 </div>`;
             })
             .join('');
+        if (page.cursor) {
+            els.checkCards.innerHTML += `<button class="check-more" type="button">加载更多 (${errors.length} / ${page.total})</button>`;
+            els.checkCards.querySelector('.check-more').addEventListener('click', () => loadFindings(state.checkView, false));
+        }
     }
 
     els.checkCards.querySelectorAll('.check-card').forEach((card) => {
@@ -623,13 +811,45 @@ async function handleFileSelectChange() {
     loadFileContent();
 }
 
-async function handleImport(file, type, endpoint) {
+const UPLOAD_CHUNK = 8 * 1024 * 1024;
+
+// 分片上传：上传 id 按文件名/大小/修改时间记在 localStorage，中断后从服务端已接收的偏移继续
+async function uploadFile(file, type) {
+    const resumeKey = `upload:${type}:${file.name}:${file.size}:${file.lastModified}`;
+    let status = null;
+    const previous = localStorage.getItem(resumeKey);
+    if (previous) {
+        try {
+            status = await fetchJson(`/api/upload/${previous}`);
+        } catch (err) {
+            status = null;
+        }
+    }
+    if (!status) {
+        status = await fetchJson('/api/upload/start', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ type, filename: file.name, size: file.size }),
+        });
+        localStorage.setItem(resumeKey, status.id);
+    }
+    let offset = status.received || 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + UPLOAD_CHUNK);
+        status = await fetchJson(`/api/upload/${status.id}?offset=${offset}`, { method: 'PUT', body: chunk });
+        offset = status.received;
+        els.overlayText.textContent = `上传中... ${Math.floor((offset / file.size) * 100)}%`;
+    }
+    const result = await fetchJson(`/api/upload/${status.id}/finish`, { method: 'POST' });
+    localStorage.removeItem(resumeKey);
+    return result;
+}
+
+async function handleImport(file, type) {
     if (!file) return;
-    const formData = new FormData();
-    formData.append('file', file);
     showOverlay('上传中...');
     try {
-        await fetchJson(endpoint, { method: 'POST', body: formData });
+        await uploadFile(file, type);
         await refreshState();
         if (type === 'policy') {
             await ensurePolicyParsed();
@@ -729,14 +949,14 @@ function bindEvents() {
     els.exportPolicy.addEventListener('click', () => handleExport('/api/export/policy', '导出 policy...'));
     els.exportLog.addEventListener('click', () => handleExport('/api/export/log', '导出 log...'));
     els.importPolicy.addEventListener('change', (e) => handleApplyPolicy(e.target.files[0]));
-    els.manageImportPolicy.addEventListener('change', (e) => handleImport(e.target.files[0], 'policy', '/api/import/policy'));
-    els.manageImportLog.addEventListener('change', (e) => handleImport(e.target.files[0], 'log', '/api/import/log'));
+    els.manageImportPolicy.addEventListener('change', (e) => handleImport(e.target.files[0], 'policy'));
+    els.manageImportLog.addEventListener('change', (e) => handleImport(e.target.files[0], 'log'));
     els.fetchOverview.addEventListener('click', handleEnvOverview);
 
     els.runStaticCheck.addEventListener('click', async () => {
         showOverlay('静态检测中...');
         try {
-            const data = await fetchJson('/api/check/static', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ force: false }) });
+            const data = await runJob('/api/check/static', { force: false }, '静态检测中...');
             state.checks.static = data;
             state.selectedErrorIdx = null;
             state.focusColor = null;
@@ -752,7 +972,7 @@ function bindEvents() {
     els.runDynamicCheck.addEventListener('click', async () => {
         showOverlay('动态检测中...');
         try {
-            const data = await fetchJson('/api/check/dynamic', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ force: false }) });
+            const data = await runJob('/api/check/dynamic', { force: false }, '动态检测中...');
             state.checks.dynamic = data;
             state.selectedErrorIdx = null;
             state.focusColor = null;
@@ -0,0 +1,112 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# 仓库根目录（容器内为 /root），用于导入 Tools.ApiCatalog
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+# 不参与匹配的 Operation 取值（空单元格、未提供）
+EMPTY_OPERATIONS = {'', 'nan'}
+SKIP_OPERATIONS = EMPTY_OPERATIONS | {'N/A'}
+
+# Nova 动作类 API，例如 "Unlock Server (unlock Action)"
+ACTION_PATTERN = r'\(([^)]+)\s+[Aa]ction\)'
+
+
+def normalize_endpoint(values, strip_patterns=()):
+    """
+    标准化端点（整列向量化处理），用于匹配
+    1. 移除所有空格
+    2. 依次将 strip_patterns 中的正则替换为 '/'，例如 /v3/{project_id}/、/v2.0/
+    """
+    normalized = values.fillna('').astype(str).str.strip().str.replace(r'\s+', '', regex=True)
+    for pattern in strip_patterns:
+        normalized = normalized.str.replace(pattern, '/', regex=True)
+    return normalized
+
+
+def action_names(api_names):
+    """提取 Nova 动作类 API 名称括号中的动作名，非动作类 API 为 NaN"""
+    return api_names.fillna('').astype(str).str.extract(ACTION_PATTERN, expand=False).str.strip()
+
+
+def endpoint_keys(methods, paths, strip_patterns=(), actions=None):
+    """
+    由 HTTP 方法与 URL 路径生成 API 侧的匹配键。
+
+    actions 不为空时作为次级键拼接到端点之后，与 Policy 中
+    "POST /servers/{server_id}/action (unlock)" 形式的 Operation 对应。
+    """
+    endpoints = methods.fillna('').astype(str) + ' ' + paths.fillna('').astype(str)
+    if actions is not None:
+        endpoints = endpoints.where(actions.isna(), endpoints + ' (' + actions + ')')
+    return normalize_endpoint(endpoints, strip_patterns)
+
+
+def match_api_policy(df_api, df_policy, api_keys, policy_keys):
+    """
+    按标准化后的端点键对 API 与 Policy 做哈希连接（一个 API 可对应多条 Policy）。
+
+    Args:
+        df_api: API 列表
+        df_policy: Policy 列表
+        api_keys: 与 df_api 对齐的匹配键
+        policy_keys: 与 df_policy 对齐的匹配键
+
+    Returns:
+        (matched, unmatched_policies)：matched 按 API 原始顺序展开，包含两侧所有列，
+        _matched 列标记是否匹配到 Policy；unmatched_policies 为未被任何 API 使用的 Policy 行。
+    """
+    api = df_api.reset_index(drop=True).assign(_key=api_keys.values)
+    policy = df_policy.assign(_key=policy_keys.values, _policy_row=df_policy.index)
+    policy = policy[~policy['_key'].isin(SKIP_OPERATIONS)]
+
+    matched = api.merge(policy, on='_key', how='left', sort=False, suffixes=('', '_policy'))
+    matched['_matched'] = matched['_policy_row'].notna()
+    used = set(matched.loc[matched['_matched'], '_policy_row'])
+    unmatched_policies = df_policy[~df_policy.index.isin(used)]
+    return matched.reset_index(drop=True), unmatched_policies
+
+
+def summarize(matched, unmatched_policies):
+    """输出匹配统计"""
+    print(f"匹配完成:")
+    print(f"  总共匹配了 {int(matched['_matched'].sum())} 条记录")
+    print(f"  未匹配的 API: {int((~matched['_matched']).sum())} 条")
+    print(f"  未被使用的 Policy: {len(unmatched_policies)} 条")
+
+
+def write_catalog(service, matched, policy_column, url_column, actions=None, catalog_path=None):
+    """
+    把匹配成功的 (策略名, HTTP 方法, URL 模板, 动作名) 写入 Tools/ApiCatalog 目录索引，
+    整体替换该组件原有的记录；actions 与 matched 对齐（Nova 动作类 API）。
+    """
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+    from Tools.ApiCatalog import CATALOG_PATH, write_service
+
+    hit = matched['_matched']
+    rows = pd.DataFrame({
+        'policy': matched.loc[hit, policy_column].fillna('').astype(str),
+        'method': matched.loc[hit, 'HTTP方法'].fillna('').astype(str),
+        'url': matched.loc[hit, url_column].fillna('').astype(str),
+        'action': actions[hit].fillna('') if actions is not None else '',
+        'api_name': matched.loc[hit, 'API名称'].fillna('').astype(str),
+    }).to_dict('records')
+    catalog_path = catalog_path or CATALOG_PATH
+    count = write_service(service, rows, catalog_path)
+    print(f"API 目录已更新: {service} {count} 条 -> {catalog_path}")
+    return count
+
+
+def parse_merge_args(service, api_file, policy_file, output_file):
+    """各 *merge.py 共用的命令行参数；Excel 结果改为按需导出"""
+    parser = argparse.ArgumentParser(description=f'匹配 {service} 的 API 与 Policy，写入 API 目录索引')
+    parser.add_argument('--api-file', default=api_file, help='API 列表，默认 %(default)s')
+    parser.add_argument('--policy-file', default=policy_file, help='Policy 列表，默认 %(default)s')
+    parser.add_argument('--catalog', help='API 目录文件，默认 Tools/ApiCatalog.CATALOG_PATH（可用 API_CATALOG_PATH 修改）')
+    parser.add_argument('--excel', action='store_true', help='同时导出带合并单元格的 Excel 结果')
+    parser.add_argument('--output', default=output_file, help='Excel 输出路径，默认 %(default)s')
+    return parser.parse_args()
@@ -1,7 +1,9 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 
+from docfetch import fetch_soup
+
+DOC_URL = 'https://docs.openstack.org/cinder/2023.1/configuration/block-storage/policy.html'
+
 def extract_cinder_policy(url):
     """
     从 OpenStack Cinder policy 文档中提取策略信息
@@ -12,10 +14,8 @@ def extract_cinder_policy(url):
     Returns:
         DataFrame 包含策略名称、Default、Operations 和描述
     """
-    # 发送请求获取页面内容
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # 获取页面内容（经 docfetch 缓存）
+    soup = fetch_soup(url)
     
     # 存储提取的数据
     policy_data = []
@@ -96,7 +96,7 @@ def extract_cinder_policy(url):
 
 def main():
     # OpenStack Cinder policy 文档 URL
-    url = 'https://docs.openstack.org/cinder/2023.1/configuration/block-storage/policy.html'
+    url = DOC_URL
     
     print(f"正在从 {url} 提取策略信息...")
     print("-" * 80)
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+# 页面缓存目录：<sha1(url)>.html 为页面内容，<sha1(url)>.json 记录 url/ETag/Last-Modified
+CACHE_DIR = Path(os.environ.get('COMPONENT_DOC_CACHE', Path(__file__).resolve().parent / 'doc_cache'))
+# COMPONENT_DOC_OFFLINE=1 时只从缓存目录（或保存的 HTML fixture）回放，不访问网络
+OFFLINE_ENV = 'COMPONENT_DOC_OFFLINE'
+TIMEOUT = 60
+POOL_SIZE = 16
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _default_parser():
+    """
+    默认使用内置 html.parser，与原抽取脚本的解析结果一致；
+    lxml 对不规范 HTML 构建的树不同，需显式设置 COMPONENT_DOC_PARSER=lxml 启用
+    """
+    return os.environ.get('COMPONENT_DOC_PARSER') or 'html.parser'
+
+
+PARSER = _default_parser()
+
+
+def get_session():
+    """所有抓取共享一个带连接池的 Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def is_offline():
+    return os.environ.get(OFFLINE_ENV, '') not in ('', '0')
+
+
+def _cache_paths(url):
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return CACHE_DIR / f'{key}.html', CACHE_DIR / f'{key}.json'
+
+
+def _atomic_write(path, data):
+    tmp = path.with_name(f'.{path.name}.tmp{os.getpid()}.{threading.get_ident()}')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def fetch_html(url, headers=None, refresh=False):
+    """
+    获取页面 HTML（utf-8 解码）
+
+    已缓存时携带 If-None-Match / If-Modified-Since 重新验证，304 直接使用缓存；
+    离线模式下只读缓存，缺失时报错。refresh=True 时忽略缓存重新下载。
+    """
+    body_path, meta_path = _cache_paths(url)
+    cached = body_path.exists() and not refresh
+    if is_offline():
+        if not body_path.exists():
+            raise FileNotFoundError(f'离线模式下缺少页面缓存: {url} -> {body_path}')
+        return body_path.read_bytes().decode('utf-8', 'replace')
+
+    request_headers = dict(headers or {})
+    meta = {}
+    if cached and meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    response = get_session().get(url, headers=request_headers, timeout=TIMEOUT)
+    if response.status_code == 304 and cached:
+        return body_path.read_bytes().decode('utf-8', 'replace')
+    response.raise_for_status()
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _atomic_write(body_path, response.content)
+    meta = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+    return response.content.decode('utf-8', 'replace')
+
+
+def fetch_soup(url, headers=None):
+    """获取页面并解析为 BeautifulSoup"""
+    return BeautifulSoup(fetch_html(url, headers), PARSER)
+
+
+def prefetch(urls, workers=8, refresh=False):
+    """并发获取（或重新验证）一组页面，返回 {url: 错误信息}，成功的页面不出现在结果中"""
+    errors = {}
+
+    def fetch(url):
+        try:
+            fetch_html(url, refresh=refresh)
+        except Exception as exc:
+            errors[url] = str(exc)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(fetch, urls))
+    return errors
+
+
+def save_fixture(url, html_file):
+    """把手工保存的 HTML 页面登记为 url 的缓存，供离线回放"""
+    body_path, meta_path = _cache_paths(url)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _atomic_write(body_path, Path(html_file).read_bytes())
+    _atomic_write(meta_path, json.dumps({'url': url, 'etag': None, 'last_modified': None}).encode('utf-8'))
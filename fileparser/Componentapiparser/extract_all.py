@@ -0,0 +1,114 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# 组件 -> (API 提取脚本, Policy 提取脚本)
+SERVICES = {
+    'keystone': ('keystoneapi', 'keystonepolicy'),
+    'nova': ('novaapi', 'nova_policy'),
+    'cinder': ('cinderapi', 'cinderpolicy'),
+    'glance': ('glanceapi', 'glancepolicy'),
+    'neutron': ('neutronapi', 'neutronpolicy'),
+}
+
+
+def select_modules(services, kind):
+    modules = []
+    for service in services:
+        api_module, policy_module = SERVICES[service]
+        if kind in ('api', 'all'):
+            modules.append(api_module)
+        if kind in ('policy', 'all'):
+            modules.append(policy_module)
+    return modules
+
+
+def run_extractor(module_name, output_dir):
+    """在子进程中运行单个提取脚本的 main()，输出收集后统一打印，避免多个脚本的日志交错"""
+    if str(SCRIPT_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPT_DIR))
+    os.chdir(output_dir)
+    import importlib
+
+    buffer = io.StringIO()
+    start = time.time()
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        importlib.import_module(module_name).main()
+    return module_name, time.time() - start, buffer.getvalue()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='并发抓取并解析各组件的 API / Policy 文档')
+    parser.add_argument('--services', default=','.join(SERVICES), help='逗号分隔的组件，默认: %(default)s')
+    parser.add_argument('--kind', choices=['api', 'policy', 'all'], default='all')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='并发抓取/解析的进程数')
+    parser.add_argument('--output-dir', default='.', help='Excel 输出目录，默认当前目录')
+    parser.add_argument('--cache-dir', help='页面缓存目录，默认 Componentapiparser/doc_cache')
+    parser.add_argument('--offline', action='store_true', help='只使用缓存 / fixture 页面，不访问网络')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存重新下载全部页面')
+    parser.add_argument('--fixture', action='append', default=[], metavar='URL=FILE',
+                        help='将保存的 HTML 文件登记为某个 URL 的页面，可重复传入')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    services = [s.strip() for s in args.services.split(',') if s.strip()]
+    unknown = [s for s in services if s not in SERVICES]
+    if unknown:
+        print(f"未知组件: {', '.join(unknown)}")
+        sys.exit(2)
+    # 环境变量需在导入 docfetch 之前设置，子进程同样继承
+    if args.cache_dir:
+        os.environ['COMPONENT_DOC_CACHE'] = str(Path(args.cache_dir).resolve())
+    if args.offline:
+        os.environ['COMPONENT_DOC_OFFLINE'] = '1'
+    import docfetch
+
+    for item in args.fixture:
+        url, _, html_file = item.partition('=')
+        docfetch.save_fixture(url, html_file)
+        print(f"已登记 fixture: {url} <- {html_file}")
+
+    modules = select_modules(services, args.kind)
+    output_dir = Path(args.output_dir).resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.time()
+    if not args.offline:
+        urls = [__import__(name).DOC_URL for name in modules]
+        errors = docfetch.prefetch(urls, workers=args.workers, refresh=args.refresh)
+        for url, error in errors.items():
+            print(f"✗ 获取失败 {url}: {error}")
+        print(f"页面获取完成（{len(urls) - len(errors)}/{len(urls)}），耗时 {time.time() - start:.1f}s，解析器: {docfetch.PARSER}")
+        # 页面已在缓存中，解析阶段不再重复发起请求
+        os.environ['COMPONENT_DOC_OFFLINE'] = '1'
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(modules)))) as pool:
+        futures = {pool.submit(run_extractor, name, str(output_dir)): name for name in modules}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                _, elapsed, output = future.result()
+            except Exception as exc:
+                failed.append(name)
+                print(f"✗ {name} 失败: {exc}")
+                continue
+            print(f"\n===== {name}（{elapsed:.1f}s）=====")
+            print(output.rstrip())
+
+    print(f"\n全部完成，耗时 {time.time() - start:.1f}s，失败 {len(failed)} 个")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
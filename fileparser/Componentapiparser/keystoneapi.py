@@ -1,8 +1,11 @@
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re
 
+from docfetch import fetch_soup
+
+DOC_URL = "https://docs.openstack.org/api-ref/identity/v3/"
+
 def extract_keystone_apis(url):
     """
     从OpenStack官方文档中提取Keystone API信息
@@ -13,10 +16,8 @@ def extract_keystone_apis(url):
     Returns:
         list: 包含API信息的字典列表
     """
-    # 发送HTTP请求获取页面内容
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # 获取页面内容（经 docfetch 缓存）
+    soup = fetch_soup(url)
     
     apis = []
     
@@ -103,7 +104,7 @@ def save_to_excel(apis, filename='keystone_apis.xlsx'):
 def main():
     # OpenStack Keystone API文档URL
     # 请根据实际情况修改URL
-    keystone_api_url = "https://docs.openstack.org/api-ref/identity/v3/"
+    keystone_api_url = DOC_URL
     
     print(f"正在从 {keystone_api_url} 提取API信息...\n")
     
@@ -1,8 +1,11 @@
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re
 
+from docfetch import fetch_soup
+
+DOC_URL = "https://docs.openstack.org/keystone/latest/configuration/policy.html"
+
 def extract_policy_info(url):
     """
     从OpenStack Keystone policy文档中提取策略信息
@@ -13,10 +16,8 @@ def extract_policy_info(url):
     Returns:
         list: 包含策略信息的字典列表
     """
-    # 发送HTTP请求获取页面内容
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # 获取页面内容（经 docfetch 缓存）
+    soup = fetch_soup(url)
     
     policies = []
     
@@ -208,7 +209,7 @@ def save_to_excel(policies, filename='keystone_policies.xlsx'):
 
 def main():
     # Keystone policy文档URL
-    policy_url = "https://docs.openstack.org/keystone/latest/configuration/policy.html"
+    policy_url = DOC_URL
     
     print(f"正在从 {policy_url} 提取策略信息...\n")
     
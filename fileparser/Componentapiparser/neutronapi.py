@@ -1,7 +1,9 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 
+from docfetch import fetch_soup
+
+DOC_URL = 'https://docs.openstack.org/api-ref/network/v2/index.html'
+
 def extract_cinder_api(url):
     """
     从 OpenStack Cinder 文档中提取 API 信息
@@ -12,10 +14,8 @@ def extract_cinder_api(url):
     Returns:
         DataFrame 包含 API 名称、HTTP 方法和端点 URL
     """
-    # 发送请求获取页面内容
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # 获取页面内容（经 docfetch 缓存）
+    soup = fetch_soup(url)
     
     # 存储提取的数据
     api_data = []
@@ -51,7 +51,7 @@ def extract_cinder_api(url):
 
 def main():
     # OpenStack Cinder API 文档 URL
-    url = 'https://docs.openstack.org/api-ref/network/v2/index.html'
+    url = DOC_URL
     
     print(f"正在从 {url} 提取 API 信息...")
     
@@ -2,29 +2,24 @@ import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Alignment
 from openpyxl.utils.dataframe import dataframe_to_rows
-import re
 
+from apimerge import endpoint_keys, match_api_policy, normalize_endpoint, parse_merge_args, summarize, write_catalog
 
-def normalize_endpoint(endpoint):
-    """
-    标准化端点URL，用于匹配
-    1. 移除所有空格
-    2. 移除 /v3/{project_id}/ 前缀
-    """
-    # 移除所有空格
-    normalized = re.sub(r'\s+', '', str(endpoint).strip())
-
+# 标准化时移除 /v2.0/ 等版本前缀
+STRIP_PATTERNS = [r'/v\d+\.\d+/']
 
-    return re.sub(r'/v\d+\.\d+/', '/', normalized)
 
-def match_api_with_policy(api_file, policy_file, output_file):
+def match_api_with_policy(api_file, policy_file, output_file=None, catalog_path=None):
     """
-    匹配 API 和 Policy 文件，生成新的 Excel 文件
-    
+    匹配 API 和 Policy 文件，结果写入 API 目录索引，output_file 不为空时另外导出 Excel
+
+    两侧端点各自标准化一次后按端点键哈希连接，见 apimerge.match_api_policy
+
     Args:
         api_file: glance_apis.xlsx 文件路径
         policy_file: glance_policies.xlsx 文件路径
-        output_file: 输出文件路径
+        output_file: Excel 输出文件路径，为 None 时不导出
+        catalog_path: API 目录文件路径，默认 Tools/ApiCatalog.CATALOG_PATH
     """
     # 读取两个 Excel 文件
     print("正在读取文件...")
@@ -35,96 +30,37 @@ def match_api_with_policy(api_file, policy_file, output_file):
     print(f"Policy 文件共有 {len(df_policy)} 条记录")
     print("-" * 80)
     
-    # 存储匹配结果
-    matched_results = []
-    matched_policy_indices = set()  # 记录已匹配的 policy 索引
-    
-    # 遍历 API 列表
-    for idx, api_row in df_api.iterrows():
-        api_name = api_row['API名称']
-        http_method = api_row['HTTP方法']
-        endpoint_url = api_row['端点URL']
-        full_endpoint = f"{http_method} {endpoint_url}"
-        
-        print(f"处理 API: {api_name}")
-        print(f"  原始端点: {full_endpoint}")
-        
-        # 标准化 API 端点（移除空格）
-        api_operation_normalized = normalize_endpoint(full_endpoint)
-        print(f"  标准化后: {api_operation_normalized}")
-        
-        # 在 policy 中查找匹配的 Operation
-        matched = False
-        for policy_idx, policy_row in df_policy.iterrows():
-            policy_operation = str(policy_row['Operations'])
-            
-            # 跳过 N/A
-            if policy_operation == 'N/A':
-                continue
-            
-            policy_operation_normalized = normalize_endpoint(policy_operation)
-            
-            # 完全匹配（忽略空格）
-            if policy_operation_normalized == api_operation_normalized:
-                matched = True
-                matched_policy_indices.add(policy_idx)
-                
-                matched_results.append({
-                    'API名称': api_name,
-                    'HTTP方法': http_method,
-                    'URL路径': endpoint_url,
-                    'Policy名称': policy_row['策略名称'],
-                    'Default': policy_row['Default'],
-                    'Operation': policy_row['Operations'],
-                    'Scope Types': policy_row['Scope Types'],
-                    'Description': policy_row['描述']
-                })
-                
-                print(f"  ✓ 匹配到: {policy_row['策略名称']}")
-                print(f"    Policy Operation: {policy_operation}")
-        
-        # 如果没有匹配到，也要记录
-        if not matched:
-            matched_results.append({
-                'API名称': api_name,
-                'HTTP方法': http_method,
-                'URL路径': endpoint_url,
-                'Policy名称': 'N/A',
-                'Default': 'N/A',
-                'Operation': 'N/A',
-                'Scope Types': 'N/A',
-                'Description': '未匹配到对应的 Policy'
-            })
-            print(f"  ✗ 未匹配到任何 Policy")
-        
-        print()
-    
-    # 查找未被匹配的 policy
-    unmatched_policies = []
-    for policy_idx, policy_row in df_policy.iterrows():
-        if policy_idx not in matched_policy_indices:
-            unmatched_policies.append({
-                'Policy名称': policy_row['策略名称'],
-                'Default': policy_row['Default'],
-                'Operation': policy_row['Operations'],
-                'Scope Types': policy_row['Scope Types'],
-                'Description': policy_row['描述']
-            })
-    
-    # 创建 DataFrame
-    df_matched = pd.DataFrame(matched_results)
-    df_unmatched = pd.DataFrame(unmatched_policies)
-    
-    print("-" * 80)
-    print(f"匹配完成:")
-    print(f"  总共匹配了 {len([r for r in matched_results if r['Policy名称'] != 'N/A'])} 条记录")
-    print(f"  未匹配的 API: {len([r for r in matched_results if r['Policy名称'] == 'N/A'])} 条")
-    print(f"  未被使用的 Policy: {len(unmatched_policies)} 条")
-    
-    # 创建 Excel 文件并写入数据（带单元格合并）
-    create_excel_with_merge(df_matched, df_unmatched, output_file)
-    
-    print(f"\n结果已保存到 {output_file}")
+    api_keys = endpoint_keys(df_api['HTTP方法'], df_api['端点URL'], STRIP_PATTERNS)
+    policy_keys = normalize_endpoint(df_policy['Operations'], STRIP_PATTERNS)
+    matched, unmatched = match_api_policy(df_api, df_policy, api_keys, policy_keys)
+    hit = matched['_matched']
+    
+    # 未匹配到 Policy 的 API 也保留一行
+    df_matched = pd.DataFrame({
+        'API名称': matched['API名称'],
+        'HTTP方法': matched['HTTP方法'],
+        'URL路径': matched['端点URL'],
+        'Policy名称': matched['策略名称'].where(hit, 'N/A'),
+        'Default': matched['Default'].where(hit, 'N/A'),
+        'Operation': matched['Operations'].where(hit, 'N/A'),
+        'Scope Types': matched['Scope Types'].where(hit, 'N/A'),
+        'Description': matched['描述'].where(hit, '未匹配到对应的 Policy'),
+    })
+    df_unmatched = pd.DataFrame({
+        'Policy名称': unmatched['策略名称'],
+        'Default': unmatched['Default'],
+        'Operation': unmatched['Operations'],
+        'Scope Types': unmatched['Scope Types'],
+        'Description': unmatched['描述'],
+    })
+    
+    summarize(matched, unmatched)
+    write_catalog('neutron', matched, '策略名称', '端点URL', catalog_path=catalog_path)
+    
+    if output_file:
+        # 创建 Excel 文件并写入数据（带单元格合并）
+        create_excel_with_merge(df_matched, df_unmatched, output_file)
+        print(f"\n结果已保存到 {output_file}")
 
 def create_excel_with_merge(df_matched, df_unmatched, output_file):
     """
@@ -224,12 +160,10 @@ def create_excel_with_merge(df_matched, df_unmatched, output_file):
     wb.save(output_file)
 
 def main():
-    api_file = 'neutron_apis.xlsx'
-    policy_file = 'neutron_policies.xlsx'
-    output_file = 'neutron_matched.xlsx'
+    args = parse_merge_args('neutron', 'neutron_apis.xlsx', 'neutron_policies.xlsx', 'neutron_matched.xlsx')
     
     try:
-        match_api_with_policy(api_file, policy_file, output_file)
+        match_api_with_policy(args.api_file, args.policy_file, args.output if args.excel else None, args.catalog)
     except Exception as e:
         print(f"\n处理失败: {str(e)}")
         import traceback
@@ -1,14 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 
+from docfetch import fetch_soup
+
+DOC_URL = 'https://docs.openstack.org/neutron/latest/configuration/policy.html'
+
 def debug_html_structure(url):
     """
     调试 HTML 结构
     """
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = fetch_soup(url)
     
     # 找到第一个策略条目
     dt_tags = soup.find_all('dt')
@@ -33,9 +33,7 @@ def extract_glance_policy(url):
     """
     从 OpenStack Glance policy 文档中提取策略信息
     """
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = fetch_soup(url)
     
     policy_data = []
     dt_tags = soup.find_all('dt')
@@ -144,7 +142,7 @@ def extract_glance_policy(url):
     return pd.DataFrame(policy_data)
 
 def main():
-    url = 'https://docs.openstack.org/neutron/latest/configuration/policy.html'
+    url = DOC_URL
     
     print("首先调试 HTML 结构:")
     print("="*80)
@@ -1,21 +1,19 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
 import json
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
+from docfetch import fetch_soup
+
+DOC_URL = 'https://docs.openstack.org/nova/rocky/configuration/policy.html'
+
 def extract_policy_info(url):
     """
     从OpenStack NOVA policy文档中提取策略信息
     """
-    # 获取网页内容
-    response = requests.get(url)
-    response.raise_for_status()
-    
-    # 解析HTML
-    soup = BeautifulSoup(response.content, 'html.parser')
+    # 获取网页内容（经 docfetch 缓存）
+    soup = fetch_soup(url)
     
     policies = []
     
@@ -208,8 +206,8 @@ def save_to_json(policies, filename='nova_policies.json'):
     
     print(f"数据已保存到 {filename}")
 
-if __name__ == '__main__':
-    url = 'https://docs.openstack.org/nova/rocky/configuration/policy.html'
+def main():
+    url = DOC_URL
     
     print(f"正在从 {url} 提取数据...")
     policies = extract_policy_info(url)
@@ -245,4 +243,7 @@ if __name__ == '__main__':
             prev_name = policy['name']
         
         if count <= 3:
-            print(f"      - {policy['operation']}")
\ No newline at end of file
+            print(f"      - {policy['operation']}")
+
+if __name__ == '__main__':
+    main()
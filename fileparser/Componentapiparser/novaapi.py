@@ -1,9 +1,11 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
 
+from docfetch import fetch_soup
+
+DOC_URL = 'https://docs.openstack.org/api-ref/compute/'
+
 def extract_nova_apis(url):
     """
     从OpenStack Nova官方文档提取API信息
@@ -14,15 +16,11 @@ def extract_nova_apis(url):
     Returns:
         list: 包含API信息的字典列表
     """
-    # 获取网页内容
+    # 获取网页内容（经 docfetch 缓存）
     headers = {
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
     }
-    response = requests.get(url, headers=headers)
-    response.encoding = 'utf-8'
-    
-    # 解析HTML
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = fetch_soup(url, headers=headers)
     
     # 存储API信息
     api_list = []
@@ -105,7 +103,7 @@ def save_to_excel(api_list, output_file='nova_apis.xlsx'):
 def main():
     # OpenStack Nova API文档URL
     # 请替换为实际的文档URL
-    nova_api_url = 'https://docs.openstack.org/api-ref/compute/'
+    nova_api_url = DOC_URL
     
     print(f"🔍 正在从 {nova_api_url} 提取API信息...")
     
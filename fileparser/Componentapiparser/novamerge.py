@@ -1,105 +1,61 @@
 import pandas as pd
-import re
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 import os
 
+from apimerge import (
+    EMPTY_OPERATIONS, action_names, endpoint_keys, match_api_policy, normalize_endpoint, parse_merge_args,
+    write_catalog,
+)
+
 def fix_merged_cells(df):
     """修正合并单元格造成的空值"""
     # 向下填充空值
-    df['Name'] = df['Name'].fillna(method='ffill')
-    df['Default'] = df['Default'].fillna(method='ffill')
-    df['Description'] = df['Description'].fillna(method='ffill')
+    df['Name'] = df['Name'].ffill()
+    df['Default'] = df['Default'].ffill()
+    df['Description'] = df['Description'].ffill()
     return df
 
-def normalize_endpoint(api_name, http_method, url_path):
+def match_operations(apis_df, policies_df):
     """
-    对于带括号且包含action的API名称，修改endpoint格式
+    匹配API和Policy的Operation，支持一对多匹配
+
+    端点键为 "METHOD URL"；带括号且包含 action 的 API 名称以动作名作为次级键，
     例如: Unlock Server (unlock Action) -> POST /servers/{server_id}/action (unlock)
+
+    Returns:
+        (matched, matched_records, unmatched_apis, unmatched_policies)，matched 为 apimerge.match_api_policy 的连接结果
     """
-    # 检查API名称是否包含括号和action
-    if '(' in api_name and 'action' in api_name.lower():
-        # 提取括号内的内容
-        match = re.search(r'\(([^)]+)\s+[Aa]ction\)', api_name)
-        if match:
-            action_name = match.group(1).strip()
-            # 构造新的endpoint格式
-            return f"{http_method} {url_path} ({action_name})"
-    
-    # 默认返回标准格式
-    return f"{http_method} {url_path}"
+    actions = action_names(apis_df['API名称'])
+    api_keys = endpoint_keys(apis_df['HTTP方法'], apis_df['URL路径'], actions=actions)
+    policy_keys = normalize_endpoint(policies_df['Operation'])
+    matched, unmatched = match_api_policy(apis_df, policies_df, api_keys, policy_keys)
+    hit = matched['_matched']
 
-def match_operations(apis_df, policies_df):
-    """匹配API和Policy的Operation，支持一对多匹配"""
-    matched_records = []
-    unmatched_apis = []
-    matched_policy_indices = set()
-    
-    for idx, api_row in apis_df.iterrows():
-        api_name = api_row['API名称']
-        http_method = api_row['HTTP方法']
-        url_path = api_row['URL路径']
-        endpoint = api_row['Endpoint']
-        
-        # 生成标准化的endpoint
-        normalized_endpoint = normalize_endpoint(api_name, http_method, url_path)
-        
-        # 在policies中查找所有匹配的Operation
-        api_matches = []
-        for policy_idx, policy_row in policies_df.iterrows():
-            operation = str(policy_row['Operation']).strip()
-            
-            if pd.isna(operation) or operation == '' or operation == 'nan':
-                continue
-            
-            # 标准化operation进行比较（去除空格）
-            normalized_operation = re.sub(r'\s+', '', operation)
-            normalized_endpoint_compare = re.sub(r'\s+', '', normalized_endpoint)
-            
-            if normalized_operation == normalized_endpoint_compare:
-                matched_policy_indices.add(policy_idx)
-                
-                api_matches.append({
-                    'API名称': api_name,
-                    'HTTP方法': http_method,
-                    'URL路径': url_path,
-                    'Name': policy_row['Name'],
-                    'Default': policy_row['Default'],
-                    'Operation': operation,
-                    'Description': policy_row['Description']
-                })
-        
-        if api_matches:
-            # 添加所有匹配的记录
-            matched_records.extend(api_matches)
-        else:
-            # 记录未匹配的API
-            unmatched_apis.append({
-                'API名称': api_name,
-                'HTTP方法': http_method,
-                'URL路径': url_path,
-                'Name': '',
-                'Default': '',
-                'Operation': '未匹配',
-                'Description': ''
-            })
-    
-    # 找出未被匹配的policies
-    unmatched_policies = []
-    for policy_idx, policy_row in policies_df.iterrows():
-        operation = str(policy_row['Operation']).strip()
-        
-        # 只记录有Operation的policy
-        if policy_idx not in matched_policy_indices and operation and operation != 'nan' and operation != '':
-            unmatched_policies.append({
-                'Name': policy_row['Name'],
-                'Default': policy_row['Default'],
-                'Operation': operation,
-                'Description': policy_row['Description']
-            })
-    
-    return matched_records, unmatched_apis, unmatched_policies
+    records = pd.DataFrame({
+        'API名称': matched['API名称'],
+        'HTTP方法': matched['HTTP方法'],
+        'URL路径': matched['URL路径'],
+        'Name': matched['Name'].where(hit, ''),
+        'Default': matched['Default'].where(hit, ''),
+        'Operation': matched['Operation'].astype(str).str.strip().where(hit, '未匹配'),
+        'Description': matched['Description'].where(hit, ''),
+    })
+    matched_records = records[hit].to_dict('records')
+    unmatched_apis = records[~hit].to_dict('records')
+
+    # 只记录有Operation的policy
+    has_operation = ~policy_keys.loc[unmatched.index].isin(EMPTY_OPERATIONS)
+    unmatched = unmatched[has_operation]
+    unmatched_policies = pd.DataFrame({
+        'Name': unmatched['Name'],
+        'Default': unmatched['Default'],
+        'Operation': unmatched['Operation'].astype(str).str.strip(),
+        'Description': unmatched['Description'],
+    }).to_dict('records')
+
+    return matched, matched_records, unmatched_apis, unmatched_policies
 
 def merge_cells_for_same_api(worksheet, df):
     """合并相同API名称的单元格"""
@@ -238,12 +194,14 @@ def save_to_excel(matched_records, unmatched_apis, unmatched_policies, output_fi
     workbook.save(output_file)
 
 def main():
+    args = parse_merge_args('nova', 'nova_apis.xlsx', 'nova_policies.xlsx', 'nova_matched_results.xlsx')
+
     # 读取Excel文件
-    print("正在读取nova_apis.xlsx...")
-    apis_df = pd.read_excel('nova_apis.xlsx')
+    print(f"正在读取{args.api_file}...")
+    apis_df = pd.read_excel(args.api_file)
     
-    print("正在读取nova_policies.xlsx...")
-    policies_df = pd.read_excel('nova_policies.xlsx')
+    print(f"正在读取{args.policy_file}...")
+    policies_df = pd.read_excel(args.policy_file)
     
     # 修正合并单元格
     print("正在修正合并单元格...")
@@ -251,12 +209,13 @@ def main():
     
     # 匹配操作
     print("正在匹配API和Policy...")
-    matched_records, unmatched_apis, unmatched_policies = match_operations(apis_df, policies_df)
+    matched, matched_records, unmatched_apis, unmatched_policies = match_operations(apis_df, policies_df)
+    write_catalog('nova', matched, 'Name', 'URL路径', actions=action_names(matched['API名称']), catalog_path=args.catalog)
     
     # 保存结果
-    output_file = 'nova_matched_results.xlsx'
-    print(f"正在保存结果到 {output_file}...")
-    save_to_excel(matched_records, unmatched_apis, unmatched_policies, output_file)
+    if args.excel:
+        print(f"正在保存结果到 {args.output}...")
+        save_to_excel(matched_records, unmatched_apis, unmatched_policies, args.output)
     
     # 输出统计信息
     print("\n处理完成！")
@@ -277,7 +236,8 @@ def main():
             for api_name, count in multi_match.items():
                 print(f"  - {api_name}: {count}个匹配")
     
-    print(f"\n结果已保存到: {output_file}")
+    if args.excel:
+        print(f"\n结果已保存到: {args.output}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,12 +1,17 @@
 import argparse
 import csv
+import os
 import re
 import sys
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from pathlib import Path
 
-from neo4j import GraphDatabase
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
 
+from Tools.Neo4jDriver import get_driver, group_records, stream  # noqa: E402
 
 DEFAULT_NEO4J_URI = "bolt://localhost:7687"
 DEFAULT_NEO4J_USER = "neo4j"
@@ -17,9 +22,7 @@ DEFAULT_POLICY_DIR = Path("/etc/openstack/policies")
 
 def _connect_neo4j(uri: str, user: str, password: str):
     try:
-        driver = GraphDatabase.driver(uri, auth=(user, password))
-        with driver.session() as session:
-            session.run("RETURN 1")
+        driver = get_driver(uri, user, password)
         print("✓ Neo4j 连接成功")
         return driver
     except Exception as exc:
@@ -77,87 +80,107 @@ def _resolve_project_name(raw_name: str, project_map: dict):
     return raw_name, False
 
 
-def _write_matrix_csv(path: Path, apis, roles, matrix):
-    with path.open("w", newline="", encoding="ascii") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(["api_name"] + roles)
-        for api in apis:
-            row = [api] + [matrix[api].get(role, 0) for role in roles]
-            writer.writerow(row)
+@contextmanager
+def _atomic_output(path: Path):
+    """写入同目录临时文件，成功后替换目标文件；中途失败不留下半份结果。临时文件名带进程号，并发生成互不覆盖。"""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    handle = tmp.open("w", newline="", encoding="ascii")
+    try:
+        yield handle
+    except BaseException:
+        handle.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    handle.close()
+    os.replace(tmp, path)
+
+
+# 规则及其角色/项目条件；按 API 排序，便于逐个 API 流式生成矩阵行
+_RULE_CONDITIONS_QUERY = """
+MATCH (p:PolicyNode)-[:HAS_RULE]->(r:RuleNode)
+OPTIONAL MATCH (r)-[:REQUIRES_ROLE]->(role)
+OPTIONAL MATCH (r)-[:REQUIRES_PROJECT|REQUIRES_PROJECT_ID]->(proj)
+RETURN p.id AS api,
+       r.id AS rule_id,
+       collect(DISTINCT role.name) AS roles,
+       collect(DISTINCT proj.name) AS projects
+ORDER BY api
+"""
+
+
+def _iter_api_rules(driver):
+    """逐个产出 (api, [(角色列表, 项目列表), ...])，同一时刻只保留一个 API 的规则。"""
+    for api, records in group_records(stream(driver, _RULE_CONDITIONS_QUERY), "api"):
+        yield api, [
+            ([r for r in record["roles"] if r], [p for p in record["projects"] if p])
+            for record in records
+        ]
 
 
 def graph_to_csv(args):
+    """
+    两次流式读取规则：第一次只收集角色与项目集合（决定表头与输出文件），
+    第二次逐个 API 计算矩阵行并立即写入各 CSV，内存占用与策略数量无关。
+    """
     driver = _connect_neo4j(args.neo4j_uri, args.neo4j_user, args.neo4j_password)
     project_id_map = _read_project_id_map(Path(args.project_map))
     if not project_id_map:
         print("提示: projectinfo.csv 为空或不存在，无法将 project_id 转为 project_name。")
-    try:
-        with driver.session() as session:
-            records = list(
-                session.run(
-                    """
-                    MATCH (p:PolicyNode)-[:HAS_RULE]->(r:RuleNode)
-                    OPTIONAL MATCH (r)-[:REQUIRES_ROLE]->(role)
-                    OPTIONAL MATCH (r)-[:REQUIRES_PROJECT|REQUIRES_PROJECT_ID]->(proj)
-                    RETURN p.id AS api,
-                           r.id AS rule_id,
-                           collect(DISTINCT role.name) AS roles,
-                           collect(DISTINCT proj.name) AS projects
-                    """
-                )
-            )
-    finally:
-        driver.close()
-
-    apis = set()
-    roles = set()
-    rules = []
-
-    for record in records:
-        api = record["api"]
-        role_list = [r for r in record["roles"] if r]
-        project_list = [p for p in record["projects"] if p]
-        apis.add(api)
-        roles.update(role_list)
-        rules.append((api, role_list, project_list))
 
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        roles = set()
+        project_names = {}
+        for _api, rules in _iter_api_rules(driver):
+            for rule_roles, rule_projects in rules:
+                roles.update(rule_roles)
+                if not rule_roles:
+                    continue
+                for project_id in rule_projects:
+                    if project_id in project_names:
+                        continue
+                    if project_id not in project_id_map:
+                        print(f"提示: 未找到 project_id 对应名称，使用原值: {project_id}")
+                    project_names[project_id] = project_id_map.get(project_id, project_id)
+        role_list = sorted(roles)
+
+        now_permit_path = output_dir / "NowPermit.csv"
+        project_paths = {
+            name: output_dir / f"NowPermitin{str(name).replace('/', '_')}.csv"
+            for name in dict.fromkeys(project_names.values())
+        }
+        with ExitStack() as stack:
+            writers = {}
+            for key, path in [(None, now_permit_path)] + list(project_paths.items()):
+                writer = csv.writer(stack.enter_context(_atomic_output(path)))
+                writer.writerow(["api_name"] + role_list)
+                writers[key] = writer
+
+            # 两次读取之间图数据可能被更新：第一次未出现的项目没有对应输出文件，跳过并提示
+            skipped = set()
+            for api, rules in _iter_api_rules(driver):
+                allowed = {key: set() for key in writers}
+                for rule_roles, rule_projects in rules:
+                    if not rule_roles:
+                        continue
+                    if not rule_projects:
+                        allowed[None].update(rule_roles)
+                        continue
+                    for project_id in rule_projects:
+                        if project_id not in project_names:
+                            skipped.add(project_id)
+                            continue
+                        allowed[project_names[project_id]].update(rule_roles)
+                for key, writer in writers.items():
+                    writer.writerow([api] + [1 if role in allowed[key] else 0 for role in role_list])
+    finally:
+        driver.close()
 
-    api_list = sorted(apis)
-    role_list = sorted(roles)
-
-    now_permit = {api: {role: 0 for role in role_list} for api in api_list}
-    permit_by_project = {}
-
-    for api, rule_roles, rule_projects in rules:
-        if not rule_roles:
-            continue
-        if not rule_projects:
-            for role in rule_roles:
-                if role in now_permit[api]:
-                    now_permit[api][role] = 1
-            continue
-        for project_id in rule_projects:
-            project_name = project_id_map.get(project_id, project_id)
-            if project_id not in project_id_map:
-                print(f"提示: 未找到 project_id 对应名称，使用原值: {project_id}")
-            if project_name not in permit_by_project:
-                permit_by_project[project_name] = {
-                    api: {role: 0 for role in role_list} for api in api_list
-                }
-            for role in rule_roles:
-                if role in permit_by_project[project_name][api]:
-                    permit_by_project[project_name][api][role] = 1
-
-    now_permit_path = output_dir / "NowPermit.csv"
-    _write_matrix_csv(now_permit_path, api_list, role_list, now_permit)
+    if skipped:
+        print(f"提示: 读取期间策略图发生变化，以下项目未出现在首次读取中，已跳过: {', '.join(sorted(skipped))}")
     print(f"已生成: {now_permit_path}")
-
-    for project_name, matrix in permit_by_project.items():
-        safe_name = str(project_name).replace("/", "_")
-        path = output_dir / f"NowPermitin{safe_name}.csv"
-        _write_matrix_csv(path, api_list, role_list, matrix)
+    for path in project_paths.values():
         print(f"已生成: {path}")
 
 
@@ -311,32 +334,9 @@ def csv_to_yaml(args):
 
 
 def graph_to_yaml(args):
+    """按 API 排序流式读取规则，每个 API 的规则读完即写出一行 YAML。"""
     driver = _connect_neo4j(args.neo4j_uri, args.neo4j_user, args.neo4j_password)
     project_map = _read_project_map(Path(args.project_map))
-    try:
-        with driver.session() as session:
-            records = list(
-                session.run(
-                    """
-                    MATCH (p:PolicyNode)-[:HAS_RULE]->(r:RuleNode)
-                    RETURN p.id AS api,
-                           r.expression AS expr,
-                           r.normalized_expression AS norm,
-                           r.name AS name
-                    """
-                )
-            )
-    finally:
-        driver.close()
-
-    policy_rules = {}
-    for record in records:
-        api = record["api"]
-        expr = record["expr"] or record["norm"] or record["name"]
-        if not expr:
-            continue
-        expr = _replace_project_names(expr, project_map)
-        policy_rules.setdefault(api, []).append(expr)
 
     output_path = Path(args.output)
     if output_path.is_dir():
@@ -344,17 +344,35 @@ def graph_to_yaml(args):
         output_path = output_path / f"Policy{ts}.yaml"
     if not output_path.suffix:
         output_path = output_path.with_suffix(".yaml")
-
-    lines = []
-    lines.append("# Auto-generated from Neo4j policy graph")
-    lines.append("")
-    for api in sorted(policy_rules.keys()):
-        rules = policy_rules[api]
-        combined = " or ".join(f"({rule})" for rule in rules)
-        lines.append(f"{api}: \"{combined}\"")
-
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text("\n".join(lines) + "\n", encoding="ascii")
+
+    records = stream(
+        driver,
+        """
+        MATCH (p:PolicyNode)-[:HAS_RULE]->(r:RuleNode)
+        RETURN p.id AS api,
+               r.expression AS expr,
+               r.normalized_expression AS norm,
+               r.name AS name
+        ORDER BY api
+        """,
+    )
+    try:
+        with _atomic_output(output_path) as handle:
+            handle.write("# Auto-generated from Neo4j policy graph\n")
+            handle.write("\n")
+            for api, group in group_records(records, "api"):
+                rules = []
+                for record in group:
+                    expr = record["expr"] or record["norm"] or record["name"]
+                    if expr:
+                        rules.append(_replace_project_names(expr, project_map))
+                if not rules:
+                    continue
+                combined = " or ".join(f"({rule})" for rule in rules)
+                handle.write(f"{api}: \"{combined}\"\n")
+    finally:
+        driver.close()
     print(f"已生成: {output_path}")
 
 
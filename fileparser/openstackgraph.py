@@ -4,11 +4,19 @@ from keystoneauth1.identity import v3
 from keystoneauth1 import session
 from keystoneclient.v3 import client as keystone_client
 from keystoneauth1.exceptions import http as http_exc
-from neo4j import GraphDatabase
 import uuid
 import random
+from pathlib import Path
 
 from output_control import general_print as print
+from pipeline_trace import count, counted_session
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Tools.IdentitySnapshot import IdentityModel  # noqa: E402
+from Tools.Neo4jDriver import get_driver  # noqa: E402
 
 _TOKEN_OUTPUT_VERBOSE = False
 
@@ -39,10 +47,16 @@ NEO4J_PASSWORD = "Password"  # 请修改为你的密码
 
 
 class OpenStackNeo4jManager:
-    def __init__(self):
+    def __init__(self, connect_openstack: bool = True):
+        """
+        Args:
+            connect_openstack: 为 False 时不连接 Keystone，只能通过 read_data_from_snapshot 读取身份数据
+        """
         self.keystone = None
         self.neo4j_driver = None
-        self.setup_openstack()
+        self.identity = None  # 最近一次读取得到的 IdentityModel
+        if connect_openstack:
+            self.setup_openstack()
         self.setup_neo4j()
     
     def setup_openstack(self):
@@ -66,16 +80,52 @@ class OpenStackNeo4jManager:
             print(f"✗ OpenStack 连接失败: {e}")
             raise
     
+    @staticmethod
+    def _parse_assignment(assignment):
+        """把 keystoneclient 的 role_assignment 对象解析为 {user_id, role_id, project_id, system_scope}"""
+        if not (hasattr(assignment, 'user') and hasattr(assignment, 'role') and hasattr(assignment, 'scope')):
+            return None
+        user_id = assignment.user.get('id') if isinstance(assignment.user, dict) else getattr(assignment.user, 'id', None)
+        role_id = assignment.role.get('id') if isinstance(assignment.role, dict) else getattr(assignment.role, 'id', None)
+        
+        # 获取 project_id
+        project_id = None
+        system_scope = None
+        if isinstance(assignment.scope, dict):
+            if 'project' in assignment.scope:
+                project_id = assignment.scope['project'].get('id')
+            elif 'system' in assignment.scope:
+                scope_data = assignment.scope['system']
+                if isinstance(scope_data, dict):
+                    system_scope = next(
+                        (key for key, value in scope_data.items() if value),
+                        'all'
+                    )
+                else:
+                    system_scope = str(scope_data)
+        elif hasattr(assignment.scope, 'project'):
+            project_id = getattr(assignment.scope.project, 'id', None)
+        elif hasattr(assignment.scope, 'system'):
+            system_attr = getattr(assignment.scope, 'system', None)
+            if isinstance(system_attr, dict):
+                system_scope = next(
+                    (key for key, value in system_attr.items() if value),
+                    'all'
+                )
+            elif system_attr:
+                system_scope = str(system_attr)
+        return {
+            'user_id': user_id,
+            'role_id': role_id,
+            'project_id': project_id,
+            'system_scope': system_scope
+        }
+    
     def setup_neo4j(self):
         """设置 Neo4j 连接"""
         try:
-            self.neo4j_driver = GraphDatabase.driver(
-                NEO4J_URI,
-                auth=(NEO4J_USER, NEO4J_PASSWORD)
-            )
-            # 测试连接
-            with self.neo4j_driver.session() as session:
-                session.run("RETURN 1")
+            # 共享 driver，首次创建时验证连通性
+            self.neo4j_driver = get_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
             print("✓ Neo4j 连接成功")
         except Exception as e:
             print(f"✗ Neo4j 连接失败: {e}")
@@ -98,33 +148,30 @@ class OpenStackNeo4jManager:
             deleted_count = 0
             skipped_count = 0
             
+            # 一次拉取全部角色分配并按用户分组，避免逐用户请求
+            assignments_by_user = {}
+            try:
+                for raw in self.keystone.role_assignments.list():
+                    assignment = self._parse_assignment(raw)
+                    if assignment:
+                        assignments_by_user.setdefault(assignment['user_id'], []).append(assignment)
+            except Exception as e:
+                print(f"⚠ 获取角色分配失败: {e}")
+            
             for user in users:
                 if user.name in protected_users:
                     skipped_count += 1
                     continue
                 
                 try:
-                    # 先获取并移除该用户的所有角色分配
-                    try:
-                        assignments = self.keystone.role_assignments.list(user=user.id)
-                        for assignment in assignments:
-                            try:
-                                if hasattr(assignment, 'role') and hasattr(assignment, 'scope'):
-                                    role_id = assignment.role.get('id') if isinstance(assignment.role, dict) else getattr(assignment.role, 'id', None)
-                                    
-                                    # 获取 project_id
-                                    project_id = None
-                                    if isinstance(assignment.scope, dict) and 'project' in assignment.scope:
-                                        project_id = assignment.scope['project'].get('id')
-                                    elif hasattr(assignment.scope, 'project'):
-                                        project_id = getattr(assignment.scope.project, 'id', None)
-                                    
-                                    if role_id and project_id:
-                                        self.keystone.roles.revoke(role=role_id, user=user.id, project=project_id)
-                            except Exception as e:
-                                pass  # 忽略撤销失败
-                    except:
-                        pass
+                    # 先移除该用户的所有角色分配（使用一次性拉取并按用户分组的结果）
+                    for assignment in assignments_by_user.get(user.id, []):
+                        try:
+                            if assignment['role_id'] and assignment['project_id']:
+                                self.keystone.roles.revoke(role=assignment['role_id'], user=user.id,
+                                                           project=assignment['project_id'])
+                        except Exception:
+                            pass  # 忽略撤销失败
                     
                     # 删除用户
                     self.keystone.users.delete(user.id)
@@ -204,6 +251,15 @@ class OpenStackNeo4jManager:
             {'name': 'eve', 'email': 'eve@example.com'}
         ]
         
+        # 预先按名称索引已有用户/角色，避免逐个 list/find 请求
+        existing_users = {}
+        existing_roles = {}
+        try:
+            existing_users = {u.name: u for u in self.keystone.users.list()}
+            existing_roles = {r.name: r for r in self.keystone.roles.list()}
+        except Exception as e:
+            print(f"⚠ 获取已有用户/角色失败: {e}")
+        
         created_users = []
         for user_info in test_users:
             try:
@@ -217,12 +273,11 @@ class OpenStackNeo4jManager:
                 print(f"✓ 创建用户: {user.name} (ID: {user.id})")
             except Exception as e:
                 # 用户可能已存在
-                try:
-                    users = self.keystone.users.list(name=user_info['name'])
-                    if users:
-                        created_users.append(users[0])
-                        print(f"⚠ 用户已存在: {user_info['name']} (ID: {users[0].id})")
-                except:
+                existing = existing_users.get(user_info['name'])
+                if existing:
+                    created_users.append(existing)
+                    print(f"⚠ 用户已存在: {user_info['name']} (ID: {existing.id})")
+                else:
                     print(f"✗ 创建/获取用户失败: {user_info['name']}, {e}")
         
         # 2. 获取或创建角色
@@ -231,17 +286,17 @@ class OpenStackNeo4jManager:
         roles = []
         
         for role_name in role_names:
-            try:
-                role = self.keystone.roles.find(name=role_name)
+            role = existing_roles.get(role_name)
+            if role:
                 roles.append(role)
                 print(f"✓ 找到角色: {role.name} (ID: {role.id})")
-            except Exception:
-                try:
-                    role = self.keystone.roles.create(name=role_name)
-                    roles.append(role)
-                    print(f"✓ 创建角色: {role.name} (ID: {role.id})")
-                except Exception as e:
-                    print(f"✗ 创建角色失败: {role_name}, {e}")
+                continue
+            try:
+                role = self.keystone.roles.create(name=role_name)
+                roles.append(role)
+                print(f"✓ 创建角色: {role.name} (ID: {role.id})")
+            except Exception as e:
+                print(f"✗ 创建角色失败: {role_name}, {e}")
         
         # 3. 获取或创建项目
         print("\n获取/创建项目...")
@@ -322,59 +377,11 @@ class OpenStackNeo4jManager:
             print(f"✓ 读取到 {len(assignments)} 个角色分配")
             
             for assignment in assignments:
-                # 解析分配信息
-                if hasattr(assignment, 'user') and hasattr(assignment, 'role') and hasattr(assignment, 'scope'):
-                    user_id = assignment.user.get('id') if isinstance(assignment.user, dict) else getattr(assignment.user, 'id', None)
-                    role_id = assignment.role.get('id') if isinstance(assignment.role, dict) else getattr(assignment.role, 'id', None)
-                    
-                    # 获取 project_id
-                    project_id = None
-                    system_scope = None
-                    if isinstance(assignment.scope, dict):
-                        if 'project' in assignment.scope:
-                            project_id = assignment.scope['project'].get('id')
-                        elif 'system' in assignment.scope:
-                            scope_data = assignment.scope['system']
-                            if isinstance(scope_data, dict):
-                                system_scope = next(
-                                    (key for key, value in scope_data.items() if value),
-                                    'all'
-                                )
-                            else:
-                                system_scope = str(scope_data)
-                    elif hasattr(assignment.scope, 'project'):
-                        project_id = getattr(assignment.scope.project, 'id', None)
-                    elif hasattr(assignment.scope, 'system'):
-                        system_attr = getattr(assignment.scope, 'system', None)
-                        if isinstance(system_attr, dict):
-                            system_scope = next(
-                                (key for key, value in system_attr.items() if value),
-                                'all'
-                            )
-                        elif system_attr:
-                            system_scope = str(system_attr)
-                    
-                    if user_id and role_id and (project_id or system_scope):
-                        role_assignments.append({
-                            'user_id': user_id,
-                            'role_id': role_id,
-                            'project_id': project_id,
-                            'system_scope': system_scope
-                        })
+                parsed = self._parse_assignment(assignment)
+                if parsed and parsed['user_id'] and parsed['role_id'] and (parsed['project_id'] or parsed['system_scope']):
+                    role_assignments.append(parsed)
             
             print(f"✓ 解析到 {len(role_assignments)} 个有效的角色分配")
-            
-            # 显示部分分配信息
-            for i, assignment in enumerate(role_assignments[:5]):
-                user = next((u for u in users if u.id == assignment['user_id']), None)
-                role = next((r for r in roles if r.id == assignment['role_id']), None)
-                project = next((p for p in projects if p.id == assignment['project_id']), None)
-                
-                if user and role and project:
-                    print(f"  - {user.name} -> {role.name} @ {project.name}")
-            
-            if len(role_assignments) > 5:
-                print(f"  ... 还有 {len(role_assignments) - 5} 个分配")
                 
         except Exception as e:
             print(f"⚠ 读取角色分配失败: {e}")
@@ -398,15 +405,51 @@ class OpenStackNeo4jManager:
             
             print(f"✓ 使用简化方法读取到 {len(role_assignments)} 个角色分配")
         
-        return users, roles, projects, role_assignments
+        # 每次读取只建立一次索引，后续 token 生成与检测均复用
+        self.identity = IdentityModel(users, roles, projects, role_assignments)
+        self._print_assignment_samples(self.identity)
+        identity = self.identity
+        return identity.users, identity.roles, identity.projects, identity.role_assignments
     
-    def generate_tokens_from_assignments(self, users, roles, role_assignments):
-        """根据角色分配生成 token 映射"""
+    def _print_assignment_samples(self, identity, limit=5):
+        """显示部分分配信息"""
+        for assignment in identity.role_assignments[:limit]:
+            user = identity.user(assignment['user_id'])
+            role = identity.role(assignment['role_id'])
+            project = identity.project(assignment['project_id'])
+            
+            if user and role and project:
+                print(f"  - {user.name} -> {role.name} @ {project.name}")
+        
+        if len(identity.role_assignments) > limit:
+            print(f"  ... 还有 {len(identity.role_assignments) - limit} 个分配")
+    
+    def read_data_from_snapshot(self, snapshot):
+        """从身份快照（Tools/IdentitySnapshot.py）读取数据，返回值与 read_data_from_openstack 一致"""
+        print("\n=== 从身份快照读取数据 ===")
+        print(f"快照生成时间: {snapshot.get('generated_at')}")
+
+        self.identity = IdentityModel.from_snapshot(snapshot)
+        identity = self.identity
+        print(f"✓ 读取到 {len(identity.users)} 个用户, {len(identity.roles)} 个角色, "
+              f"{len(identity.projects)} 个项目, {len(identity.role_assignments)} 个角色分配")
+        self._print_assignment_samples(identity)
+        return identity.users, identity.roles, identity.projects, identity.role_assignments
+
+    def generate_tokens_from_assignments(self, users, roles, role_assignments, identity=None):
+        """根据角色分配生成 token 映射；未显式传入 identity 时按参数建立索引"""
         _token_log("\n=== 基于角色分配生成 Token 映射 ===")
         
-        # 创建用户ID到用户对象的映射
-        user_map = {u.id: u for u in users}
-        role_map = {r.id: r for r in roles}
+        # 参数正是最近一次读取返回的列表时复用其索引（user/role id -> 对象），否则按参数重新建立，避免使用旧数据
+        if identity is None:
+            cached = self.identity
+            if (cached is not None and cached.users is users and cached.roles is roles
+                    and cached.role_assignments is role_assignments):
+                identity = cached
+            else:
+                identity = IdentityModel(users, roles, [], role_assignments)
+        user_map = identity.users_by_id
+        role_map = identity.roles_by_id
         
         # 按用户组织角色分配
         user_roles_map = {}
@@ -439,6 +482,8 @@ class OpenStackNeo4jManager:
         # 生成 token 映射
         token_role_mappings = []
         shared_token_users = {}
+        assigned_pairs = set()  # (user_id, token_id)，避免重复扫描 token_role_mappings
+        first_mapping_by_token = {}
         
         _token_log("\n为用户生成 Token...")
         for user_id, user_roles in user_roles_map.items():
@@ -455,6 +500,7 @@ class OpenStackNeo4jManager:
             # 1. 为每个用户生成2个独有 token
             for i in range(2):
                 token_id = str(uuid.uuid4())
+                assigned_pairs.add((user.id, token_id))
                 token_role_mappings.append({
                     'user': user,
                     'token_id': token_id,
@@ -478,15 +524,17 @@ class OpenStackNeo4jManager:
                     token_id = random.choice(role_shared_tokens[role.id])
                     
                     # 检查是否已添加
-                    if not any(m['user'].id == user.id and m['token_id'] == token_id 
-                              for m in token_role_mappings):
-                        token_role_mappings.append({
+                    if (user.id, token_id) not in assigned_pairs:
+                        assigned_pairs.add((user.id, token_id))
+                        mapping = {
                             'user': user,
                             'token_id': token_id,
                             'role_assignments': [assignment.copy()],
                             'shared': True,
                             'system_scopes': collect_scopes([assignment])
-                        })
+                        }
+                        token_role_mappings.append(mapping)
+                        first_mapping_by_token.setdefault(token_id, mapping)
                         
                         if token_id not in shared_token_users:
                             shared_token_users[token_id] = []
@@ -496,7 +544,7 @@ class OpenStackNeo4jManager:
         _token_log("\n=== 共享 Token 统计 ===")
         for token_id, user_names in shared_token_users.items():
             # 找到这个token对应的角色
-            token_mapping = next((m for m in token_role_mappings if m['token_id'] == token_id), None)
+            token_mapping = first_mapping_by_token.get(token_id)
             if token_mapping and token_mapping['role_assignments']:
                 role_name = token_mapping['role_assignments'][0]['role'].name
                 scope = token_mapping['role_assignments'][0].get('system_scope')
@@ -516,7 +564,8 @@ class OpenStackNeo4jManager:
         """创建 Neo4j 图 - User->Token->Role"""
         print("\n=== 创建 Neo4j 图 ===")
         
-        with self.neo4j_driver.session() as session:
+        with self.neo4j_driver.session() as neo4j_session:
+            session = counted_session(neo4j_session)
             # 清空现有数据
             session.run("MATCH (n) DETACH DELETE n")
             print("✓ 清空 Neo4j 数据库")
@@ -538,6 +587,9 @@ class OpenStackNeo4jManager:
                 for assignment in mapping['role_assignments']:
                     role = assignment['role']
                     roles_dict[role.id] = role
+            count("users", len(users_dict))
+            count("tokens", len(tokens_dict))
+            count("roles", len(roles_dict))
             
             # 1. 创建用户节点
             print(f"\n创建 {len(users_dict)} 个用户节点...")
@@ -1,13 +1,15 @@
-from neo4j import GraphDatabase
 from typing import Dict, List, Set, Tuple, Any
 import re
 import hashlib
 
 from output_control import general_print as print
+from pipeline_trace import count, counted_session
 from policy_parser import PolicyRuleParser
+from Tools.Neo4jDriver import get_driver
+from Tools.PolicyModel import Policy, Rule
 
 class PolicyGraphCreator:
-    def __init__(self, uri: str, user: str, password: str):
+    def __init__(self, uri: str = None, user: str = None, password: str = None, driver=None):
         """
         初始化Neo4j连接
         
@@ -15,8 +17,9 @@ class PolicyGraphCreator:
             uri: Neo4j数据库URI (例如: "bolt://localhost:7687")
             user: 用户名
             password: 密码
+            driver: 已有的驱动对象（如基准测试中的内存替身），提供时不再新建连接
         """
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driver if driver is not None else get_driver(uri, user, password)
         self.rule_counter = 0
         self.rule_expression_map = {}  # 用于跟踪规则表达式到规则ID的映射
     
@@ -154,14 +157,16 @@ class PolicyGraphCreator:
         label = ''.join(word.capitalize() for word in parts) or 'Generic'
         return f"{label}Condition"
     
-    def create_policy_graph(self, policy_dict: Dict[str, Dict[str, Any]]):
+    def create_policy_graph(self, policy_dict: Dict[str, Any]):
         """
         根据策略字典创建Neo4j图
         
         Args:
-            policy_dict: 策略字典，key为策略名，value包含规则列表与元信息
+            policy_dict: 策略字典，key为策略名，value为 Tools.PolicyModel.Policy（规则已展开为最小单元，
+                直接使用），或包含 expressions/metadata 的字典（此时逐条重新展开）
         """
-        with self.driver.session() as session:
+        with self.driver.session() as neo4j_session:
+            session = counted_session(neo4j_session)
             self.rule_counter = 0
             self.rule_expression_map = {}
             
@@ -175,8 +180,15 @@ class PolicyGraphCreator:
             parser = PolicyRuleParser()
 
             for policy_key, policy_entry in policy_dict.items():
-                rules = policy_entry.get('expressions', [])
-                metadata = policy_entry.get('metadata', {})
+                if isinstance(policy_entry, Policy):
+                    rules = policy_entry.rules
+                    policy_file = policy_entry.file
+                    policy_lines = list(policy_entry.lines)
+                else:
+                    rules = policy_entry.get('expressions', [])
+                    metadata = policy_entry.get('metadata', {})
+                    policy_file = metadata.get('file')
+                    policy_lines = metadata.get('lines', [])
                 # 解析根节点（策略节点）
                 root_type, root_name = self.parse_node_from_string(policy_key)
                 
@@ -187,8 +199,6 @@ class PolicyGraphCreator:
                 # 创建根节点（策略节点）
                 root_label = self.get_condition_label(root_type).replace('Condition', 'Policy')
                 root_node_id = f"{root_type}:{root_name}"
-                policy_file = metadata.get('file')
-                policy_lines = metadata.get('lines', [])
                 
                 session.run(
                     f"""
@@ -211,11 +221,15 @@ class PolicyGraphCreator:
                     created_nodes_by_type[root_type] = set()
                 if root_node_id not in created_nodes_by_type[root_type]:
                     created_nodes_by_type[root_type].add(root_node_id)
+                    count("policy_nodes")
                     print(f"创建策略节点 [{root_label}]: {root_name}")
                 
                 # 处理每个规则
-                for rule_idx, rule_expr in enumerate(rules, 1):
-                    unit_exprs = self._expand_to_min_units(rule_expr, parser)
+                for rule_idx, rule in enumerate(rules, 1):
+                    if isinstance(rule, Rule):
+                        unit_exprs = rule.unit_expressions()
+                    else:
+                        unit_exprs = self._expand_to_min_units(rule, parser)
                     for unit_expr in unit_exprs:
                         # 获取或创建规则ID
                         rule_name, is_new = self.get_or_create_rule_id(unit_expr)
@@ -245,6 +259,7 @@ class PolicyGraphCreator:
                                 normalized_expr=normalized_expr
                             )
                             created_rules.add(rule_node_id)
+                            count("rule_nodes")
                             print(f"  创建规则节点: {rule_name} - {unit_expr}")
                             
                             # 只在创建规则节点时解析并创建条件关系
@@ -271,6 +286,7 @@ class PolicyGraphCreator:
                                     if node_type not in created_nodes_by_type:
                                         created_nodes_by_type[node_type] = set()
                                     created_nodes_by_type[node_type].add(node_id)
+                                    count("condition_nodes")
                                     print(f"    创建条件节点 [{node_label}]: {node_name}")
                                 
                                 # 创建从规则到条件节点的关系
@@ -287,6 +303,7 @@ class PolicyGraphCreator:
                                     rule_id=rule_node_id,
                                     cond_id=node_id
                                 )
+                                count("relationships")
                         else:
                             print(f"  复用已存在的规则节点: {rule_name} - {unit_expr}")
                         
@@ -300,6 +317,7 @@ class PolicyGraphCreator:
                             policy_id=root_node_id,
                             rule_id=rule_node_id
                         )
+                        count("relationships")
             
             # 统计信息
             total_nodes = sum(len(nodes) for nodes in created_nodes_by_type.values())
@@ -0,0 +1,172 @@
+"""
+策略解析结果的持久化缓存。
+
+以"规则引用替换并规范化后的表达式"的哈希为键，缓存 oslo_policy 解析 + DNF 展开得到的
+最小匹配单元及其签名。上游默认策略很少变化，重复运行时绝大多数表达式可直接命中，跳过解析。
+
+- 缓存按解析器版本（PolicyRuleParser.PARSER_VERSION、KEY_VERSION、FIELD_MAPPING、VALID_DB_FIELDS、oslo.policy 版本）
+  整体失效：版本不一致时清空旧记录。
+- 每次命中刷新 used_at；总大小超过上限时按最久未使用淘汰。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "POLICY_PARSE_CACHE", str(Path(__file__).resolve().parent / "data" / "parse_cache.sqlite3")
+)
+DEFAULT_MAX_BYTES = int(float(os.environ.get("POLICY_PARSE_CACHE_MAX_MB", "64")) * 1024 * 1024)
+# 超出上限时淘汰到上限的该比例，避免每次写入都触发淘汰
+EVICT_TARGET = 0.9
+_BATCH = 500
+# 缓存键规则的版本：normalize_expression 变化时随之递增，使旧键整体失效
+KEY_VERSION = 2
+_KEYWORDS = ("and", "or", "not")
+
+Units = List[Dict[str, List[str]]]
+
+
+def _normalize_token(token: str) -> str:
+    """与 oslo_policy 分词一致：去掉首尾括号后整词为 and/or/not 才视为关键字并转小写。"""
+    core = token.lstrip("(").rstrip(")")
+    if core.lower() in _KEYWORDS:
+        start = len(token) - len(token.lstrip("("))
+        return token[:start] + core.lower() + token[start + len(core):]
+    return token
+
+
+def normalize_expression(expression: str) -> str:
+    """合并空白并统一 and/or/not 大小写；只处理独立的关键字 token，取值中的同名单词保持原样。"""
+    return " ".join(_normalize_token(token) for token in expression.split())
+
+
+def expression_key(resolved_expression: str) -> str:
+    return hashlib.sha256(normalize_expression(resolved_expression).encode("utf-8")).hexdigest()
+
+
+def parser_version() -> str:
+    """解析器版本指纹：解析逻辑、字段映射或 oslo.policy 变化时缓存整体失效。"""
+    from policy_parser import PolicyRuleParser
+
+    try:
+        from importlib.metadata import version
+
+        oslo_version = version("oslo.policy")
+    except Exception:
+        oslo_version = "unknown"
+    payload = json.dumps(
+        [
+            PolicyRuleParser.PARSER_VERSION,
+            KEY_VERSION,
+            PolicyRuleParser.FIELD_MAPPING,
+            sorted(PolicyRuleParser.VALID_DB_FIELDS),
+            oslo_version,
+        ],
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """SQLite 解析缓存：key -> (units JSON, signatures JSON)，记录大小与最近使用时间。"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 version: Optional[str] = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version or parser_version()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                key TEXT PRIMARY KEY, units TEXT, signatures TEXT, size INTEGER, used_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS parse_cache_used ON parse_cache (used_at);
+            """
+        )
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            with self._conn:
+                self._conn.execute("DELETE FROM parse_cache")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (self.version,)
+                )
+
+    @classmethod
+    def open(cls, path: str = DEFAULT_CACHE_PATH, **kwargs) -> Optional["ParseCache"]:
+        """打开缓存；路径不可写或文件损坏时给出提示并返回 None（按无缓存继续）。"""
+        try:
+            return cls(path, **kwargs)
+        except (OSError, sqlite3.Error) as exc:
+            print(f"⚠ 解析缓存不可用，将完整解析: {path}: {exc}", file=sys.stderr)
+            return None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Units, List[str]]]:
+        """批量查询，命中的记录刷新 used_at。"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Tuple[Units, List[str]]] = {}
+        for start in range(0, len(keys), _BATCH):
+            batch = keys[start:start + _BATCH]
+            placeholders = ", ".join("?" for _ in batch)
+            for key, units, signatures in self._conn.execute(
+                f"SELECT key, units, signatures FROM parse_cache WHERE key IN ({placeholders})", batch
+            ):
+                found[key] = (json.loads(units), json.loads(signatures))
+        if found:
+            now = time.time()
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE parse_cache SET used_at = ? WHERE key = ?", [(now, key) for key in found]
+                )
+        return found
+
+    def put_many(self, entries: Dict[str, Tuple[Units, List[str]]]) -> None:
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, (units, signatures) in entries.items():
+            units_json = json.dumps(units, ensure_ascii=False, separators=(",", ":"))
+            signatures_json = json.dumps(signatures, ensure_ascii=False, separators=(",", ":"))
+            rows.append((key, units_json, signatures_json, len(units_json) + len(signatures_json), now))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parse_cache (key, units, signatures, size, used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * EVICT_TARGET)
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM parse_cache ORDER BY used_at ASC"):
+            if total <= target:
+                break
+            stale.append((key,))
+            total -= size
+        with self._conn:
+            self._conn.executemany("DELETE FROM parse_cache WHERE key = ?", stale)
+
+    def stats(self) -> Dict[str, int]:
+        count, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parse_cache"
+        ).fetchone()
+        return {"entries": count, "bytes": size}
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,182 @@
+"""
+提供流水线的结构化追踪入口（嵌套 span + 计数器 + 可选 cProfile）。
+
+默认关闭，关闭时 span/count 几乎无开销。通过 enable_tracing 启用后：
+    - span(name, **attrs)   记录嵌套阶段的墙钟时间与 CPU 时间
+    - count(name, n)        在当前 span 上累加计数（策略数、最小单元数、Cypher 语句数、写入行数等）
+    - counted_session(s)    包装 neo4j session，自动统计 run() 调用次数
+    - write_trace()         将追踪结果写入 JSON 文件
+
+对 enable_tracing(profile_stages=...) 中列出的 span（或 "all"）额外使用 cProfile 采样，
+结果按 span 路径写为 .prof 文件，可用 `python -m pstats` / snakeviz 查看；
+trace 中记录了进程 pid，也便于配合 `py-spy record --pid` 对照各阶段时间段。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import datetime as dt
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+_TRACER: Optional["Tracer"] = None
+
+
+class Span:
+    __slots__ = ("name", "attrs", "counters", "children", "start", "wall", "cpu", "profile")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], start: float) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.counters: Dict[str, int] = {}
+        self.children: List["Span"] = []
+        self.start = start
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.profile: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "start": round(self.start, 6),
+            "wall": round(self.wall, 6),
+            "cpu": round(self.cpu, 6),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.counters:
+            data["counters"] = self.counters
+        if self.profile:
+            data["profile"] = self.profile
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class Tracer:
+    def __init__(self, path: str, profile_stages: Iterable[str] = (), profile_dir: Optional[str] = None) -> None:
+        self.path = path
+        self.profile_stages = {s for s in profile_stages if s}
+        self.profile_dir = profile_dir or os.path.splitext(path)[0] + "_profiles"
+        self.origin = time.perf_counter()
+        self.started_at = dt.datetime.now().isoformat(timespec="seconds")
+        self.root = Span("run", {}, 0.0)
+        self.stack: List[Span] = [self.root]
+        self.totals: Dict[str, int] = {}
+        self._profiling = False
+
+    def _should_profile(self, name: str) -> bool:
+        # cProfile 不能嵌套启用，外层已采样时内层不再单独采样
+        if self._profiling:
+            return False
+        return "all" in self.profile_stages or name in self.profile_stages
+
+    def _profile_path(self) -> str:
+        parts = [span.name for span in self.stack[1:]]
+        slug = re.sub(r"[^0-9A-Za-z_.-]+", "_", ".".join(parts)) or "run"
+        return os.path.join(self.profile_dir, f"{slug}.prof")
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span]:
+        parent = self.stack[-1]
+        current = Span(name, attrs, time.perf_counter() - self.origin)
+        parent.children.append(current)
+        self.stack.append(current)
+
+        profiler = None
+        if self._should_profile(name):
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield current
+        finally:
+            current.wall = time.perf_counter() - wall_start
+            current.cpu = time.process_time() - cpu_start
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                os.makedirs(self.profile_dir, exist_ok=True)
+                current.profile = self._profile_path()
+                profiler.dump_stats(current.profile)
+            self.stack.pop()
+
+    def count(self, name: str, n: int = 1) -> None:
+        span = self.stack[-1]
+        span.counters[name] = span.counters.get(name, 0) + n
+        self.totals[name] = self.totals.get(name, 0) + n
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.root.wall = time.perf_counter() - self.origin
+        return {
+            "started_at": self.started_at,
+            "pid": os.getpid(),
+            "argv": sys.argv,
+            "wall": round(self.root.wall, 6),
+            "counters": self.totals,
+            "spans": [child.to_dict() for child in self.root.children],
+        }
+
+
+class _CountedSession:
+    """neo4j session 代理：每次 run() 计入 cypher_statements 计数。"""
+
+    def __init__(self, session: Any, counter: str) -> None:
+        self._session = session
+        self._counter = counter
+
+    def run(self, *args: Any, **kwargs: Any) -> Any:
+        count(self._counter)
+        return self._session.run(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+
+def enable_tracing(path: str, profile_stages: Iterable[str] = (), profile_dir: Optional[str] = None) -> None:
+    global _TRACER
+    _TRACER = Tracer(path, profile_stages, profile_dir)
+
+
+def tracing_enabled() -> bool:
+    return _TRACER is not None
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    if _TRACER is None:
+        yield None
+        return
+    with _TRACER.span(name, **attrs) as current:
+        yield current
+
+
+def count(name: str, n: int = 1) -> None:
+    if _TRACER is not None:
+        _TRACER.count(name, n)
+
+
+def counted_session(session: Any, counter: str = "cypher_statements") -> Any:
+    if _TRACER is None:
+        return session
+    return _CountedSession(session, counter)
+
+
+def write_trace() -> Optional[str]:
+    """写出追踪 JSON（原子替换），未启用时返回 None。"""
+    if _TRACER is None:
+        return None
+    directory = os.path.dirname(os.path.abspath(_TRACER.path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{_TRACER.path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_TRACER.to_dict(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _TRACER.path)
+    return _TRACER.path
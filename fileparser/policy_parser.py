@@ -6,13 +6,22 @@ Policy规则解析模块
 
 import os
 import re
+import sys
 import logging
 import itertools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from typing import Dict, List, Set, Any, Optional, Tuple
 from oslo_policy import _parser, _checks
 
 from output_control import general_print as print
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Tools.PolicyModel import Unit  # noqa: E402
+
 try:
     from keystone.cmd.doctor.policy_check_system.policy_database import (
         get_database_instance,
@@ -40,6 +49,8 @@ except ImportError:  # pragma: no cover - keystone doctor module not available
 
 class RuleDefinition:
     """规则定义类"""
+
+    __slots__ = ("name", "expression")
     
     def __init__(self, name: str, expression: str):
         """
@@ -56,6 +67,9 @@ class RuleDefinition:
 class PolicyRuleParser:
     """Policy规则解析器类"""
     
+    # 解析 / DNF 展开逻辑的版本号，修改后递增，使 parse_cache 中的旧结果失效
+    PARSER_VERSION = 1
+
     # 定义数据库支持的字段
     VALID_DB_FIELDS = {'domain', 'project', 'role', 'system_scope', 'user'}
     
@@ -446,6 +460,18 @@ class PolicyRuleParser:
             basic_check = self._extract_basic_check(rule_obj)
             return [basic_check] if basic_check else []
     
+    def extract_units(self, rule_obj: Any) -> List[Unit]:
+        """
+        展开为 Tools.PolicyModel.Unit 列表；没有任何条件时返回一个空单元（签名为 "@"）
+
+        Args:
+            rule_obj: 规则对象
+
+        Returns:
+            List[Unit]: 最小匹配单元
+        """
+        return [Unit.from_dict(unit) for unit in (self._extract_minimal_units(rule_obj) or [{}])]
+
     def _is_valid_minimal_unit(self, unit: Dict[str, List[str]], policy_name: str) -> bool:
         """
         验证最小匹配单元是否有效
@@ -591,6 +617,78 @@ class PolicyRuleParser:
             return False
 
 
+def unit_signature(unit: Dict[str, List[str]]) -> str:
+    """
+    最小匹配单元的规范化签名，例如 "role:admin AND system_scope:all"；空单元为 "@"
+    """
+    return Unit.from_dict(unit).signature
+
+
+# 并行解析时每个子进程持有一个解析器，规则定义表在进程启动时注入一次
+_worker_parser: Optional[PolicyRuleParser] = None
+
+
+def _init_parse_worker(rule_definitions: Dict[str, str]) -> None:
+    global _worker_parser
+    _worker_parser = PolicyRuleParser()
+    _worker_parser.rule_definitions = {
+        name: RuleDefinition(name, expression) for name, expression in rule_definitions.items()
+    }
+
+
+def parse_policy_chunk(
+    items: List[Tuple[str, str]],
+) -> List[Tuple[str, str, Optional[List[Dict[str, List[str]]]]]]:
+    """
+    解析一批策略并展开为最小匹配单元（子进程中执行）
+
+    Returns:
+        [(策略名, 表达式, 最小单元列表)]，解析失败的策略单元列表为 None
+    """
+    parser = _worker_parser
+    results = []
+    for name, expression in items:
+        parser._current_policy_name = name
+        parsed = parser.parse_single_policy(name, expression)
+        if parsed is None:
+            results.append((name, expression, None))
+            continue
+        results.append((name, expression, parser._extract_minimal_units(parsed) or [{}]))
+    return results
+
+
+def parse_policies_parallel(
+    policies: List[Tuple[str, str]],
+    rule_definitions: Dict[str, str],
+    workers: int,
+) -> List[Tuple[str, str, Optional[List[Dict[str, List[str]]]]]]:
+    """
+    在进程池中并行解析策略与 DNF 展开
+
+    规则定义表需由调用方先行提取（跨文件的 rule: 引用在此统一解析），
+    策略按原顺序切块提交，结果按提交顺序合并，与串行解析的输出一致。
+
+    Args:
+        policies: [(策略名, 表达式)]，不含规则定义
+        rule_definitions: 规则名 -> 表达式（保持 extract_rule_definitions 的顺序）
+        workers: 进程数
+    """
+    if not policies:
+        return []
+    # 每个进程分到约 4 块，兼顾负载均衡与进程间传输开销
+    chunk_size = max(1, -(-len(policies) // (workers * 4)))
+    chunks = [policies[i:i + chunk_size] for i in range(0, len(policies), chunk_size)]
+    results: List[Tuple[str, str, Optional[List[Dict[str, List[str]]]]]] = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_parse_worker,
+        initargs=(rule_definitions,),
+    ) as pool:
+        for chunk_results in pool.map(parse_policy_chunk, chunks):
+            results.extend(chunk_results)
+    return results
+
+
 def create_policy_parser(db_path: str = "policy_rules.db") -> PolicyRuleParser:
     """
     创建PolicyRuleParser实例
@@ -1,6 +1,7 @@
 import yaml
 from typing import Dict, Any, List
 import re
+import sys
 from policy_split import split_all_or_expressions
 from output_control import general_print as print
 
@@ -180,10 +181,12 @@ def process_policy_file(file_path: str) -> Dict[str, Dict[str, Any]]:
     # 解析rule引用
     resolved_dict = resolve_rule_references(policy_dict)
     
+    # 策略名与文件路径会在各阶段的索引与 Tools.PolicyModel.Policy 中反复出现，统一 intern
+    file_path = sys.intern(file_path)
     enriched_result: Dict[str, Dict[str, Any]] = {}
     for key, expression in resolved_dict.items():
         entries = entry_map.get(key, [])
-        enriched_result[key] = {
+        enriched_result[sys.intern(key)] = {
             'expression': expression,
             'file': file_path,
             'lines': [item['line'] for item in entries],
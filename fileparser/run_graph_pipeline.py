@@ -10,66 +10,117 @@
 from __future__ import annotations
 
 import argparse
+import os
 import subprocess
 import sys
 from pathlib import Path
-from typing import Iterable, List, Dict, Any
+from typing import TYPE_CHECKING, Iterable, List, Dict, Any, Optional, Tuple
 import re
 
-# fileparser 本目录下的模块
-from policypreprocess import process_policy_file
-from policy_parser import PolicyRuleParser
-from openstackpolicygraph import PolicyGraphCreator
-import openstackgraph as osg
+# fileparser 本目录下的模块；依赖 yaml / oslo_policy / neo4j / keystoneauth1 的模块在对应步骤中才导入，
+# --help、--skip-policy 等路径不承担这些导入开销
+from parse_cache import DEFAULT_CACHE_PATH, ParseCache, expression_key
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from Tools.CheckOutput import PolicyCheckReporter  # noqa: E402
+from Tools import IdentitySnapshot as snapshot_store  # noqa: E402
+from Tools.PolicyModel import Policy, Rule, Unit  # noqa: E402
 from output_control import set_general_output_enabled  # noqa: E402
+import pipeline_trace as trace  # noqa: E402
+
+if TYPE_CHECKING:
+    from policy_parser import PolicyRuleParser
 
 DEFAULT_SERVICES = ["keystone", "nova", "placement", "neutron", "cinder", "glance"]
+# 自动选择解析进程数时，每个进程至少分到的策略条数（策略较少时进程池启动开销得不偿失）
+MIN_POLICIES_PER_WORKER = 250
 
 
 def run_openstack_command(command: List[str], silent: bool = False) -> None:
     """执行 openstack CLI，打印标准输出/错误。"""
     if not silent:
         print(f"\n$ {' '.join(command)}")
-    subprocess.run(command, check=True, stdout=None if not silent else subprocess.DEVNULL,
-                   stderr=None if not silent else subprocess.DEVNULL)
+    with trace.span("subprocess", command=" ".join(command)):
+        trace.count("subprocesses")
+        subprocess.run(command, check=True, stdout=None if not silent else subprocess.DEVNULL,
+                       stderr=None if not silent else subprocess.DEVNULL)
+
 
+def _snapshot_usable(snapshot: Optional[Dict[str, Any]]) -> bool:
+    """快照中 users/roles/role_assignments 都非空时才足以构建身份子图。"""
+    return bool(snapshot and snapshot.get("users") and snapshot.get("roles") and snapshot.get("role_assignments"))
 
-def fetch_identity_and_credentials(services: Iterable[str], silent: bool = False) -> None:
+
+def fetch_identity_and_credentials(services: Iterable[str], silent: bool = False,
+                                   snapshot_path: str = snapshot_store.SNAPSHOT_PATH,
+                                   max_age: float = snapshot_store.DEFAULT_MAX_AGE,
+                                   refresh: bool = False) -> Optional[Dict[str, Any]]:
     """
-    调用 openstack CLI 查询各组件的 service/endpoint 信息，帮助确认凭证是否可用。
+    获取身份快照（users/projects/roles/role assignments）。
+
+    快照新鲜时直接读取文件，不调用任何 openstack CLI；仅在快照缺失、过期或 refresh=True 时
+    才查询各组件的 service/endpoint 信息确认凭证可用，并重新收集快照。
     默认会查询 keystone/nova/... 等服务，可通过 --services 参数定制。
     若只想查看单个组件，可在命令行提供 --services keystone 之类的参数。
+    刷新失败或刷新得到的快照缺少 users/roles/role assignments 时返回 None，由 build_identity_graph 直接读取 Keystone。
     """
-    commands = [
-        ["openstack", "project", "list"],
-        ["openstack", "user", "list"],
-    ]
+    with trace.span("load_snapshot", path=snapshot_path):
+        cached = None if refresh else snapshot_store.load_snapshot(snapshot_path)
+    if _snapshot_usable(cached) and not snapshot_store.is_stale(cached, max_age):
+        trace.count("snapshot_hits")
+        if not silent:
+            print(f"使用身份快照 {snapshot_path}: {snapshot_store.describe(cached)}")
+        return cached
+
+    commands = []
     for svc in services:
         commands.append(["openstack", "service", "show", svc])
         commands.append(["openstack", "endpoint", "list", "--service", svc])
     for cmd in commands:
         run_openstack_command(cmd, silent=silent)
+    with trace.span("refresh_snapshot"):
+        try:
+            snapshot, _ = snapshot_store.get_snapshot(snapshot_path, refresh=True)
+        except Exception as exc:
+            print(f"⚠ 身份快照刷新失败，改为直接读取 Keystone: {exc}", file=sys.stderr)
+            return None
+    if not _snapshot_usable(snapshot):
+        print(f"⚠ 刷新得到的身份快照数据不足，改为直接读取 Keystone: {snapshot_store.describe(snapshot)}",
+              file=sys.stderr)
+        return None
+    if not silent:
+        print(f"✓ 身份快照已刷新 {snapshot_path}: {snapshot_store.describe(snapshot)}")
+    return snapshot
+
 
+def build_identity_graph(neo4j_uri: str, user: str, password: str, show_token_info: bool = False,
+                         snapshot: Optional[Dict[str, Any]] = None) -> None:
+    """读取 Keystone 数据（优先使用身份快照）并写入 Neo4j。"""
+    import openstackgraph as osg
 
-def build_identity_graph(neo4j_uri: str, user: str, password: str, show_token_info: bool = False) -> None:
-    """调用 openstackgraph 读取 Keystone 数据并写入 Neo4j。"""
     osg.NEO4J_URI = neo4j_uri
     osg.NEO4J_USER = user
     osg.NEO4J_PASSWORD = password
     osg.set_token_output_verbose(show_token_info)
-    manager = osg.OpenStackNeo4jManager()
+    with trace.span("connect"):
+        manager = osg.OpenStackNeo4jManager(connect_openstack=snapshot is None)
     try:
-        users, roles, projects, assignments = manager.read_data_from_openstack()
+        with trace.span("read_identity", source="snapshot" if snapshot is not None else "keystone"):
+            if snapshot is not None:
+                users, roles, projects, assignments = manager.read_data_from_snapshot(snapshot)
+            else:
+                users, roles, projects, assignments = manager.read_data_from_openstack()
+            trace.count("role_assignments", len(assignments))
         if not users or not roles or not assignments:
             raise SystemExit("OpenStack 数据不足，跳过身份子图导入。")
-        mappings = manager.generate_tokens_from_assignments(users, roles, assignments)
-        manager.create_neo4j_graph(mappings)
+        with trace.span("generate_tokens"):
+            mappings = manager.generate_tokens_from_assignments(users, roles, assignments)
+            trace.count("token_mappings", len(mappings))
+        with trace.span("graph_write"):
+            manager.create_neo4j_graph(mappings)
         if show_token_info:
             unique_tokens = {m['token_id'] for m in mappings}
             print(f"[Token Info] total tokens: {len(unique_tokens)}, mappings: {len(mappings)}")
@@ -85,10 +136,68 @@ def build_identity_graph(neo4j_uri: str, user: str, password: str, show_token_in
         manager.close()
 
 
+def resolve_parse_workers(requested: int, policy_count: int) -> int:
+    """requested <= 0 时按 CPU 数与策略条数自动选择；返回 1 表示串行解析。"""
+    if requested > 0:
+        return requested
+    return max(1, min(os.cpu_count() or 1, policy_count // MIN_POLICIES_PER_WORKER))
+
+
+def parse_policy_items(parser: PolicyRuleParser, policy_items: List[Tuple[str, str]],
+                       workers: int) -> List[Optional[List[Dict[str, List[str]]]]]:
+    """
+    解析策略并展开为最小匹配单元，返回与 policy_items 对齐的列表（解析失败为 None）。
+
+    workers > 1 时在进程池中并行执行（parser 中的规则定义表随进程初始化下发），
+    解析与 DNF 展开整体计入 parse 阶段；串行时分两轮进行，便于分别统计耗时。
+    """
+    if workers > 1:
+        from policy_parser import parse_policies_parallel
+
+        with trace.span("parse", workers=workers):
+            rule_table = {name: rule.expression for name, rule in parser.rule_definitions.items()}
+            results = [units for _, _, units in parse_policies_parallel(policy_items, rule_table, workers)]
+            trace.count("parse_failures", sum(1 for units in results if units is None))
+            trace.count("policies", sum(1 for units in results if units is not None))
+            trace.count("units", sum(len(units) for units in results if units is not None))
+        return results
+
+    parsed_list = []
+    with trace.span("parse"):
+        for name, expr in policy_items:
+            parsed = parser.parse_single_policy(name, expr)
+            if parsed is None:
+                trace.count("parse_failures")
+            parsed_list.append(parsed)
+        trace.count("policies", sum(1 for parsed in parsed_list if parsed is not None))
+
+    results = []
+    with trace.span("dnf"):
+        for parsed in parsed_list:
+            if parsed is None:
+                results.append(None)
+                continue
+            units = parser._extract_minimal_units(parsed) or [{}]
+            trace.count("units", len(units))
+            results.append(units)
+    return results
+
+
 def build_policy_graph(policy_paths: List[Path], neo4j_uri: str, user: str, password: str,
                        show_policy_debug: bool = False, show_check_output: bool = False,
-                       show_stats: bool = False) -> None:
-    """解析策略文件并写入策略图。"""
+                       show_stats: bool = False, parse_workers: int = 0,
+                       parse_cache_path: Optional[str] = DEFAULT_CACHE_PATH) -> None:
+    """
+    解析策略文件并写入策略图。
+
+    先提取全部文件共享的规则定义表；parse_cache_path 不为空时，规则引用替换后的表达式
+    命中解析缓存的策略直接复用最小单元，其余策略交给 parse_policy_items
+    （parse_workers > 1 或为 0 且策略较多时并行），结果按原顺序合并到 policy_dict。
+    """
+    from policypreprocess import process_policy_file
+    from policy_parser import PolicyRuleParser
+    from openstackpolicygraph import PolicyGraphCreator
+
     reporter = PolicyCheckReporter()
     error_count = 0
     def report_issue(code: str, **kwargs: Any) -> None:
@@ -98,56 +207,82 @@ def build_policy_graph(policy_paths: List[Path], neo4j_uri: str, user: str, pass
         error_count += 1
     raw_policies: Dict[str, str] = {}
     policy_metadata = {}
-    for path in policy_paths:
-        if not path.exists():
-            print(f"⚠ 警告：策略文件不存在 {path}，跳过")
-            continue
-        data = process_policy_file(str(path))
-        print(f"读取 {len(data)} 条策略：{path}")
-        for name, info in data.items():
-            raw_policies[name] = info['expression']
-            policy_metadata[name] = {
-                'file': info.get('file', str(path)),
-                'lines': info.get('lines', []),
-                'raw_entries': info.get('raw_entries', [])
-            }
+    with trace.span("preprocess"):
+        for path in policy_paths:
+            if not path.exists():
+                print(f"⚠ 警告：策略文件不存在 {path}，跳过")
+                continue
+            with trace.span("policy_file", path=str(path)):
+                data = process_policy_file(str(path))
+                trace.count("policy_entries", len(data))
+            print(f"读取 {len(data)} 条策略：{path}")
+            for name, info in data.items():
+                raw_policies[name] = info['expression']
+                policy_metadata[name] = {
+                    'file': info.get('file', str(path)),
+                    'lines': info.get('lines', []),
+                    'raw_entries': info.get('raw_entries', [])
+                }
 
     parser = PolicyRuleParser()
-    parser.extract_rule_definitions(raw_policies)
-
-    def unit_signature(unit: Dict[str, List[str]]) -> str:
-        if not unit:
-            return "@"
-        parts = []
-        for key in sorted(unit.keys()):
-            values = unit.get(key, [])
-            norm_values = sorted({str(v) for v in values if v})
-            if norm_values:
-                parts.append(f"{key}:{'|'.join(norm_values)}")
-        return " AND ".join(parts) if parts else "@"
-
-    policy_dict = {}
-    for name, expr in raw_policies.items():
-        if parser._is_rule_definition(name, expr):
-            continue
-        parsed = parser.parse_single_policy(name, expr)
-        if parsed is None:
+    with trace.span("extract_rule_definitions"):
+        parser.extract_rule_definitions(raw_policies)
+
+    policy_items = [
+        (name, expr) for name, expr in raw_policies.items()
+        if not parser._is_rule_definition(name, expr)
+    ]
+
+    # 解析缓存：按规则引用替换后的表达式哈希查找，命中的策略不再解析
+    rules_list: List[Optional[Rule]] = [None] * len(policy_items)
+    cache = ParseCache.open(parse_cache_path) if parse_cache_path else None
+    keys: List[str] = []
+    if cache is not None:
+        with trace.span("parse_cache"):
+            keys = [expression_key(parser.substitute_rule_references(expr)) for _, expr in policy_items]
+            hits = cache.get_many(keys)
+            for index, key in enumerate(keys):
+                if key in hits:
+                    units, _ = hits[key]
+                    rules_list[index] = Rule(policy_items[index][1], [Unit.from_dict(unit) for unit in units])
+            trace.count("cache_hits", sum(1 for rule in rules_list if rule is not None))
+    pending = [index for index, rule in enumerate(rules_list) if rule is None]
+
+    if pending:
+        workers = resolve_parse_workers(parse_workers, len(pending))
+        parsed_units = parse_policy_items(parser, [policy_items[index] for index in pending], workers)
+        new_entries = {}
+        for index, units in zip(pending, parsed_units):
+            if units is None:
+                continue
+            rule = Rule(policy_items[index][1], [Unit.from_dict(unit) for unit in units])
+            rules_list[index] = rule
+            if cache is not None:
+                new_entries[keys[index]] = (units, rule.unit_signatures)
+        del parsed_units
+        if cache is not None:
+            with trace.span("parse_cache_store"):
+                cache.put_many(new_entries)
+    if cache is not None:
+        cache.close()
+
+    policy_dict: Dict[str, Policy] = {}
+    for (name, expr), rule in zip(policy_items, rules_list):
+        if rule is None:
             print(f"⚠ 跳过解析失败的策略：{name}")
             continue
         if show_policy_debug:
             print(f"[Policy Parse] {name}: {expr}")
-        if name not in policy_dict:
-            policy_dict[name] = {
-                'expressions': [],
-                'metadata': policy_metadata.get(name, {'file': '', 'lines': [], 'raw_entries': []}),
-                'unit_signatures': []
-            }
-        policy_dict[name]['expressions'].append(expr)
-        units = parser._extract_minimal_units(parsed) or [{}]
-        unit_signatures = []
-        for unit in units:
-            unit_signatures.append(unit_signature(unit))
-        policy_dict[name]['unit_signatures'].extend(unit_signatures)
+        policy = policy_dict.get(name)
+        if policy is None:
+            metadata = policy_metadata.get(name, {})
+            policy = policy_dict[name] = Policy(
+                name,
+                file=metadata.get('file', ''),
+                lines=metadata.get('lines', []),
+                raw_entries=metadata.get('raw_entries', []),
+            )
+        policy.rules.append(rule)
 
     def normalize_expression(expr: str) -> str:
         expr = re.sub(r'\s+', ' ', expr.strip())
@@ -156,9 +291,8 @@ def build_policy_graph(policy_paths: List[Path], neo4j_uri: str, user: str, pass
         return expr
 
     def check_policy_duplicates() -> None:
-        for policy_name, data in policy_dict.items():
-            metadata = data.get('metadata', {})
-            raw_entries = metadata.get('raw_entries', [])
+        for policy_name, policy in policy_dict.items():
+            raw_entries = policy.raw_entries
             if len(raw_entries) > 1:
                 normalized = [
                     (entry['line'], normalize_expression(entry['value']))
@@ -175,25 +309,29 @@ def build_policy_graph(policy_paths: List[Path], neo4j_uri: str, user: str, pass
                     report_issue(
                         "1",
                         policy_name=policy_line_info,
-                        target=delete_target
+                        target=delete_target,
+                        api=policy_name,
+                        file=policy.file
                     )
                 elif len(unique_rules) > 1:
                     suggestion = " or ".join(sorted(unique_rules))
                     report_issue(
                         "2",
                         policy_name=policy_line_info,
-                        suggestion=suggestion
+                        suggestion=suggestion,
+                        api=policy_name,
+                        file=policy.file
                     )
 
             # check duplicate rules within same policy definition
-            unit_signatures = data.get('unit_signatures', [])
+            unit_signatures = policy.unit_signatures
             signature_counts = {}
             for sig in unit_signatures:
                 signature_counts[sig] = signature_counts.get(sig, 0) + 1
             repeated_units = [sig for sig, count in signature_counts.items() if count > 1]
             if repeated_units:
                 suggestion = " or ".join(sorted(signature_counts.keys()))
-                line_info = ", ".join(str(line) for line in metadata.get('lines', []))
+                line_info = ", ".join(str(line) for line in policy.lines)
                 detail_lines = [
                     f"line {entry['line']}: {entry['value']}" for entry in raw_entries
                 ] or [policy_name]
@@ -202,15 +340,21 @@ def build_policy_graph(policy_paths: List[Path], neo4j_uri: str, user: str, pass
                     "3",
                     policy_name="\n".join(policy_details),
                     fault_unit="\n".join(repeated_units),
-                    suggestion=suggestion
+                    suggestion=suggestion,
+                    api=policy_name,
+                    file=policy.file
                 )
 
-    check_policy_duplicates()
+    with trace.span("duplicate_checks"):
+        check_policy_duplicates()
+        trace.count("issues", error_count)
 
     creator = PolicyGraphCreator(uri=neo4j_uri, user=user, password=password)
     try:
-        creator.create_policy_graph(policy_dict)
-        stats = creator.get_graph_statistics() if show_stats else None
+        with trace.span("graph_write"):
+            creator.create_policy_graph(policy_dict)
+        with trace.span("graph_statistics"):
+            stats = creator.get_graph_statistics() if show_stats else None
         if show_stats and stats:
             print("✓ 已写入策略子图，统计信息：")
             for key, value in stats.items():
@@ -252,6 +396,22 @@ def parse_args() -> argparse.Namespace:
         default="Password",
         help="Neo4j 密码，默认 %(default)s",
     )
+    parser.add_argument(
+        "--identity-snapshot",
+        default=snapshot_store.SNAPSHOT_PATH,
+        help="身份快照路径，默认 %(default)s",
+    )
+    parser.add_argument(
+        "--identity-max-age",
+        type=float,
+        default=snapshot_store.DEFAULT_MAX_AGE,
+        help="身份快照过期秒数，过期后自动刷新，负数表示永不过期。默认 %(default)s",
+    )
+    parser.add_argument(
+        "--refresh-identity",
+        action="store_true",
+        help="忽略现有身份快照，重新从 Keystone 收集",
+    )
     parser.add_argument(
         "--skip-identity",
         action="store_true",
@@ -282,6 +442,35 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="输出策略写入后的统计信息",
     )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="策略解析进程数，0 为按 CPU 数与策略条数自动选择，1 为串行（便于分别统计 parse/dnf 阶段）",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        default=DEFAULT_CACHE_PATH,
+        help="策略解析缓存（SQLite）路径，默认 %(default)s，可用 POLICY_PARSE_CACHE 修改",
+    )
+    parser.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="不读写解析缓存，完整解析全部策略",
+    )
+    parser.add_argument(
+        "--trace-file",
+        help="输出结构化追踪 JSON（各阶段墙钟/CPU 时间与计数器）",
+    )
+    parser.add_argument(
+        "--profile-stages",
+        default="",
+        help="逗号分隔的阶段名（如 parse,dnf,graph_write）或 all，对这些阶段启用 cProfile；需配合 --trace-file",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        help="cProfile 结果目录，默认与 trace 文件同名的 _profiles 目录",
+    )
     return parser.parse_args()
 
 
@@ -292,7 +481,19 @@ def main() -> None:
 
     show_general = args.show_token_info or args.show_policy_debug or not args.show_check_report
     set_general_output_enabled(show_general)
+    if args.trace_file:
+        profile_stages = [s.strip() for s in args.profile_stages.split(",") if s.strip()]
+        trace.enable_tracing(args.trace_file, profile_stages, args.profile_dir)
+    try:
+        run_steps(args, services, policy_files, show_general)
+    finally:
+        trace_path = trace.write_trace()
+        if trace_path:
+            print(f"追踪结果已写入: {trace_path}")
+
 
+def run_steps(args: argparse.Namespace, services: List[str], policy_files: List[Path],
+              show_general: bool) -> None:
     def announce_step(step: str, detail: str, verbose: bool, start: bool = True) -> None:
         if verbose:
             prefix = "\n" if step != "1" and start else ""
@@ -304,34 +505,46 @@ def main() -> None:
 
     step1_detail = "获取身份/凭证信息"
     announce_step("1", step1_detail, show_general, start=True)
-    fetch_identity_and_credentials(services, silent=not show_general)
+    with trace.span("identity_fetch"):
+        snapshot = fetch_identity_and_credentials(
+            services,
+            silent=not show_general,
+            snapshot_path=args.identity_snapshot,
+            max_age=args.identity_max_age,
+            refresh=args.refresh_identity,
+        )
     announce_step("1", step1_detail, show_general, start=False)
 
     if not args.skip_identity:
         identity_verbose = show_general or args.show_token_info
         step2_detail = "构建身份子图"
         announce_step("2", step2_detail, identity_verbose, start=True)
-        build_identity_graph(
-            args.neo4j_uri,
-            args.neo4j_user,
-            args.neo4j_password,
-            show_token_info=args.show_token_info,
-        )
+        with trace.span("identity_graph"):
+            build_identity_graph(
+                args.neo4j_uri,
+                args.neo4j_user,
+                args.neo4j_password,
+                show_token_info=args.show_token_info,
+                snapshot=snapshot,
+            )
         announce_step("2", step2_detail, identity_verbose, start=False)
 
     if not args.skip_policy:
         policy_verbose = show_general or args.show_policy_debug or args.show_check_report or args.show_policy_statistic
         step3_detail = "解析策略并构建策略子图"
         announce_step("3", step3_detail, policy_verbose, start=True)
-        build_policy_graph(
-            policy_files,
-            args.neo4j_uri,
-            args.neo4j_user,
-            args.neo4j_password,
-            show_policy_debug=args.show_policy_debug,
-            show_check_output=args.show_check_report,
-            show_stats=args.show_policy_statistic,
-        )
+        with trace.span("policy_graph"):
+            build_policy_graph(
+                policy_files,
+                args.neo4j_uri,
+                args.neo4j_user,
+                args.neo4j_password,
+                show_policy_debug=args.show_policy_debug,
+                show_check_output=args.show_check_report,
+                show_stats=args.show_policy_statistic,
+                parse_workers=args.parse_workers,
+                parse_cache_path=None if args.no_parse_cache else args.parse_cache,
+            )
         announce_step("3", step3_detail, policy_verbose, start=False)
 
     print("\n✓ 全部任务完成")
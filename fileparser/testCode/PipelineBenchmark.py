@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+策略检测流水线分阶段基准测试。
+
+阶段：
+    preprocess      process_policy_file（rule: 引用展开）
+    parse           PolicyRuleParser.extract_rule_definitions + parse_single_policy
+    dnf             _extract_minimal_units（DNF 最小单元展开）
+    graph_memory    create_policy_graph，写入内存替身（不依赖 Neo4j）
+    graph_neo4j     create_policy_graph，写入 Neo4j（需 --neo4j-uri）
+    static_checks   StatisticCheck 错误码 4-9 检测（需 --neo4j-uri）
+    log_extract     extract_keystone_rbac 解析 RBAC 日志（需 --keystone-log）
+    dynamic_join    日志与身份快照关联、汇总（需 --keystone-log 与 --identity-snapshot）
+    dynamic_checks  Authorization_scope_check 错误码 10/11 检测（需 --neo4j-uri）
+
+每个阶段记录耗时（多次运行取 min/median/mean）与 tracemalloc 峰值内存，结果写入 JSON；
+使用 --compare 指定历史结果文件，可直接看到两次提交之间各阶段的变化。
+
+示例：
+    python /root/Tools/SyntheticDeployment.py --output-dir /tmp/synth --scale 10
+    python /root/policy-fileparser/testCode/PipelineBenchmark.py --synthetic-dir /tmp/synth --repeat 3
+    python /root/policy-fileparser/testCode/PipelineBenchmark.py --synthetic-dir /tmp/synth \\
+        --compare /root/policy-fileparser/testCode/test_results/benchmark_20251225120000.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+FILEPARSER_DIR = Path(__file__).resolve().parent.parent
+ROOT_DIR = FILEPARSER_DIR.parent
+for _path in (FILEPARSER_DIR, ROOT_DIR):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+# fileparser 本目录下的模块
+from policypreprocess import process_policy_file  # noqa: E402
+from policy_parser import PolicyRuleParser  # noqa: E402
+from output_control import set_general_output_enabled  # noqa: E402
+
+RESULT_DIR = Path(__file__).resolve().parent / "test_results"
+DEFAULT_THRESHOLD = 0.10
+
+
+class _MemoryResult:
+    def __init__(self, records: Optional[List[Dict[str, Any]]] = None) -> None:
+        self._records = records or []
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+
+class _MemorySession:
+    def __init__(self, driver: "InMemoryGraphDriver") -> None:
+        self.driver = driver
+
+    def __enter__(self) -> "_MemorySession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def run(self, query: str, **params: Any) -> _MemoryResult:
+        self.driver.record(query, params)
+        return _MemoryResult()
+
+
+class InMemoryGraphDriver:
+    """neo4j 驱动的内存替身：只记录写入的节点/关系数，用于衡量图写入阶段的 Python 侧开销。"""
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.nodes: Dict[str, set] = {"PolicyNode": set(), "RuleNode": set(), "ConditionNode": set()}
+        self.relationships: set = set()
+
+    def session(self, **_kwargs: Any) -> _MemorySession:
+        return _MemorySession(self)
+
+    def record(self, query: str, params: Dict[str, Any]) -> None:
+        self.queries += 1
+        if "]->(" in query and "MERGE" in query:
+            rel = query.split("-[:", 1)[1].split("]", 1)[0]
+            source = params.get("policy_id") or params.get("rule_id")
+            target = params.get("rule_id") if "policy_id" in params else params.get("cond_id")
+            self.relationships.add((rel, source, target))
+            return
+        for label in self.nodes:
+            if f":{label}" in query:
+                self.nodes[label].add(params.get("id"))
+                return
+
+    def stats(self) -> Dict[str, int]:
+        data = {label: len(ids) for label, ids in self.nodes.items()}
+        data["relationships"] = len(self.relationships)
+        data["queries"] = self.queries
+        return data
+
+    def close(self) -> None:
+        return None
+
+
+@contextlib.contextmanager
+def _quiet(enabled: bool):
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+class StageRecorder:
+    """记录各阶段耗时与峰值内存。"""
+
+    def __init__(self, quiet: bool = True, track_memory: bool = True) -> None:
+        self.quiet = quiet
+        self.track_memory = track_memory
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def skip(self, name: str, reason: str) -> None:
+        self.stages.setdefault(name, {"skipped": reason})
+
+    def run(self, name: str, func: Callable[[], Any], items: Optional[Callable[[Any], int]] = None) -> Any:
+        if self.track_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        peak = 0
+        try:
+            with _quiet(self.quiet):
+                result = func()
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.track_memory:
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        entry = self.stages.setdefault(name, {"seconds": [], "peak_kb": 0})
+        entry.pop("skipped", None)
+        entry.setdefault("seconds", []).append(round(elapsed, 6))
+        entry["peak_kb"] = max(entry.get("peak_kb", 0), round(peak / 1024, 1))
+        if items is not None:
+            entry["items"] = items(result)
+        return result
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        for entry in self.stages.values():
+            seconds = entry.get("seconds")
+            if not seconds:
+                continue
+            entry["min"] = min(seconds)
+            entry["median"] = statistics.median(seconds)
+            entry["mean"] = round(statistics.mean(seconds), 6)
+        return self.stages
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.check_output(
+            ["git", "-C", str(ROOT_DIR), "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL, text=True,
+        )
+        return out.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def preprocess(policy_files: List[str]) -> Dict[str, Dict[str, Any]]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for path in policy_files:
+        for name, info in process_policy_file(path).items():
+            merged[name] = {**info, "file": info.get("file", path)}
+    return merged
+
+
+def parse(data: Dict[str, Dict[str, Any]]):
+    parser = PolicyRuleParser()
+    raw_policies = {name: info["expression"] for name, info in data.items()}
+    parser.extract_rule_definitions(raw_policies)
+    parsed = {}
+    for name, expr in raw_policies.items():
+        if parser._is_rule_definition(name, expr):
+            continue
+        rule = parser.parse_single_policy(name, expr)
+        if rule is not None:
+            parsed[name] = (expr, rule)
+    return parser, parsed
+
+
+def expand_units(parser: PolicyRuleParser, parsed, data) -> Dict[str, Dict[str, Any]]:
+    policy_dict: Dict[str, Dict[str, Any]] = {}
+    for name, (expr, rule) in parsed.items():
+        units = parser._extract_minimal_units(rule) or [{}]
+        info = data.get(name, {})
+        policy_dict[name] = {
+            "expressions": [expr],
+            "metadata": {
+                "file": info.get("file", ""),
+                "lines": info.get("lines", []),
+                "raw_entries": info.get("raw_entries", []),
+            },
+            "unit_count": len(units),
+        }
+    return policy_dict
+
+
+def write_graph(policy_dict: Dict[str, Dict[str, Any]], driver) -> Any:
+    from openstackpolicygraph import PolicyGraphCreator
+
+    creator = PolicyGraphCreator(driver=driver)
+    creator.create_policy_graph(policy_dict)
+    return driver
+
+
+def run_static_checks(driver, perm_file: str) -> int:
+    from StatisticDetect import StatisticCheck as sc
+    from Tools.CheckOutput import PolicyCheckReporter
+
+    reporter = PolicyCheckReporter()
+    entries = sc.load_sensitive_entries(perm_file)
+    total = 0
+    with driver.session() as session:
+        total += sc.check_wildcard_roles(session, reporter)
+        total += sc.check_empty_rules(session, reporter)
+        total += sc.check_sensitive_scopes(session, reporter, entries)
+        total += sc.check_sensitive_projects(session, reporter, entries)
+        total += sc.check_sensitive_roles(session, reporter, entries)
+        total += sc.check_rule_subsets(session, reporter)
+    return total
+
+
+def extract_log(log_path: str, snapshot_path: Optional[str]) -> List[Dict[str, Any]]:
+    from Tools import extract_keystone_rbac as rbac
+    from Tools import IdentitySnapshot as snapshot_store
+
+    records = rbac.build_records(log_path)
+    identity = snapshot_store.load_identity_model(snapshot_path) if snapshot_path else None
+    user_map = identity.user_name_map() if identity else {}
+    project_map = identity.project_name_map() if identity else {}
+    rbac.annotate_names(records, user_map, project_map)
+    return records
+
+
+def dynamic_join(records: List[Dict[str, Any]], snapshot_path: str) -> Counter:
+    from DynamicDetect import Authorization_scope_check as scope
+
+    identity = scope.load_identity_snapshot(snapshot_path)
+    if identity is None:
+        raise SystemExit(f"身份快照不存在: {snapshot_path}")
+    user_map, role_map, _project_map = identity
+    rows = [{k: ("" if v is None else str(v)) for k, v in record.items()} for record in records]
+    return scope.summarize(scope.build_temp_rows(rows, user_map, role_map))
+
+
+def run_dynamic_checks(driver, summary: Counter, snapshot_path: Optional[str]) -> int:
+    from DynamicDetect import Authorization_scope_check as scope
+    from Tools.CheckOutput import PolicyCheckReporter
+
+    identity = scope.load_identity_snapshot(snapshot_path) if snapshot_path else None
+    project_map = identity[2] if identity else {}
+    reporter = PolicyCheckReporter()
+    total = scope.check_unused_rules(driver, summary, reporter, project_map)
+    total += scope.check_untracked_policies(driver, summary, reporter)
+    return total
+
+
+def run_once(args: argparse.Namespace, recorder: StageRecorder, neo4j_driver) -> Dict[str, Any]:
+    data = recorder.run("preprocess", lambda: preprocess(args.policy_files), items=len)
+    parser, parsed = recorder.run("parse", lambda: parse(data), items=lambda r: len(r[1]))
+    policy_dict = recorder.run(
+        "dnf",
+        lambda: expand_units(parser, parsed, data),
+        items=lambda r: sum(p["unit_count"] for p in r.values()),
+    )
+    memory_driver = recorder.run(
+        "graph_memory",
+        lambda: write_graph(policy_dict, InMemoryGraphDriver()),
+        items=lambda d: d.queries,
+    )
+
+    if neo4j_driver is not None:
+        if args.neo4j_clear:
+            with neo4j_driver.session() as session:
+                session.run("MATCH (n) DETACH DELETE n")
+        recorder.run("graph_neo4j", lambda: write_graph(policy_dict, neo4j_driver))
+        recorder.run("static_checks", lambda: run_static_checks(neo4j_driver, args.perm_file), items=int)
+    else:
+        recorder.skip("graph_neo4j", "未指定 --neo4j-uri")
+        recorder.skip("static_checks", "未指定 --neo4j-uri")
+
+    summary = None
+    if args.keystone_log:
+        records = recorder.run(
+            "log_extract", lambda: extract_log(args.keystone_log, args.identity_snapshot), items=len
+        )
+        if args.identity_snapshot:
+            summary = recorder.run(
+                "dynamic_join", lambda: dynamic_join(records, args.identity_snapshot), items=len
+            )
+        else:
+            recorder.skip("dynamic_join", "未指定 --identity-snapshot")
+    else:
+        recorder.skip("log_extract", "未指定 --keystone-log")
+        recorder.skip("dynamic_join", "未指定 --keystone-log")
+
+    if neo4j_driver is not None and summary is not None:
+        recorder.run(
+            "dynamic_checks",
+            lambda: run_dynamic_checks(neo4j_driver, summary, args.identity_snapshot),
+            items=int,
+        )
+    else:
+        recorder.skip("dynamic_checks", "需要 --neo4j-uri 与日志/身份快照")
+
+    return {"graph_memory": memory_driver.stats()}
+
+
+def compare(current: Dict[str, Any], baseline_path: str, threshold: float) -> List[str]:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\n对比基线: {baseline_path} (revision {baseline.get('meta', {}).get('revision')})")
+    print(f"{'stage':<16}{'baseline(s)':>14}{'current(s)':>14}{'delta':>10}")
+    for name, entry in current["stages"].items():
+        old = baseline.get("stages", {}).get(name, {})
+        if "median" not in entry or "median" not in old:
+            continue
+        delta = (entry["median"] - old["median"]) / old["median"] if old["median"] else 0.0
+        flag = ""
+        if delta > threshold:
+            flag = "  ← REGRESSION"
+            regressions.append(name)
+        print(f"{name:<16}{old['median']:>14.4f}{entry['median']:>14.4f}{delta:>+10.1%}{flag}")
+    return regressions
+
+
+def resolve_inputs(args: argparse.Namespace) -> None:
+    policy_files = [p.strip() for p in (args.policy_files or "").split(",") if p.strip()]
+    if args.synthetic_dir:
+        manifest_path = Path(args.synthetic_dir) / "manifest.json"
+        with manifest_path.open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        policy_files = policy_files or manifest.get("policy_files", [])
+        args.identity_snapshot = args.identity_snapshot or manifest.get("identity_snapshot")
+        args.keystone_log = args.keystone_log or manifest.get("keystone_log")
+    if not policy_files:
+        raise SystemExit("请通过 --policy-files 或 --synthetic-dir 指定策略文件")
+    args.policy_files = policy_files
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="策略检测流水线分阶段基准测试")
+    parser.add_argument("--policy-files", help="逗号分隔的策略文件路径")
+    parser.add_argument("--synthetic-dir", help="SyntheticDeployment.py 的输出目录（读取 manifest.json）")
+    parser.add_argument("--identity-snapshot", help="身份快照路径（dynamic_join 阶段）")
+    parser.add_argument("--keystone-log", help="keystone RBAC 日志路径（log_extract 阶段）")
+    parser.add_argument("--perm-file", default="/root/policy-fileparser/data/assistfile/sensitive_permissions.csv")
+    parser.add_argument("--neo4j-uri", help="指定后额外测试 Neo4j 写入与图查询检测")
+    parser.add_argument("--neo4j-user", default="neo4j")
+    parser.add_argument("--neo4j-password", default="Password")
+    parser.add_argument("--neo4j-clear", action="store_true", help="每轮写入前清空 Neo4j（会删除现有图数据）")
+    parser.add_argument("--repeat", type=int, default=1, help="重复运行次数")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 test_results/benchmark_<时间>.json")
+    parser.add_argument("--compare", help="与历史结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="中位数变慢超过该比例视为回归")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回归时以非零状态退出")
+    parser.add_argument("--no-memory", action="store_true", help="不跟踪峰值内存（tracemalloc 会放大耗时）")
+    parser.add_argument("--verbose", action="store_true", help="显示各阶段自身的输出")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    resolve_inputs(args)
+    set_general_output_enabled(args.verbose)
+
+    neo4j_driver = None
+    if args.neo4j_uri:
+        from neo4j import GraphDatabase
+
+        neo4j_driver = GraphDatabase.driver(args.neo4j_uri, auth=(args.neo4j_user, args.neo4j_password))
+
+    recorder = StageRecorder(quiet=not args.verbose, track_memory=not args.no_memory)
+    graph_stats: Dict[str, Any] = {}
+    try:
+        for i in range(max(1, args.repeat)):
+            print(f"[Run {i + 1}/{max(1, args.repeat)}]")
+            graph_stats = run_once(args, recorder, neo4j_driver)
+    finally:
+        if neo4j_driver is not None:
+            neo4j_driver.close()
+
+    results = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": max(1, args.repeat),
+            "policy_files": args.policy_files,
+            "identity_snapshot": args.identity_snapshot,
+            "keystone_log": args.keystone_log,
+            "neo4j": bool(args.neo4j_uri),
+            "track_memory": not args.no_memory,
+        },
+        "graph": graph_stats,
+        "stages": recorder.summary(),
+    }
+
+    output = Path(args.output) if args.output else RESULT_DIR / f"benchmark_{dt.datetime.now():%Y%m%d%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'stage':<16}{'median(s)':>12}{'min(s)':>12}{'peak(KB)':>12}{'items':>10}")
+    for name, entry in results["stages"].items():
+        if "skipped" in entry:
+            print(f"{name:<16}  skipped: {entry['skipped']}")
+            continue
+        print(f"{name:<16}{entry['median']:>12.4f}{entry['min']:>12.4f}{entry['peak_kb']:>12.1f}"
+              f"{entry.get('items', ''):>10}")
+    print(f"\n结果已写入: {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
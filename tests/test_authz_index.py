@@ -0,0 +1,85 @@
+import csv
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from Tools.AuthzIndex import build_index, load_identity, run_audit  # noqa: E402
+
+POLICY = {
+    "deny_all": "!",
+    "allow_all": "@",
+    "empty": "",
+    "unsupported_only": "token.domain.id:%(target.domain.id)s",
+    "unsupported_in_and": "role:admin and token.domain.id:%(target.domain.id)s",
+    "unsupported_in_or": "role:admin or is_admin:1",
+    "not_compound": "not (role:member and project_id:abc)",
+    "not_single": "role:reader and not role:member",
+    "not_owner": "role:reader and not user_id:%(target.user.id)s",
+    "false_in_and": "role:admin and !",
+    "not_false": "role:reader and not !",
+}
+
+
+@pytest.fixture()
+def index(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text("".join(f'"{name}": "{expr}"\n' for name, expr in POLICY.items()), encoding="utf-8")
+    return build_index([str(path)], parse_cache_path=None, implied_roles={})
+
+
+def test_deny_all_is_denied(index):
+    assert not index.allowed("deny_all", ["admin"], "abc", "all")
+    assert not index.allowed("false_in_and", ["admin"])
+    assert index.allowed("not_false", ["reader"])
+
+
+def test_true_check_allows_everyone(index):
+    assert index.allowed("allow_all", [])
+    assert index.allowed("empty", [])
+
+
+def test_unsupported_checks_are_not_allowed(index):
+    assert not index.allowed("unsupported_only", ["admin"], "abc", "all", "default")
+    assert not index.allowed("unsupported_in_and", ["admin"], "abc", "all", "default")
+    assert index.undetermined("unsupported_in_and")
+    assert index.allowed("unsupported_in_or", ["admin"])
+    assert not index.allowed("unsupported_in_or", ["member"])
+
+
+def test_negated_compound_expression(index):
+    assert index.allowed("not_compound", ["member"], "zzz")
+    assert index.allowed("not_compound", ["reader"], "abc")
+    assert not index.allowed("not_compound", ["member"], "abc")
+
+
+def test_negated_single_condition(index):
+    assert index.allowed("not_single", ["reader"])
+    assert not index.allowed("not_single", ["reader", "member"])
+
+
+def test_negated_owner_check_is_undetermined(index):
+    assert not index.allowed("not_owner", ["reader"], user="u1")
+    assert index.undetermined("not_owner")
+
+
+def test_audit_uses_rolegrant_csv(index, tmp_path, capsys):
+    rolegrant = tmp_path / "rolegrant.csv"
+    with rolegrant.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["user_id", "user_name", "project_id", "project_name", "role_id", "role_name"])
+        writer.writerow(["u1", "alice", "zzz", "demo", "r1", "member"])
+    audit = tmp_path / "audit.csv"
+    with audit.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["timestamp", "api", "project_name", "user_name", "user_id", "project_id",
+                         "system_scope", "domain_id", "authorized"])
+        writer.writerow(["t1", "not_compound", "demo", "alice", "u1", "zzz", "", "", "yes"])
+        writer.writerow(["t2", "deny_all", "demo", "alice", "u1", "zzz", "", "", "no"])
+
+    user_map, role_map, _ = load_identity(None, str(rolegrant), str(tmp_path / "projectinfo.csv"))
+    assert role_map[("alice", "zzz")] == ["member"]
+    assert run_audit(index, [str(audit)], user_map, role_map, show_limit=5) == 0
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from Tools import PolicyDoctor  # noqa: E402
+
+
+@pytest.mark.parametrize("case", PolicyDoctor.BUDGET_CASES, ids=" ".join)
+def test_lightweight_command_does_not_import_heavy_modules(case):
+    command = [sys.executable, PolicyDoctor.__file__] + case
+    imported = {name.split(".")[0] for name in PolicyDoctor._imported_modules(command)}
+    assert imported, "未收集到 -X importtime 输出"
+    assert not imported & set(PolicyDoctor.HEAVY_MODULES)
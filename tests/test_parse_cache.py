@@ -0,0 +1,28 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "fileparser"))
+
+from parse_cache import ParseCache, expression_key, normalize_expression  # noqa: E402
+
+
+def test_keywords_are_case_and_space_normalized():
+    assert normalize_expression("role:admin  OR (role:member AND\tNot role:reader)") == (
+        "role:admin or (role:member and not role:reader)"
+    )
+    assert expression_key("(role:a OR role:b)") == expression_key("(role:a or role:b)")
+
+
+def test_keyword_words_inside_values_do_not_collide():
+    assert expression_key("user_id:OR-team") != expression_key("user_id:or-team")
+    assert expression_key("project_name:AND") != expression_key("project_name:and")
+    assert normalize_expression("role:NOT") == "role:NOT"
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache.sqlite3"))
+    key = expression_key("role:admin")
+    cache.put_many({key: ([{"role": ["admin"]}], ["sig"])})
+    assert cache.get_many([key, expression_key("role:reader")]) == {key: ([{"role": ["admin"]}], ["sig"])}
+    cache.close()
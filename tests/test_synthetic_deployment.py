@@ -0,0 +1,37 @@
+import os
+import random
+import sys
+
+from oslo_policy import _checks, _parser
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from Tools.SyntheticDeployment import PolicyGenerator  # noqa: E402
+
+
+class _MaxRandom(random.Random):
+    """每层都取满 or 扇出，使生成的结构确定。"""
+
+    def randint(self, a, b):
+        return b
+
+
+def _assert_shape(rule, depth, fanout):
+    if depth == 0:
+        assert not isinstance(rule, (_checks.AndCheck, _checks.OrCheck))
+        return
+    assert isinstance(rule, _checks.OrCheck)
+    assert len(rule.rules) == fanout
+    for branch in rule.rules:
+        assert isinstance(branch, _checks.AndCheck)
+        assert len(branch.rules) == 2
+        _assert_shape(branch.rules[0], depth - 1, fanout)
+        _assert_shape(branch.rules[1], 0, fanout)
+
+
+def test_generated_rule_depth_and_fanout():
+    generator = PolicyGenerator(_MaxRandom(7), ["admin", "member", "reader"], depth=3, fanout=3,
+                                ref_density=0.0, aliases_per_service=0)
+    expression = generator.expression([])
+    _assert_shape(_parser.parse_rule(expression), 3, 3)